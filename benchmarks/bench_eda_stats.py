@@ -0,0 +1,139 @@
+"""EDA statistics: the streaming engine (src/eda_stats.py) vs the previous code.
+
+The previous implementation is reproduced below as ``reference_stats``. It
+joins the chapters into one string, builds lists of every word, every
+non-stopword and every bigram string, counts them with ``Counter``, then
+splits and tokenizes every sentence again for the histogram. Both are run on
+each book found under data/ and on a synthetic corpus made of the books'
+chapters repeated ``--scale`` times. The script checks that both give the
+same statistics, and reports time and peak memory (tracemalloc) for each:
+
+    python benchmarks/bench_eda_stats.py --scale 10
+
+EPUB parsing is the same for both and is timed separately.
+"""
+
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.eda_api import STOPWORDS, _book_to_epub_path, _iter_chapters, _wordcloud_frequencies, compute_stats
+
+Chapters = List[Tuple[Dict[str, Any], str]]
+
+
+def _simple_tokenize(text: str) -> List[str]:
+    return re.findall(r"[A-Za-z']+", text.lower())
+
+
+def reference_stats(chapters: Chapters) -> Dict[str, Any]:
+    """The statistics as src/eda_api.py computed them before the engine."""
+    all_text = ""
+    chapter_info = []
+    for info, text in chapters:
+        all_text += text + " "
+        chapter_info.append({**info, "word_count": len(_simple_tokenize(text))})
+
+    words = _simple_tokenize(all_text)
+    words_no_stop = [w for w in words if w.isalpha() and w not in STOPWORDS]
+    bigrams = [f"{words_no_stop[i]} {words_no_stop[i+1]}" for i in range(len(words_no_stop) - 1)]
+    word_freq = Counter(words)
+    word_freq_no_stop = Counter(words_no_stop)
+    bigram_freq = Counter(bigrams)
+
+    parts = re.split(r"(?<=[\.!\?])\s+", all_text)
+    sentences = [p.strip() for p in parts if len(p.strip()) > 0]
+    sentence_lengths = [len(_simple_tokenize(s)) for s in sentences]
+    bin_edges = list(range(0, 601, 10))
+    counts, _ = np.histogram(sentence_lengths, bins=bin_edges)
+
+    return {
+        "total_words": len(words),
+        "unique_words": len(set(words)),
+        "unique_words_no_stopwords": len(set(words_no_stop)),
+        "top_words": word_freq.most_common(20),
+        "top_words_no_stopwords": word_freq_no_stop.most_common(20),
+        "top_bigrams": bigram_freq.most_common(15),
+        "chapter_info": chapter_info,
+        "words_no_stopwords": words_no_stop,
+        "sentence_length_hist": {"bin_edges": bin_edges, "counts": counts.tolist()},
+    }
+
+
+def engine_stats(chapters: Chapters) -> Dict[str, Any]:
+    stats, corpus = compute_stats(chapters)
+    _wordcloud_frequencies(corpus)  # what the word cloud is built from
+    return stats
+
+
+def _measure(fn: Callable[[Chapters], Dict[str, Any]], chapters: Chapters, runs: int):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn(chapters)
+        times.append(time.perf_counter() - start)
+        del result
+    tracemalloc.start()
+    result = fn(chapters)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def _same(reference: Dict[str, Any], engine: Dict[str, Any]) -> bool:
+    keys = [k for k in reference if k != "words_no_stopwords"]
+    return all(
+        [list(x) if isinstance(x, tuple) else x for x in reference[k]]
+        == [list(x) if isinstance(x, tuple) else x for x in engine[k]]
+        if isinstance(reference[k], list) else reference[k] == engine[k]
+        for k in keys
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=10, help="copies of the books in the synthetic corpus")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    corpora: Dict[str, Chapters] = {}
+    for book_id in ("debt_crisis", "capitalism"):
+        path = _book_to_epub_path(book_id)
+        if not path.exists():
+            print(f"skipping {book_id}: {path} not found")
+            continue
+        start = time.perf_counter()
+        corpora[book_id] = list(_iter_chapters(path))
+        print(f"parsed {book_id} in {time.perf_counter() - start:.2f}s ({len(corpora[book_id])} chapters)")
+    if not corpora:
+        sys.exit("no EPUBs found under data/")
+    books = [c for chapters in corpora.values() for c in chapters]
+    corpora[f"synthetic {args.scale}x"] = books * args.scale
+
+    header = f"{'corpus':16} {'words':>10} {'impl':10} {'median s':>9} {'peak MiB':>9} {'same':>5}"
+    print("\n" + header)
+    print("-" * len(header))
+    for name, chapters in corpora.items():
+        ref_time, ref_peak, reference = _measure(reference_stats, chapters, args.runs)
+        eng_time, eng_peak, engine = _measure(engine_stats, chapters, args.runs)
+        same = _same(reference, engine)
+        words = reference["total_words"]
+        print(f"{name:16} {words:10,} {'reference':10} {ref_time:9.3f} {ref_peak / 2**20:9.1f}")
+        print(f"{'':16} {'':10} {'engine':10} {eng_time:9.3f} {eng_peak / 2**20:9.1f} {str(same):>5}")
+        if not same:
+            for key in reference:
+                if key != "words_no_stopwords" and not _same({key: reference[key]}, {key: engine[key]}):
+                    print(f"  mismatch in {key}")
+
+
+if __name__ == "__main__":
+    main()
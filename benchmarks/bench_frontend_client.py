@@ -0,0 +1,120 @@
+"""Per-interaction latency of the Streamlit frontends' API calls.
+
+Compares the old pattern (a bare ``requests.get/post`` per call, so a new
+connection each time) with the pooled keep-alive client in src/api_client.py
+for the calls a page makes: the health check on a rerun, a non-streamed
+answer and a streamed answer (time to first token and total). Start the API
+against the fake backends:
+
+    LLM_BACKEND=fake RESULT_CACHE_SQLITE_PATH= uvicorn src.fastapi_app:app --port 8000
+
+    python benchmarks/bench_frontend_client.py --rounds 30
+
+The gap grows with the round-trip time to the API, so also run it with
+``--base-url`` pointing at the API in another container or host.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.api_client import ApiClient, iter_sse_events
+
+QUESTIONS = [
+    ("What is a beautiful deleveraging?", "debt_crisis"),
+    ("Why do incumbents oppose free financial markets?", "capitalism"),
+]
+
+
+def _fresh_health(base_url: str) -> None:
+    requests.get(f"{base_url}/api/health", timeout=10).raise_for_status()
+
+
+def _fresh_ask(base_url: str, body: Dict) -> None:
+    requests.post(f"{base_url}/api/ask", json=body, timeout=60).raise_for_status()
+
+
+def _fresh_stream(base_url: str, body: Dict) -> float:
+    start = time.perf_counter()
+    first = None
+    with requests.post(f"{base_url}/api/ask/stream", json=body, stream=True, timeout=60) as response:
+        for event, _ in iter_sse_events(response):
+            if event == "token" and first is None:
+                first = time.perf_counter() - start
+    return first
+
+
+def _pooled_stream(client: ApiClient, body: Dict) -> float:
+    start = time.perf_counter()
+    first = None
+    for event, _ in client.ask_stream(**body):
+        if event == "token" and first is None:
+            first = time.perf_counter() - start
+    return first
+
+
+def _time(fn: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def _row(name: str, values: List[float]) -> None:
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(len(values) * 0.95))]
+    print(f"{name:34} {statistics.median(values) * 1000:9.1f} {p95 * 1000:9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    client = ApiClient(args.base_url)
+    results: Dict[str, List[float]] = {}
+
+    def add(name: str, seconds: float) -> None:
+        results.setdefault(name, []).append(seconds)
+
+    # Both /api/ask variants are answered from the result cache, so they
+    # differ only in connection handling; "ids" keeps the payload small
+    bodies = [{"question": q, "book_id": b, "source_fields": "ids"} for q, b in QUESTIONS]
+    for body in bodies:
+        client.ask(**body)
+
+    for round_no in range(args.rounds):
+        for body in bodies:
+            # A per-round tag keeps the streamed answers off the result cache
+            fresh_body = {**body, "question": f"{body['question']} (f{round_no})"}
+            pooled_body = {**body, "question": f"{body['question']} (p{round_no})"}
+
+            add("health  fresh connection", _time(lambda: _fresh_health(args.base_url)))
+            add("health  pooled", _time(lambda: client.health(max_age=0)))
+            add("health  pooled, cached (rerun)", _time(lambda: client.health()))
+            add("ask     fresh connection", _time(lambda: _fresh_ask(args.base_url, body)))
+            add("ask     pooled", _time(lambda: client.ask(**body)))
+
+            start = time.perf_counter()
+            add("stream  first token, fresh", _fresh_stream(args.base_url, fresh_body))
+            add("stream  total, fresh", time.perf_counter() - start)
+            start = time.perf_counter()
+            add("stream  first token, pooled", _pooled_stream(client, pooled_body))
+            add("stream  total, pooled", time.perf_counter() - start)
+
+    header = f"{'call':34} {'median ms':>9} {'p95 ms':>9}"
+    print(f"{args.rounds} rounds against {args.base_url}\n")
+    print(header)
+    print("-" * len(header))
+    for name, values in results.items():
+        _row(name, values)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Response size and encoding cost of /api/ask payloads.
+
+Builds a realistic answer with five passages from the local index and
+compares the old encoding path (Pydantic model + stdlib json) against the
+orjson path for each ``source_fields`` option, with and without compression.
+No API key or running server is needed:
+
+    python benchmarks/bench_response_payload.py
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from langchain_community.vectorstores import FAISS
+
+from src.backends import LazyEmbeddings
+from src.compression import GZIP_LEVEL, BROTLI_QUALITY, brotli
+from src.fastapi_app import (
+    QuestionRequest, QuestionResponse, _format_sources, _response,
+)
+from src.rag import _vs_path
+
+
+def _sample_result(book_id: str, n_sources: int):
+    vs = FAISS.load_local(_vs_path(book_id), LazyEmbeddings(), allow_dangerous_deserialization=True)
+    docs = list(vs.docstore._dict.values())[100:100 + n_sources]
+    return {
+        "answer": "A beautiful deleveraging balances deflationary and inflationary levers "
+                  "so that debt burdens fall while growth stays positive. [Source 1] " * 3,
+        "sources": _format_sources(docs),
+        "chunk_ids": [d.id for d in docs],
+        "context_tokens": 1180,
+        "context_tokens_saved": 240,
+        "verified": None,
+        "skipped_stages": [],
+        "answer_mode": "generate",
+        "extractive_confidence": None,
+    }
+
+
+def _time_us(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--book-id", default="debt_crisis")
+    parser.add_argument("--sources", type=int, default=5)
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = _sample_result(args.book_id, args.sources)
+    request = QuestionRequest(question="q", book_id=args.book_id)
+
+    def baseline():
+        # Previous path: build the response model, then FastAPI's JSON encoding
+        model = QuestionResponse(**{**result, "processing_time": 1.0, "cached": False})
+        return JSONResponse(model.model_dump(mode="json")).body
+
+    variants = [("baseline (pydantic + json), full", baseline)]
+    for fields in ("full", "snippet", "ids"):
+        req = request.model_copy(update={"source_fields": fields})
+        variants.append((
+            f"orjson, {fields}",
+            lambda req=req: ORJSONResponse(_response(result, req, 1.0, False)).body,
+        ))
+
+    header = f"{'variant':36} {'encode µs':>10} {'bytes':>8} {'gzip':>8} {'br':>8}"
+    print(header)
+    print("-" * len(header))
+    for name, fn in variants:
+        body = fn()
+        gz = len(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        br = len(brotli.compress(body, quality=BROTLI_QUALITY)) if brotli else "n/a"
+        print(f"{name:36} {_time_us(fn, args.number):10.1f} {len(body):8} {gz:8} {br:>8}")
+
+    full = baseline()
+    gz_us = _time_us(lambda: gzip.compress(full, compresslevel=GZIP_LEVEL), args.number // 4)
+    print(f"\ncompression cost on the full payload: gzip-{GZIP_LEVEL} {gz_us:.1f} µs", end="")
+    if brotli:
+        br_us = _time_us(lambda: brotli.compress(full, quality=BROTLI_QUALITY), args.number // 4)
+        print(f", br-{BROTLI_QUALITY} {br_us:.1f} µs", end="")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Multi-turn latency: one /api/session WebSocket vs stateless /api/ask/stream calls.
+
+Plays the same scripted conversations both ways and reports per-turn
+retrieval time, time to first token and total time. Start the API against the
+fake backends with a realistic embedding latency and no on-disk cache:
+
+    LLM_BACKEND=fake FAKE_EMBED_LATENCY_MS=150 FAKE_GEN_LATENCY_MS=fixed:600 \\
+        RESULT_CACHE_SQLITE_PATH= uvicorn src.fastapi_app:app --port 8000
+
+    python benchmarks/bench_session.py --rounds 5
+
+A fixed generation latency (``FAKE_GEN_LATENCY_MS=fixed:600``) keeps the
+comparison from being lost in generation noise. Each round tags the questions
+that could be answered from the result cache, so neither mode gets cache
+hits. That covers every stateless question and the opening question of each
+session; session follow-ups never use the cache.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+import websockets
+
+CONVERSATIONS = {
+    "debt_crisis": [
+        "What is a beautiful deleveraging?",
+        "Why?",
+        "What causes it to fail?",
+        "Tell me more about that",
+        "And how long does it usually take?",
+    ],
+    "capitalism": [
+        "What is relationship-based finance?",
+        "What are its weaknesses?",
+        "Can you give an example?",
+        "How did it change after the Great Depression?",
+        "Explain further",
+    ],
+}
+
+
+def _with_round(question: str, tag: str) -> str:
+    return f"{question} ({tag})"
+
+
+async def _session_turns(base_url: str, book_id: str, questions: List[str]) -> List[Dict]:
+    ws_url = base_url.replace("http", "ws", 1) + f"/api/session?book_id={book_id}"
+    turns = []
+    async with websockets.connect(ws_url) as ws:
+        await ws.recv()  # session event
+        for question in questions:
+            await ws.send(json.dumps({"question": question, "source_fields": "ids"}))
+            kind = None
+            while True:
+                event = json.loads(await ws.recv())
+                if event["event"] == "sources":
+                    kind = event["turn_kind"]
+                elif event["event"] == "timings":
+                    turns.append({**event, "turn_kind": kind})
+                    break
+                elif event["event"] == "error":
+                    raise RuntimeError(event["detail"])
+    return turns
+
+
+async def _stateless_turns(base_url: str, book_id: str, questions: List[str]) -> List[Dict]:
+    turns = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        for question in questions:
+            body = {"question": question, "book_id": book_id, "source_fields": "ids"}
+            async with client.stream("POST", "/api/ask/stream", json=body) as response:
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event: "):
+                        event = line[len("event: "):]
+                    elif line.startswith("data: ") and event == "timings":
+                        turns.append(json.loads(line[len("data: "):]))
+    return turns
+
+
+def _report(name: str, runs: List[List[Dict]]) -> None:
+    print(f"\n{name}")
+    header = f"{'turn':>4} {'kind':13} {'retrieval ms':>13} {'first token ms':>15} {'total ms':>9}"
+    print(header)
+    print("-" * len(header))
+    totals = []
+    for i in range(len(runs[0])):
+        turn = [run[i] for run in runs]
+        totals.append(sum(t["processing_time"] for t in turn) / len(turn))
+        print(
+            f"{i + 1:>4} {turn[0].get('turn_kind') or '-':13} "
+            f"{statistics.median(t['retrieval_time'] for t in turn) * 1000:13.0f} "
+            f"{statistics.median(t['time_to_first_token'] for t in turn) * 1000:15.0f} "
+            f"{statistics.median(t['processing_time'] for t in turn) * 1000:9.0f}"
+        )
+    print(f"conversation total (mean): {sum(totals) * 1000:.0f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    for book_id, script in CONVERSATIONS.items():
+        session_runs, stateless_runs = [], []
+        for round_no in range(args.rounds):
+            started = time.time()
+            session_runs.append(await _session_turns(
+                args.base_url, book_id, [_with_round(script[0], f"s{round_no}")] + script[1:]
+            ))
+            stateless_runs.append(await _stateless_turns(
+                args.base_url, book_id, [_with_round(q, f"a{round_no}") for q in script]
+            ))
+            print(f"{book_id} round {round_no + 1}/{args.rounds} ({time.time() - started:.1f}s)")
+        _report(f"{book_id}: /api/session (one WebSocket)", session_runs)
+        _report(f"{book_id}: /api/ask/stream (stateless)", stateless_runs)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""Cold-start time of the API, split into import and load phases.
+
+Every run is a fresh interpreter, so nothing is shared between runs. Each run
+reports how long ``import src.fastapi_app`` takes, then how long it takes to
+build the embeddings client and to load the indexes (one after another and
+concurrently, as at startup). With ``--server`` it also starts uvicorn and
+measures how long /api/live and /api/ready take to first answer 200:
+
+    LLM_BACKEND=fake python benchmarks/bench_startup.py --runs 5 --server
+
+``--imports N`` lists the N slowest top-level imports (``python -X importtime``).
+Run from the repository root so the vector stores are found.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the fresh interpreter; prints one JSON line of phase timings
+_CHILD = r"""
+import json, time
+t0 = time.perf_counter()
+import src.fastapi_app as api
+t1 = time.perf_counter()
+api.get_embeddings()
+t2 = time.perf_counter()
+for book_id in api.BOOK_IDS:
+    api.get_vector_store(book_id)
+t3 = time.perf_counter()
+api.vector_stores.clear()
+api.vector_store_versions.clear()
+api.preload_vector_stores()
+t4 = time.perf_counter()
+print("PHASES " + json.dumps({
+    "import": t1 - t0, "embeddings": t2 - t1,
+    "load_sequential": t3 - t2, "load_concurrent": t4 - t3,
+}))
+"""
+
+
+def _run_phases() -> dict:
+    start = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", _CHILD], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    wall = time.perf_counter() - start
+    line = next(l for l in out.splitlines() if l.startswith("PHASES "))
+    phases = json.loads(line[len("PHASES "):])
+    # Interpreter start-up and teardown, outside everything measured in the child
+    phases["interpreter"] = wall - sum(phases.values())
+    phases["process_total"] = wall
+    return phases
+
+
+def _wait_for(client: httpx.Client, url: str, start: float, timeout: float) -> float:
+    while time.perf_counter() - start < timeout:
+        try:
+            if client.get(url).status_code == 200:
+                return time.perf_counter() - start
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+def _run_server(port: int, timeout: float) -> dict:
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "src.fastapi_app:app", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            live = _wait_for(client, f"http://127.0.0.1:{port}/api/live", start, timeout)
+            ready = _wait_for(client, f"http://127.0.0.1:{port}/api/ready", start, timeout)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return {"server_live": live, "server_ready": ready}
+
+
+def _slowest_imports(n: int) -> list:
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.fastapi_app"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in err.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Top level of src.fastapi_app's own imports (two-space indent)
+        if name.startswith("   ") and not name.startswith("    "):
+            rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--server", action="store_true", help="also time /api/live and /api/ready")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--imports", type=int, default=10, metavar="N")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        phases = _run_phases()
+        if args.server:
+            phases.update(_run_server(args.port, args.timeout))
+        runs.append(phases)
+
+    header = f"{'phase':18} {'median s':>9} {'min s':>9} {'max s':>9}"
+    print(f"{args.runs} cold starts, LLM_BACKEND={os.getenv('LLM_BACKEND', 'google')}\n")
+    print(header)
+    print("-" * len(header))
+    for phase in runs[0]:
+        values = [r[phase] for r in runs]
+        print(f"{phase:18} {statistics.median(values):9.3f} {min(values):9.3f} {max(values):9.3f}")
+
+    if args.imports:
+        print(f"\nslowest imports under src.fastapi_app (cumulative s):")
+        for seconds, name in _slowest_imports(args.imports):
+            print(f"  {seconds:7.3f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
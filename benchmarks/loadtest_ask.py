@@ -0,0 +1,103 @@
+"""Concurrent load test for /api/ask.
+
+Start the API against the local fake backends so results reflect our own
+overhead rather than Gemini latency or quota:
+
+    LLM_BACKEND=fake FAKE_GEN_LATENCY_MS=lognormal:600,0.4 \\
+        uvicorn src.fastapi_app:app --port 8000
+
+    python benchmarks/loadtest_ask.py --concurrency 32 --requests 500
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from typing import List
+
+import httpx
+
+QUESTIONS = {
+    "debt_crisis": [
+        "What is a beautiful deleveraging?",
+        "How do central banks respond when interest rates hit zero?",
+        "What are the phases of a short-term debt cycle?",
+        "Why do inflationary depressions happen?",
+        "What role does debt monetization play in a crisis?",
+    ],
+    "capitalism": [
+        "Why do incumbents oppose free financial markets?",
+        "What is relationship-based finance?",
+        "How did the Great Depression change attitudes to markets?",
+        "What role do property rights play in financial development?",
+        "How can openness protect markets from capture?",
+    ],
+}
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(base_url: str, concurrency: int, total: int, unique: bool, seed: int) -> None:
+    rng = random.Random(seed)
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue = asyncio.Queue()
+    for i in range(total):
+        book_id = rng.choice(list(QUESTIONS))
+        question = rng.choice(QUESTIONS[book_id])
+        if unique:
+            question = f"{question} (variant {i})"
+        queue.put_nowait({"question": question, "book_id": book_id})
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                payload = queue.get_nowait()
+                start = time.perf_counter()
+                try:
+                    resp = await client.post("/api/ask", json=payload)
+                    ok = resp.status_code == 200 and resp.json().get("status") == "success"
+                except httpx.HTTPError:
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - wall_start
+
+        stats = (await client.get("/api/stats")).json()
+
+    print(f"requests:     {total} ({errors} errors)")
+    print(f"concurrency:  {concurrency}")
+    print(f"wall time:    {wall:.2f}s")
+    print(f"throughput:   {total / wall:.1f} req/s")
+    print(f"latency mean: {statistics.mean(latencies) * 1000:.1f} ms")
+    for pct in (50, 90, 95, 99):
+        print(f"latency p{pct}:  {_percentile(latencies, pct) * 1000:.1f} ms")
+    print("server stats:")
+    print(json.dumps(stats, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--unique", action="store_true",
+                        help="make every question distinct (defeats coalescing/caching)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.concurrency, args.requests, args.unique, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 from pydantic import BaseModel
 import asyncio
 import json
@@ -13,8 +13,10 @@ from typing import List, Optional, Dict, Any
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.rag import retrieve, generate_answer
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from src.rag import retrieve, agenerate_answer, agenerate_answer_stream, _vs_path
+from src.context_packer import pack_context
+from src.backends import make_embeddings
+from src import metrics
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 
@@ -37,6 +39,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request timing for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Pydantic models
 class QuestionRequest(BaseModel):
     question: str
@@ -47,6 +52,8 @@ class QuestionResponse(BaseModel):
     sources: List[Dict[str, Any]]
     processing_time: float
     status: str = "success"
+    context_tokens: int = 0
+    context_tokens_saved: int = 0
 
 class HealthResponse(BaseModel):
     status: str
@@ -61,18 +68,15 @@ embeddings_model = None
 @lru_cache(maxsize=1)
 def get_embeddings():
     """Get cached embeddings model."""
-    return GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    return make_embeddings("models/embedding-001")
 
 def get_vector_store(book_id: str) -> FAISS:
     """Get cached vector store for a book."""
     if book_id not in vector_stores:
         embeddings = get_embeddings()
-        vs_path = os.path.join(
-            "vector_store",
-            "big_debt_crisis" if book_id == "debt_crisis" else "saving_capitalism",
-        )
+        # The live version of the index, as in the main API (see src.index_store)
         vector_stores[book_id] = FAISS.load_local(
-            vs_path, embeddings, allow_dangerous_deserialization=True
+            _vs_path(book_id), embeddings, allow_dangerous_deserialization=True
         )
     return vector_stores[book_id]
 
@@ -81,58 +85,84 @@ async def startup_event():
     """Initialize expensive resources on startup."""
     global embeddings_model, vector_stores
     
+    def load_book(book_id: str) -> None:
+        try:
+            get_vector_store(book_id)
+            print(f"✅ Vector store loaded for {book_id}")
+        except Exception as e:
+            print(f"❌ Failed to load vector store for {book_id}: {e}")
+
     try:
-        # Initialize embeddings model once
+        # Initialize embeddings model once (the stores share it)
         embeddings_model = get_embeddings()
         print("✅ Embeddings model loaded successfully")
         
-        # Pre-load vector stores
+        # Pre-load vector stores concurrently
         book_ids = ["debt_crisis", "capitalism"]
-        for book_id in book_ids:
-            try:
-                get_vector_store(book_id)
-                print(f"✅ Vector store loaded for {book_id}")
-            except Exception as e:
-                print(f"❌ Failed to load vector store for {book_id}: {e}")
+        await asyncio.gather(*(asyncio.to_thread(load_book, b) for b in book_ids))
                 
     except Exception as e:
         print(f"❌ Startup error: {e}")
 
+def _executor_queue_depth():
+    # asyncio.to_thread runs on the loop's default executor, created on first use
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    if executor is None:
+        return []
+    return [({}, executor._work_queue.qsize())]
+
+metrics.register_index_metrics(vector_stores)
+metrics.CallbackMetric(
+    "rag_executor_queue_depth", "Blocking calls waiting for a worker thread.",
+    _executor_queue_depth,
+)
+
+def _validate_book(book_id: str) -> None:
+    """Raise an HTTPException if the book is unknown or its index is not loaded."""
+    if book_id not in ["debt_crisis", "capitalism"]:
+        raise HTTPException(status_code=400, detail="Invalid book_id")
+
+    if book_id not in vector_stores:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store for {book_id} not loaded"
+        )
+
+def _format_sources(passages: List[Document]) -> List[Dict[str, Any]]:
+    """Convert retrieved passages into the JSON source format."""
+    return [
+        {
+            "content": doc.page_content,
+            "metadata": doc.metadata,
+            "rank": i + 1
+        }
+        for i, doc in enumerate(passages)
+    ]
+
+def _sse_event(event: str, data: Any) -> str:
+    """Encode a single Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
 @app.post("/api/ask", response_model=QuestionResponse)
 async def ask_question(request: QuestionRequest):
     """Async endpoint for asking questions."""
     start_time = time.time()
     
     try:
-        # Validate book_id
-        if request.book_id not in ["debt_crisis", "capitalism"]:
-            raise HTTPException(status_code=400, detail="Invalid book_id")
-        
-        # Check if vector store is loaded
-        if request.book_id not in vector_stores:
-            raise HTTPException(
-                status_code=503, 
-                detail=f"Vector store for {request.book_id} not loaded"
-            )
+        _validate_book(request.book_id)
         
         # Retrieve passages (async)
         passages = await asyncio.to_thread(
             retrieve, request.question, request.book_id
         )
         
-        # Generate answer (async)
-        answer = await asyncio.to_thread(
-            generate_answer, request.question, passages
-        )
+        # Pack passages into the prompt token budget
+        packed = pack_context(passages)
+
+        # Generate answer (native async Gemini call, no worker thread)
+        answer = await agenerate_answer(request.question, passages, packed)
         
-        # Format sources
-        sources = []
-        for i, doc in enumerate(passages):
-            sources.append({
-                "content": doc.page_content,
-                "metadata": doc.metadata,
-                "rank": i + 1
-            })
+        sources = _format_sources(passages)
         
         processing_time = time.time() - start_time
         
@@ -140,7 +170,9 @@ async def ask_question(request: QuestionRequest):
             answer=answer,
             sources=sources,
             processing_time=processing_time,
-            status="success"
+            status="success",
+            context_tokens=packed.tokens_after,
+            context_tokens_saved=packed.tokens_saved
         )
         
     except HTTPException:
@@ -154,6 +186,53 @@ async def ask_question(request: QuestionRequest):
             status="error"
         )
 
+@app.post("/api/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """Stream the answer as Server-Sent Events.
+
+    Events are sent in order: ``sources`` (retrieved passages), one ``token``
+    per generated text chunk, and finally ``timings`` with the stage breakdown.
+    Failures after the stream has started are reported as an ``error`` event.
+    """
+    _validate_book(request.book_id)
+
+    async def event_stream():
+        start_time = time.time()
+        try:
+            passages = await asyncio.to_thread(
+                retrieve, request.question, request.book_id
+            )
+            retrieval_done = time.time()
+            yield _sse_event("sources", {"sources": _format_sources(passages)})
+
+            packed = pack_context(passages)
+            first_token_time = None
+            async for text in agenerate_answer_stream(request.question, passages, packed):
+                if first_token_time is None:
+                    first_token_time = time.time()
+                yield _sse_event("token", {"text": text})
+
+            end_time = time.time()
+            yield _sse_event("timings", {
+                "retrieval_time": retrieval_done - start_time,
+                "time_to_first_token": (first_token_time or end_time) - start_time,
+                "generation_time": end_time - retrieval_done,
+                "processing_time": end_time - start_time,
+                "context_tokens": packed.tokens_after,
+                "context_tokens_saved": packed.tokens_saved,
+            })
+        except Exception as e:
+            yield _sse_event("error", {
+                "detail": f"Error processing request: {str(e)}",
+                "processing_time": time.time() - start_time,
+            })
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
@@ -163,6 +242,11 @@ async def health_check():
         embeddings_model_loaded=embeddings_model is not None
     )
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics."""
+    return Response(metrics.render_all(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/api/books")
 async def get_available_books():
     """Get available books."""
@@ -0,0 +1,150 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+# Threads for blocking work (FAISS/BM25 retrieval, embedding calls). Installed
+# as the event loop's default executor, so every asyncio.to_thread is bounded.
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "8"))
+# Requests allowed to run the pipeline at once; the rest wait in the queue
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "32"))
+# Requests beyond this many waiting are rejected immediately with 429
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+# Requests still waiting after this long are rejected with 503
+ADMISSION_QUEUE_TIMEOUT_S = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_S", "2.0"))
+
+# Weight of the newest sample in the moving average of service time
+_EWMA_ALPHA = 0.2
+
+
+def make_executor(max_workers: int = WORKER_THREADS) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rag-worker")
+
+
+class Overloaded(Exception):
+    """The server is saturated; the client should retry after ``retry_after`` seconds."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """An admitted request's slot; ``release`` is idempotent."""
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """Bounded in-flight work with a bounded, time-limited wait queue.
+
+    Requests beyond ``max_in_flight`` wait for a slot. A request that finds
+    ``max_queue`` others already waiting is rejected with 429, and one that
+    waits longer than ``queue_timeout`` is rejected with 503. Both carry a
+    Retry-After estimate from the current queue depth and the moving average
+    of service time, so a spike fails fast instead of growing latency for
+    everyone.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = ADMISSION_MAX_IN_FLIGHT,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        queue_timeout: float = ADMISSION_QUEUE_TIMEOUT_S,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.total_wait_s = 0.0
+        self.max_wait_s = 0.0
+        self.avg_service_s = 1.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+        return self._semaphore
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely to free up, at least 1."""
+        backlog = (self.queue_depth + 1) / self.max_in_flight
+        return max(1, math.ceil(backlog * self.avg_service_s))
+
+    async def acquire(self) -> Ticket:
+        """Wait for a slot; raises Overloaded when the queue is full or too slow."""
+        semaphore = self._get_semaphore()
+        start = time.monotonic()
+        if not semaphore.locked():
+            # A free slot is taken without suspending, so the next request
+            # already sees it as taken
+            await semaphore.acquire()
+        elif self.queue_depth >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise Overloaded(429, "Server busy: request queue is full", self.retry_after())
+        else:
+            self.queue_depth += 1
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise Overloaded(
+                    503, f"Server busy: no capacity within {self.queue_timeout:.1f}s",
+                    self.retry_after(),
+                )
+            finally:
+                self.queue_depth -= 1
+
+        waited = time.monotonic() - start
+        self.total_wait_s += waited
+        self.max_wait_s = max(self.max_wait_s, waited)
+        self.admitted += 1
+        self.in_flight += 1
+        return Ticket(self)
+
+    def _release(self, service_s: float) -> None:
+        self.in_flight -= 1
+        self.avg_service_s += _EWMA_ALPHA * (service_s - self.avg_service_s)
+        self._get_semaphore().release()
+
+    @asynccontextmanager
+    async def admit(self):
+        ticket = await self.acquire()
+        try:
+            yield
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "avg_queue_wait_ms": self.total_wait_s / self.admitted * 1000 if self.admitted else 0.0,
+            "max_queue_wait_ms": self.max_wait_s * 1000,
+            "avg_service_ms": self.avg_service_s * 1000,
+        }
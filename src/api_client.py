@@ -0,0 +1,176 @@
+"""HTTP client the Streamlit frontends use to talk to the FastAPI backend.
+
+Each frontend process holds one client per API URL. The client wraps a
+``requests.Session``, so requests reuse keep-alive connections from its pool
+instead of paying a TCP (and TLS) handshake each time. The health status is
+cached for a short TTL so a page rerun does not wait on /api/health. Streamed
+answers are read as Server-Sent Events while they arrive.
+"""
+
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+# Connections kept open per client (Streamlit serves every session from one process)
+API_POOL_SIZE = int(os.getenv("API_POOL_SIZE", "10"))
+API_CONNECT_TIMEOUT_S = float(os.getenv("API_CONNECT_TIMEOUT_S", "3"))
+# How long a cached health status is shown before the API is asked again
+API_HEALTH_TTL_S = float(os.getenv("API_HEALTH_TTL_S", "10"))
+HEALTH_TIMEOUT = (2.0, 5.0)
+
+
+class ApiError(Exception):
+    """Non-2xx answer from the API (or an ``error`` event in a stream)."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(f"API error ({status_code}): {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class HealthStatus:
+    ok: bool
+    status_code: Optional[int] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    checked_at: float = 0.0
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.checked_at
+
+
+def iter_sse_events(response: requests.Response) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ``(event, data)`` pairs from a streaming Server-Sent Events response."""
+    response.encoding = "utf-8"
+    event, data_lines = "message", []
+    # chunk_size=None hands over each chunk as soon as it arrives
+    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].lstrip())
+
+
+def _detail(response: requests.Response) -> str:
+    try:
+        return str(response.json().get("detail", response.text))
+    except ValueError:
+        return response.text
+
+
+class ApiClient:
+    """Pooled keep-alive client for one API base URL; safe to share across threads."""
+
+    def __init__(self, base_url: str = API_URL, pool_size: int = API_POOL_SIZE,
+                 health_ttl: float = API_HEALTH_TTL_S):
+        self.base_url = base_url.rstrip("/")
+        self.health_ttl = health_ttl
+        self.session = requests.Session()
+        # Retry only idempotent requests that failed to connect (e.g. a
+        # keep-alive connection the server already closed); never a POST
+        retry = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.1,
+                      allowed_methods=frozenset({"GET", "HEAD"}))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._health: Optional[HealthStatus] = None
+        self._health_lock = threading.Lock()
+        self.requests = 0
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def _timeout(self, read: float) -> Tuple[float, float]:
+        return (API_CONNECT_TIMEOUT_S, read)
+
+    def get_json(self, path: str, timeout: float = 30, **params) -> Dict[str, Any]:
+        self.requests += 1
+        response = self.session.get(self._url(path), params=params or None, timeout=self._timeout(timeout))
+        if response.status_code != 200:
+            raise ApiError(response.status_code, _detail(response))
+        return response.json()
+
+    def post_json(self, path: str, body: Dict[str, Any], timeout: float = 60) -> Dict[str, Any]:
+        self.requests += 1
+        response = self.session.post(self._url(path), json=body, timeout=self._timeout(timeout))
+        if response.status_code != 200:
+            raise ApiError(response.status_code, _detail(response))
+        return response.json()
+
+    # -- endpoints ------------------------------------------------------------
+
+    def health(self, max_age: Optional[float] = None) -> HealthStatus:
+        """/api/health, answered from cache while it is younger than ``max_age``.
+
+        ``max_age`` defaults to the client's TTL; pass 0 to force a check.
+        Concurrent callers share one in-flight check.
+        """
+        max_age = self.health_ttl if max_age is None else max_age
+        with self._health_lock:
+            if self._health is not None and self._health.age < max_age:
+                return self._health
+            try:
+                self.requests += 1
+                response = self.session.get(self._url("/api/health"), timeout=HEALTH_TIMEOUT)
+                status = HealthStatus(
+                    ok=response.status_code == 200,
+                    status_code=response.status_code,
+                    data=response.json() if response.status_code == 200 else {},
+                    error=None if response.status_code == 200 else _detail(response),
+                )
+            except (requests.RequestException, ValueError) as e:
+                status = HealthStatus(ok=False, error=str(e))
+            status.checked_at = time.monotonic()
+            self._health = status
+            return status
+
+    def ask(self, question: str, book_id: str, timeout: float = 60, **fields) -> Dict[str, Any]:
+        return self.post_json("/api/ask", {"question": question, "book_id": book_id, **fields}, timeout)
+
+    def ask_stream(self, question: str, book_id: str, timeout: float = 60,
+                   **fields) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield the ``sources``, ``token``, ``timings`` events of /api/ask/stream.
+
+        Raises ApiError for a non-200 response or an ``error`` event. The
+        connection goes back to the pool once the stream is read to the end
+        or the generator is closed.
+        """
+        self.requests += 1
+        body = {"question": question, "book_id": book_id, **fields}
+        with self.session.post(self._url("/api/ask/stream"), json=body, stream=True,
+                               timeout=self._timeout(timeout)) as response:
+            if response.status_code != 200:
+                raise ApiError(response.status_code, _detail(response))
+            for event, data in iter_sse_events(response):
+                if event == "error":
+                    raise ApiError(data.get("status_code", 500), data.get("detail", ""))
+                yield event, data
+
+    def eda_summary(self, book_id: str, include_wordcloud: bool = True, timeout: float = 120) -> Dict[str, Any]:
+        return self.get_json(
+            "/api/eda/summary", timeout=timeout, book_id=book_id, include_wordcloud=include_wordcloud
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+
+@lru_cache(maxsize=None)
+def get_api_client(base_url: str = API_URL) -> ApiClient:
+    """Process-wide client for ``base_url``; Streamlit reruns and sessions share it."""
+    return ApiClient(base_url)
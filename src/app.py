@@ -1,13 +1,18 @@
 import streamlit as st
 import os
+import queue
 import sys
+import threading
 from dotenv import load_dotenv
-import time
+from typing import Any, Dict, Iterator, List
 
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from src.rag import retrieve, generate_answer, verify_answer
-from src.data_ingestion import ingest_book
+from src.rag import (
+    retrieve, generate_answer_stream, verify_answer, load_vector_store, vector_store_version,
+)
+from src.context_packer import pack_context
+from src.ingest_jobs import IngestJobs, JobConflict, ACTIVE_STATES
 from src.eda_page import show_eda_page
 
 
@@ -24,6 +29,104 @@ st.set_page_config(
 
 st.title("📚 Closed Book QA for R Bhargava & Associates")
 
+# -----------------------------------------------------------------------------
+# Shared resources & pipeline
+# -----------------------------------------------------------------------------
+
+
+@st.cache_resource(max_entries=4, show_spinner="Loading book index...")
+def get_vector_store(book_id: str, version: str):
+    """Index shared by every session; a re-ingest changes ``version`` and reloads it."""
+    return load_vector_store(book_id)
+
+
+def _source_dict(doc) -> Dict[str, Any]:
+    """What the Sources expander shows; kept in session_state instead of the Document."""
+    meta = doc.metadata
+    return {
+        "id": doc.id,
+        "chapter": meta.get("chapter", "N/A"),
+        "pdf_page": meta.get("pdf_page", "N/A"),
+        "book_id": meta.get("book_id"),
+        "content": doc.page_content,
+    }
+
+
+def _run_pipeline(question: str, book_id: str, vs, events: "queue.Queue") -> None:
+    """Retrieve, stream the answer and verify it; runs on a worker thread.
+
+    Results go to ``events`` as ("sources" | "token" | "verified" | "error", value)
+    pairs followed by ("done", None). Only the script thread calls Streamlit.
+    """
+    try:
+        passages = retrieve(question, book_id, vs=vs)
+        events.put(("sources", [_source_dict(doc) for doc in passages]))
+        answer = ""
+        for text in generate_answer_stream(question, passages, pack_context(passages)):
+            answer += text
+            events.put(("token", text))
+        # Cheap: only borderline answers reach the LLM verifier
+        events.put(("verified", verify_answer(answer, passages)))
+    except Exception as e:
+        events.put(("error", e))
+    finally:
+        events.put(("done", None))
+
+
+def _tokens(events: "queue.Queue", result: Dict[str, Any]) -> Iterator[str]:
+    """Yield answer text from the worker; other events land in ``result``."""
+    while True:
+        kind, value = events.get()
+        if kind == "done":
+            return
+        if kind == "token":
+            yield value
+        else:
+            result[kind] = value
+
+
+def show_sources(sources: List[Dict[str, Any]]) -> None:
+    with st.expander("Sources"):
+        for i, src in enumerate(sources):
+            st.write(
+                f"**Source {i+1}** | "
+                f"Chapter: `{src['chapter']}` | "
+                f"PDF Page (est.): `{src['pdf_page']}` | "
+                f"Book ID: `{src['book_id']}`"
+            )
+            st.info(src["content"])
+
+
+@st.cache_resource
+def get_ingest_jobs() -> IngestJobs:
+    """Ingestion runner shared by every session of this app."""
+    return IngestJobs()
+
+
+def _ingest_jobs_panel(polling: bool) -> None:
+    latest = {}
+    for job in get_ingest_jobs().list():  # newest first
+        latest.setdefault(job["book_id"], job)
+    for job in latest.values():
+        if job["state"] in ACTIVE_STATES:
+            phase = job["phase"] or "queued"
+            st.progress(job["progress"], text=f"Ingesting `{job['book_id']}`: {phase}")
+            if st.button("Cancel", key=f"cancel-{job['id']}"):
+                get_ingest_jobs().cancel(job["id"])
+        elif job["state"] == "succeeded":
+            st.success(f"`{job['book_id']}` ingested.")
+        else:
+            st.error(f"`{job['book_id']}` ingestion {job['state']}: {job['error'] or ''}")
+    if polling and not any(j["state"] in ACTIVE_STATES for j in latest.values()):
+        st.rerun()  # everything finished: redraw once without polling
+
+
+def show_ingest_jobs() -> None:
+    """Latest job per book; polls every second while any is still running."""
+    active = any(j["state"] in ACTIVE_STATES for j in get_ingest_jobs().list())
+    st.fragment(_ingest_jobs_panel, run_every=1.0 if active else None)(active)
+
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -55,17 +158,13 @@ with st.sidebar:
     # Ingestion trigger
     st.header("Data Management")
     if st.button("Re-ingest Both Books"):
-        with st.spinner("Ingesting 'Big Debt Crisis'..."):
-            ingest_book(
-                "debt_crisis",
-                "data/BigDebtCrisis_RayDalio.epub",
-            )
-        with st.spinner("Ingesting 'Saving Capitalism'..."):
-            ingest_book(
-                "capitalism",
-                "data/SavingCapitalismFromCapitalist_RaghuramRajan_LuigiZingales.epub",
-            )
-        st.success("Ingestion complete for both books.")
+        # Runs in background processes (both books at once); the app stays usable
+        for book_id in ("debt_crisis", "capitalism"):
+            try:
+                get_ingest_jobs().submit(book_id)
+            except JobConflict as e:
+                st.warning(str(e))
+    show_ingest_jobs()
 
     # View EDA
     if st.button("📊 View EDA"):
@@ -89,11 +188,10 @@ else:
         if message.get("book_id") == st.session_state.book_id:
             with st.chat_message(message["role"]):
                 st.markdown(message["content"])
+                if message.get("verified") is False:
+                    st.warning("⚠️ Parts of this answer may not be supported by the book.")
                 if "sources" in message:
-                    with st.expander("Sources"):
-                        for i, doc in enumerate(message["sources"]):
-                            st.write(f"**Source {i+1}** (Metadata: {doc.metadata})")
-                            st.info(doc.page_content)
+                    show_sources(message["sources"])
 
 
     # Handle new user input
@@ -105,35 +203,37 @@ else:
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        # Generate and display assistant response
+        # Generate and display assistant response. The pipeline runs on a
+        # worker thread; this thread only renders what it produces.
+        book_id = st.session_state.book_id
+        vs = get_vector_store(book_id, vector_store_version(book_id))
+        events: "queue.Queue" = queue.Queue()
+        threading.Thread(target=_run_pipeline, args=(prompt, book_id, vs, events), daemon=True).start()
+
         with st.chat_message("assistant"):
-            with st.spinner("Thinking..."):
-                passages = retrieve(prompt, st.session_state.book_id)
-                answer = generate_answer(prompt, passages)
-                # verification = verify_answer(answer, passages) # Optional
-
-                st.markdown(answer)
-
-                # Display sources
-                with st.expander("Sources"):
-                    for i, doc in enumerate(passages):
-                        meta = doc.metadata
-                        st.write(
-                            f"**Source {i+1}** | "
-                            f"Chapter: `{meta.get('chapter', 'N/A')}` | "
-                            f"PDF Page (est.): `{meta.get('pdf_page', 'N/A')}` | "
-                            f"Book ID: `{meta.get('book_id')}`"
-                        )
-                        st.info(doc.page_content)
-                        # Future: f"PDF Page: ~{meta.get('pdf_page', 'N/A')}"
+            result: Dict[str, Any] = {}
+            with st.spinner("Searching the book..."):
+                # Sources (or an error) arrive before the first token
+                kind, value = events.get()
+                result[kind] = value
+            if "error" in result or kind == "done":
+                st.error(f"Could not answer: {result.get('error', 'no result')}")
+                st.stop()
+            answer = st.write_stream(_tokens(events, result))
+            if "error" in result:
+                st.error(f"Answer interrupted: {result['error']}")
+            if result.get("verified") is False:
+                st.warning("⚠️ Parts of this answer may not be supported by the book.")
+            show_sources(result["sources"])
 
             # Add assistant message to history
             st.session_state.messages.append(
                 {
                     "role": "assistant",
                     "content": answer,
-                    "sources": passages,
-                    "book_id": st.session_state.book_id,
+                    "sources": result["sources"],
+                    "verified": result.get("verified"),
+                    "book_id": book_id,
                 }
             )
 
@@ -0,0 +1,67 @@
+import os
+
+from langchain.embeddings.base import Embeddings
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "google" talks to the Gemini APIs; "fake" uses the local stand-ins in
+# src/fake_backends.py (no network, simulated latency) for load testing.
+LLM_BACKEND = os.getenv("LLM_BACKEND", "google").lower()
+EMBED_MODEL = "models/embedding-001"
+
+# -----------------------------------------------------------------------------
+# Backend factories
+# -----------------------------------------------------------------------------
+
+
+def make_embeddings(model: str = EMBED_MODEL) -> Embeddings:
+    """Embedding client for the configured backend."""
+    if LLM_BACKEND == "fake":
+        from src.fake_backends import FakeEmbeddings
+
+        return FakeEmbeddings(model=model)
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return GoogleGenerativeAIEmbeddings(model=model)
+
+
+def make_generative_model(model_name: str, generation_config: dict = None):
+    """Generation model for the configured backend."""
+    if LLM_BACKEND == "fake":
+        from src.fake_backends import FakeGenerativeModel
+
+        return FakeGenerativeModel(model_name, generation_config=generation_config)
+
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    return genai.GenerativeModel(model_name, generation_config=generation_config)
+
+
+class LazyEmbeddings(Embeddings):
+    """Embeddings that build their client on first use in each process.
+
+    Indexes loaded by the pre-fork master (src/serve.py) hold one of these, so
+    no gRPC channel is created before the fork and every worker gets its own.
+    """
+
+    def __init__(self, model: str = EMBED_MODEL):
+        self.model = model
+        self._client = None
+        self._pid = None
+
+    @property
+    def client(self) -> Embeddings:
+        if self._client is None or self._pid != os.getpid():
+            self._client = make_embeddings(self.model)
+            self._pid = os.getpid()
+        return self._client
+
+    def embed_documents(self, texts):
+        return self.client.embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.client.embed_query(text)
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# -----------------------------------------------------------------------------
+# Singleflight
+# -----------------------------------------------------------------------------
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key starts ``fn`` as a task; callers arriving while
+    it is still running await the same task and receive the same result or
+    exception. The task is shielded, so a waiter that disconnects or times
+    out does not cancel the work for the others. Keys are forgotten as soon as
+    the task finishes, so this never serves stale results.
+
+    Every waiter passes its own ``timeout``; the execution itself runs with
+    whatever limits ``fn`` of the first caller has. Callers that must not
+    hand their limits to others pass ``lead=False``: they join an execution
+    already in flight, or else run ``fn`` on their own without registering it.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: Optional[float] = None,
+        lead: bool = True,
+    ) -> T:
+        """Result of ``fn`` for ``key``; raises asyncio.TimeoutError after ``timeout`` seconds."""
+        self.calls += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            self.executions += 1
+            if not lead:
+                return await asyncio.wait_for(fn(), timeout)
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, key=key: self._on_done(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieving the exception here also stops asyncio from logging it
+        # when every waiter has gone away
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "in_flight": len(self._in_flight),
+        }
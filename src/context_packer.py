@@ -0,0 +1,151 @@
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional
+
+import tiktoken
+from langchain.schema import Document
+
+from src.utils import split_sentences
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+# tiktoken encoding used to count tokens, or "chars" for the character estimate.
+# Gemini's tokenizer is not available offline, so either one is a proxy.
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")
+# Characters per token for the estimate (English prose averages about 4)
+CHARS_PER_TOKEN = 4
+# Below this many tokens a truncated tail passage is not worth including
+MIN_PARTIAL_TOKENS = 40
+# Shorter fragments are kept even if repeated; they are too generic to dedupe
+MIN_DEDUPE_CHARS = 20
+
+# -----------------------------------------------------------------------------
+# Token counting
+# -----------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Optional[tiktoken.Encoding]:
+    """The proxy tokenizer that sized the chunks at ingestion, if it can load.
+
+    tiktoken downloads the encoding on first use; without network access (and
+    no cached copy) token counts fall back to the character estimate instead
+    of failing every request.
+    """
+    if CONTEXT_TOKENIZER == "chars":
+        return None
+    try:
+        return tiktoken.get_encoding(CONTEXT_TOKENIZER)
+    except Exception as e:
+        print(f"❌ Tokenizer {CONTEXT_TOKENIZER} unavailable, estimating tokens from characters: {e}")
+        return None
+
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    enc = _encoding()
+    if enc is None:
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+        cut = text.rfind(" ", 0, max_chars + 1)
+        return text[:cut if cut > 0 else max_chars]
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+
+# -----------------------------------------------------------------------------
+# Sentence-level redundancy
+# -----------------------------------------------------------------------------
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _strip_repeated_prefix(sentence: str, kept_text: str) -> str:
+    """Remove the longest leading run of words already present in ``kept_text``.
+
+    ``kept_text`` is normalized text that starts and ends with a space, so a
+    run only matches whole words there and never cuts one in half.
+
+    Neighbouring chunks overlap by a few tokens, so a passage usually starts
+    with the tail of a sentence from the previous chunk. Returns an empty
+    string when the whole sentence is redundant.
+    """
+    words = list(re.finditer(r"[A-Za-z0-9]+", sentence))
+    for n in range(len(words), 0, -1):
+        prefix = " ".join(w.group().lower() for w in words[:n])
+        if len(prefix) < MIN_DEDUPE_CHARS:
+            break
+        if f" {prefix} " in kept_text:
+            if n == len(words):
+                return ""
+            return sentence[words[n].start():]
+    return sentence
+
+
+# -----------------------------------------------------------------------------
+# Packing
+# -----------------------------------------------------------------------------
+
+
+@dataclass
+class PackedContext:
+    passages: List[str] = field(default_factory=list)
+    tokens_before: int = 0
+    tokens_after: int = 0
+    passages_dropped: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def pack_context(passages: List[Document], budget: int = CONTEXT_TOKEN_BUDGET) -> PackedContext:
+    """Pack ranked passages into at most ``budget`` tokens.
+
+    Passages are taken in rank order. Text already present in a higher-ranked
+    passage (repeated sentences and the overlap between neighbouring chunks) is
+    removed first; the passage that crosses the budget is truncated, and
+    everything after it is dropped.
+    """
+    packed = PackedContext()
+    kept_text = " "  # normalized text of everything packed so far, space-delimited
+
+    for doc in passages:
+        packed.tokens_before += count_tokens(doc.page_content)
+        remaining = budget - packed.tokens_after
+        if remaining < MIN_PARTIAL_TOKENS:
+            packed.passages_dropped += 1
+            continue
+
+        sentences = []
+        for sentence in split_sentences(doc.page_content):
+            sentence = _strip_repeated_prefix(sentence, kept_text)
+            if not sentence:
+                continue
+            sentences.append(sentence)
+            kept_text += _normalize(sentence) + " "
+        if not sentences:
+            packed.passages_dropped += 1
+            continue
+
+        text = " ".join(sentences)
+        n_tokens = count_tokens(text)
+        if n_tokens > remaining:
+            text = _truncate_tokens(text, remaining)
+            n_tokens = count_tokens(text)
+
+        packed.passages.append(text)
+        packed.tokens_after += n_tokens
+
+    return packed
@@ -1,23 +1,40 @@
 import os
-import uuid
 import json
+import shutil
 import ebooklib
 from ebooklib import epub
 from bs4 import BeautifulSoup
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Optional
 from tqdm import tqdm
 from dotenv import load_dotenv
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 from .utils import estimate_pdf_page, find_image_refs, _approx_token_len
+from .backends import make_embeddings
+from . import index_store
 
 load_dotenv()
 CHUNK_SIZE_TOKENS = 220
 CHUNK_OVERLAP_TOKENS = 15
 EMBED_MODEL = "models/embedding-001"
+# Chunks per embedding request during ingestion
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "100"))
+
+BOOK_EPUBS = {
+    "debt_crisis": "data/BigDebtCrisis_RayDalio.epub",
+    "capitalism": "data/SavingCapitalismFromCapitalist_RaghuramRajan_LuigiZingales.epub",
+}
+# Ingestion phases, in order, as reported to ``progress``
+PHASES = ("parse", "chunk", "embed", "persist")
+
+# Called as progress(phase, done, total); may raise to abort the ingestion
+Progress = Callable[[str, int, int], None]
+
+
+def _no_progress(phase: str, done: int, total: int) -> None:
+    pass
 
 # -----------------------------------------------------------------------------
 # Utilities
@@ -33,28 +50,90 @@ def clean_text(html: str, book_id: str) -> str:
     return soup.get_text(separator=" ", strip=True)
 
 
-def _chunk_docs(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+def chunk_id(book_id: str, position: int) -> str:
+    return f"{book_id}-{position:05d}"
+
+
+def _chunk_docs(docs: List[Dict[str, Any]], progress: Progress = _no_progress) -> List[Dict[str, Any]]:
     splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
         model_name="gpt-4",  # A reasonable proxy for Gemini's tokenizer
         chunk_size=CHUNK_SIZE_TOKENS,
         chunk_overlap=CHUNK_OVERLAP_TOKENS,
     )
     chunked_docs = []
-    for doc in tqdm(docs, desc="Chunking documents"):
+    for i, doc in enumerate(tqdm(docs, desc="Chunking documents")):
         chunks = splitter.split_text(doc["text"])
         for chunk in chunks:
-            new_doc = doc.copy()
-            new_doc["text"] = chunk
-            chunked_docs.append(new_doc)
+            # Each chunk gets its own metadata dict; a shallow copy would share
+            # one dict (and so one chunk_id) across all chunks of a chapter
+            chunked_docs.append({**doc, "text": chunk, "metadata": dict(doc["metadata"])})
+        progress("chunk", i + 1, len(docs))
     return chunked_docs
 
 
-def ingest_book(book_id: str, epub_path: str, pdf_path: str = None) -> None:
+def _embed_texts(embeddings, texts: List[str], progress: Progress = _no_progress) -> List[List[float]]:
+    vectors: List[List[float]] = []
+    progress("embed", 0, len(texts))
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embeddings.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+        progress("embed", len(vectors), len(texts))
+    return vectors
+
+
+def _persist(
+    vs: FAISS,
+    metadatas: List[Dict[str, Any]],
+    book_id: str,
+    epub_path: str,
+    progress: Progress = _no_progress,
+) -> str:
+    """Write the index and EDA summary as a new version, then make it live.
+
+    Every file goes into a fresh version directory, and the switch is one
+    atomic replace of the book's CURRENT pointer (see src.index_store). A
+    server that reloads while this runs loads either the old version or the
+    new one, never files from both. Returns the new version's directory.
+    """
+    from .eda_api import EDA_ARTIFACT_NAME, build_eda_artifact
+
+    # Left behind by ingestions that were killed (e.g. cancelled mid-persist)
+    index_store.clean_stale(book_id)
+    staged = index_store.staging_dir(book_id)
+    try:
+        vs.save_local(staged)
+        with open(os.path.join(staged, "metadata.json"), "w", encoding="utf-8") as fp:
+            json.dump(metadatas, fp, ensure_ascii=False, indent=2)
+        try:
+            build_eda_artifact(book_id, staged, epub_path)
+        except Exception as e:
+            # Not worth failing the ingestion over; the API builds it on first request
+            print(f"❌ EDA artifact for {book_id} not built: {e}")
+        # Last point at which the ingestion can still be aborted
+        progress("persist", 0, 1)
+    except BaseException:
+        shutil.rmtree(staged, ignore_errors=True)
+        raise
+    version_dir = index_store.publish(book_id, staged)
+    progress("persist", 1, 1)
+    return version_dir
+
+
+def ingest_book(
+    book_id: str, epub_path: str, pdf_path: str = None, progress: Optional[Progress] = None
+) -> None:
+    """Parse, chunk and embed a book and persist its FAISS index.
+
+    ``progress(phase, done, total)`` is called as each phase advances (see
+    PHASES); an exception it raises aborts the ingestion before anything is
+    written over the current index.
+    """
     if book_id not in {"debt_crisis", "capitalism"}:
         raise ValueError("book_id must be 'debt_crisis' or 'capitalism'")
+    progress = progress or _no_progress
 
     print(f"Ingesting {book_id} from {epub_path} ...")
     book = epub.read_epub(epub_path)
+    items = list(book.get_items())
 
     # ------------------------------------------------------------------
     # 1. Extract content and initial metadata from EPUB items
@@ -62,7 +141,8 @@ def ingest_book(book_id: str, epub_path: str, pdf_path: str = None) -> None:
     docs_to_chunk = []
     token_offset = 0
 
-    for item in tqdm(book.get_items(), desc="Parsing EPUB items"):
+    for i, item in enumerate(tqdm(items, desc="Parsing EPUB items")):
+        progress("parse", i + 1, len(items))
         if item.get_type() != ebooklib.ITEM_DOCUMENT:
             continue
         
@@ -92,46 +172,37 @@ def ingest_book(book_id: str, epub_path: str, pdf_path: str = None) -> None:
     # ------------------------------------------------------------------
     # 2. Chunk documents
     # ------------------------------------------------------------------
-    chunked_docs = _chunk_docs(docs_to_chunk)
+    chunked_docs = _chunk_docs(docs_to_chunk, progress)
     texts = [doc["text"] for doc in chunked_docs]
     metadatas = [doc["metadata"] for doc in chunked_docs]
     
-    # Add unique chunk ID to each metadata object
-    for meta in metadatas:
-        meta["chunk_id"] = str(uuid.uuid4())
+    # Deterministic, globally unique chunk IDs ("<book_id>-<position>"). They
+    # double as the docstore IDs, so a passage can be fetched by its chunk ID
+    chunk_ids = [chunk_id(book_id, i) for i in range(len(texts))]
+    for meta, cid in zip(metadatas, chunk_ids):
+        meta["chunk_id"] = cid
         
     print(f"Total chunks created: {len(texts)}")
 
     # ------------------------------------------------------------------
     # 3. Embeddings & Vector store
     # ------------------------------------------------------------------
-    embeddings = GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
-    vs = FAISS.from_texts(texts=texts, embedding=embeddings, metadatas=metadatas)
+    # Embedded in batches so progress can be reported (and a cancel noticed)
+    embeddings = make_embeddings(EMBED_MODEL)
+    vectors = _embed_texts(embeddings, texts, progress)
+    vs = FAISS.from_embeddings(
+        list(zip(texts, vectors)), embedding=embeddings, metadatas=metadatas, ids=chunk_ids
+    )
 
     # ------------------------------------------------------------------
     # 4. Persist
     # ------------------------------------------------------------------
-    out_dir_map = {"debt_crisis": "big_debt_crisis", "capitalism": "saving_capitalism"}
-    out_dir = os.path.join("vector_store", out_dir_map[book_id])
-    os.makedirs(out_dir, exist_ok=True)
-    vs.save_local(out_dir)
-
-    meta_json_path = os.path.join(out_dir, "metadata.json")
-    with open(meta_json_path, "w", encoding="utf-8") as fp:
-        json.dump(metadatas, fp, ensure_ascii=False, indent=2)
+    out_dir = _persist(vs, metadatas, book_id, epub_path, progress)
 
     print(f"Finished ingesting {book_id}. Index stored at {out_dir}")
 
 # -----------------------------------------------------------------------------
 if __name__ == "__main__":
-    ingest_book(
-        "debt_crisis",
-        "data/BigDebtCrisis_RayDalio.epub",
-        "data/BigDebtCrisis_RayDalio.pdf",
-    )
-    ingest_book(
-        "capitalism",
-        "data/SavingCapitalismFromCapitalist_RaghuramRajan_LuigiZingales.epub",
-        "data/SavingCapitalismFromCapitalist_RaghuramRajan_LuigiZingales.pdf",
-    )
+    for book_id, epub_path in BOOK_EPUBS.items():
+        ingest_book(book_id, epub_path, epub_path.replace(".epub", ".pdf"))
 
@@ -0,0 +1,65 @@
+import os
+import time
+from typing import List, Optional
+
+# Estimated cost of each stage, used to decide what to drop when the request
+# budget runs low. Generation is always attempted; these reserves protect it.
+GENERATION_RESERVE_S = float(os.getenv("DEADLINE_GENERATION_RESERVE_S", "3.0"))
+FULL_RETRIEVAL_COST_S = float(os.getenv("DEADLINE_FULL_RETRIEVAL_COST_S", "1.0"))
+RERANK_COST_S = float(os.getenv("DEADLINE_RERANK_COST_S", "0.5"))
+VERIFY_COST_S = float(os.getenv("DEADLINE_VERIFY_COST_S", "3.0"))
+
+# Degradation order as the budget shrinks: first rerank is skipped, then the
+# candidate set is shrunk, and verification is dropped after generation.
+SKIP_RERANK_BELOW_S = GENERATION_RESERVE_S + FULL_RETRIEVAL_COST_S + RERANK_COST_S
+SHRINK_K_BELOW_S = GENERATION_RESERVE_S + FULL_RETRIEVAL_COST_S
+
+
+class DeadlineExceeded(Exception):
+    """The request budget ran out before a required stage could run."""
+
+
+class Deadline:
+    """Time budget for one request, shared by every pipeline stage.
+
+    Stages call ``has(seconds)`` before optional work and record what they
+    dropped with ``skip(stage)``; the list ends up in the API response. A
+    deadline created without a budget never runs low.
+    """
+
+    def __init__(self, budget_s: Optional[float] = None):
+        self.budget_s = budget_s
+        self.expires_at = time.monotonic() + budget_s if budget_s else None
+        self.skipped: List[str] = []
+
+    @classmethod
+    def from_ms(cls, budget_ms: Optional[float]) -> "Deadline":
+        return cls(budget_ms / 1000 if budget_ms else None)
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float("inf")
+        return self.expires_at - time.monotonic()
+
+    def has(self, seconds: float) -> bool:
+        return self.remaining() >= seconds
+
+    def skip(self, stage: str) -> None:
+        if stage not in self.skipped:
+            self.skipped.append(stage)
+
+    def timeout(self) -> Optional[float]:
+        """Remaining seconds for a network call, or None without a budget.
+
+        Raises DeadlineExceeded when nothing is left.
+        """
+        if self.expires_at is None:
+            return None
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"Deadline of {self.budget_s:.2f}s exceeded")
+        return remaining
+
+    @property
+    def degraded(self) -> bool:
+        return bool(self.skipped)
@@ -1,17 +1,37 @@
+"""EDA summaries of the books, precomputed at ingest and served from disk.
+
+Computing a summary means parsing the whole EPUB, so it is done once: when a
+book is ingested (or with ``python -m src.eda_api``) the summary is written
+as a versioned artifact, ``eda_summary.json``, next to the book's index. The
+API serves the summary with an ETag and builds the artifact only if it is
+missing, was written by an older EDA_ARTIFACT_VERSION, or was computed from
+an EPUB other than the one now in data/. Artifacts are generated, never
+committed; the server builds missing ones at startup.
+"""
+
 import base64
+import hashlib
 import io
+import json
 import os
 import re
-from collections import Counter
+import sys
+import threading
+import time
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Tuple, Any
+from typing import Dict, Iterable, Iterator, List, Tuple, Any, Optional
 
-from bs4 import BeautifulSoup
-from ebooklib import epub
-from wordcloud import WordCloud
-import numpy as np
+from src.eda_stats import CorpusStats
+
+# Bump when the summary's content or format changes; older artifacts are rebuilt
+EDA_ARTIFACT_VERSION = 3
+EDA_ARTIFACT_NAME = "eda_summary.json"
+# Only present in the full summary
+WORDCLOUD_FIELD = "wordcloud_png_base64"
+# WordCloud's default: bigrams scoring above it are drawn as one phrase
+COLLOCATION_THRESHOLD = 30
 
 
 STOPWORDS = {
@@ -31,15 +51,12 @@ def _book_to_epub_path(book_id: str) -> Path:
         raise ValueError("Unsupported book_id. Use 'debt_crisis' or 'capitalism'.")
 
 
-def _simple_tokenize(text: str) -> List[str]:
-    return re.findall(r"[A-Za-z']+", text.lower())
-
+def _iter_chapters(epub_path: Path) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """Yield ``(chapter_info, text)`` per non-empty document, whitespace-normalized."""
+    from bs4 import BeautifulSoup
+    from ebooklib import epub
 
-def _extract_texts(epub_path: Path) -> Tuple[str, List[Dict[str, Any]]]:
     book = epub.read_epub(str(epub_path))
-    all_text: str = ""
-    chapter_info: List[Dict[str, Any]] = []
-
     for item in book.get_items():
         if item.get_type() == 9:  # ebooklib.ITEM_DOCUMENT
             soup = BeautifulSoup(item.get_content(), 'html.parser')
@@ -48,78 +65,47 @@ def _extract_texts(epub_path: Path) -> Tuple[str, List[Dict[str, Any]]]:
             text = soup.get_text(separator=" ")
             text = re.sub(r"\s+", " ", text).strip()
             if text:
-                all_text += text + " "
-                chapter_info.append({
-                    "id": item.get_id(),
-                    "href": item.get_name(),
-                    "text_length": len(text),
-                    "word_count": len(_simple_tokenize(text)),
-                })
-    return all_text, chapter_info
-
-
-def _split_sentences(all_text: str) -> List[str]:
-    # Simple sentence splitter to avoid heavy NLTK dependency
-    # Splits on ., !, ? followed by whitespace
-    parts = re.split(r"(?<=[\.!\?])\s+", all_text)
-    # Filter out very short fragments
-    return [p.strip() for p in parts if len(p.strip()) > 0]
-
-
-def _compute_stats(all_text: str, chapter_info: List[Dict[str, Any]]) -> Dict[str, Any]:
-    words = _simple_tokenize(all_text)
-    words_no_stop = [w for w in words if w.isalpha() and w not in STOPWORDS]
-
-    bigrams: List[str] = []
-    for i in range(len(words_no_stop) - 1):
-        bigrams.append(f"{words_no_stop[i]} {words_no_stop[i+1]}")
-
-    word_freq = Counter(words)
-    word_freq_no_stop = Counter(words_no_stop)
-    bigram_freq = Counter(bigrams)
-
-    top_words = word_freq.most_common(20)
-    top_words_no_stop = word_freq_no_stop.most_common(20)
-    top_bigrams = bigram_freq.most_common(15)
-
-    # Sentence length distribution (approx)
-    sentences = _split_sentences(all_text)
-    sentence_lengths = [len(_simple_tokenize(s)) for s in sentences]
-    # Histogram bins similar to notebook style (0-600 words)
-    bin_edges = list(range(0, 601, 10))
-    counts, edges = np.histogram(sentence_lengths, bins=bin_edges)
-
-    return {
-        "total_words": len(words),
-        "unique_words": len(set(words)),
-        "unique_words_no_stopwords": len(set(words_no_stop)),
-        "top_words": top_words,
-        "top_words_no_stopwords": top_words_no_stop,
-        "top_bigrams": top_bigrams,
-        "chapter_info": chapter_info,
-        "words_no_stopwords": words_no_stop,  # used for wordcloud
-        "sentence_length_hist": {
-            "bin_edges": bin_edges,
-            "counts": counts.tolist(),
-        },
-    }
+                yield {"id": item.get_id(), "href": item.get_name(), "text_length": len(text)}, text
+
+
+def compute_stats(chapters: Iterable[Tuple[Dict[str, Any], str]]) -> Tuple[Dict[str, Any], CorpusStats]:
+    """Corpus statistics, one chapter at a time (see src.eda_stats)."""
+    stats = CorpusStats(STOPWORDS)
+    chapter_info: List[Dict[str, Any]] = []
+    for info, text in chapters:
+        chapter_info.append({**info, "word_count": stats.add(text)})
+    return {**stats.summary(), "chapter_info": chapter_info}, stats
+
+
+def _wordcloud_frequencies(corpus: CorpusStats) -> Dict[str, int]:
+    """What WordCloud.generate() would count, taken from the corpus counts.
 
+    Counts are already there, so the corpus is not joined and re-tokenized:
+    WordCloud's stopwords are dropped and frequent collocations kept (see
+    CorpusStats.wordcloud_frequencies). Plurals are not merged.
+    """
+    from wordcloud import STOPWORDS as WORDCLOUD_STOPWORDS
 
-def _generate_wordcloud_base64(words_no_stop: List[str]) -> str:
-    if not words_no_stop:
+    return corpus.wordcloud_frequencies(WORDCLOUD_STOPWORDS, COLLOCATION_THRESHOLD)
+
+
+def _generate_wordcloud_base64(frequencies: Dict[str, int]) -> str:
+    if not frequencies:
         return ""
-    wc = WordCloud(width=800, height=400, background_color="white").generate(" ".join(words_no_stop))
+    from wordcloud import WordCloud
+
+    # Fixed seed: the same counts always give the same image (and ETag)
+    wc = WordCloud(width=800, height=400, background_color="white", random_state=0)
+    wc = wc.generate_from_frequencies(frequencies)
     buf = io.BytesIO()
     wc.to_image().save(buf, format="PNG")
     buf.seek(0)
     return base64.b64encode(buf.read()).decode("utf-8")
 
 
-@lru_cache(maxsize=4)
-def compute_eda_summary(book_id: str, include_wordcloud: bool = True) -> Dict[str, Any]:
-    epub_path = _book_to_epub_path(book_id)
-    all_text, chapter_info = _extract_texts(epub_path)
-    stats = _compute_stats(all_text, chapter_info)
+def _summarize(book_id: str, epub_path: Path) -> Dict[str, Any]:
+    """Full summary (word cloud included) of one EPUB."""
+    stats, corpus = compute_stats(_iter_chapters(epub_path))
 
     response: Dict[str, Any] = {
         "book_id": book_id,
@@ -135,9 +121,182 @@ def compute_eda_summary(book_id: str, include_wordcloud: bool = True) -> Dict[st
         "sentence_length_hist": stats["sentence_length_hist"],
     }
 
-    if include_wordcloud:
-        response["wordcloud_png_base64"] = _generate_wordcloud_base64(stats["words_no_stopwords"])
-
+    response[WORDCLOUD_FIELD] = _generate_wordcloud_base64(_wordcloud_frequencies(corpus))
     return response
 
+# -----------------------------------------------------------------------------
+# Artifacts
+# -----------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=8)
+def _sha256(path: str, stat_key: Tuple[int, int]) -> str:
+    """Digest of a file, computed once per (mtime, size)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_sha256(epub_path: Path) -> Optional[str]:
+    """Digest of the book's EPUB, or None when it is not on this machine."""
+    key = _stat_key(str(epub_path))
+    return _sha256(str(epub_path), key) if key else None
+
+
+def build_eda_artifact(book_id: str, out_dir: str, epub_path: Optional[str] = None) -> str:
+    """Compute the summary and write it to ``out_dir``; returns the file's path.
+
+    The same EPUB always gives the same bytes (no timestamps), so workers
+    that build the artifact concurrently agree on its ETag.
+    """
+    epub_path = Path(epub_path) if epub_path else _book_to_epub_path(book_id)
+    start = time.perf_counter()
+    summary = _summarize(book_id, epub_path)
+    artifact = {
+        "artifact": {
+            "version": EDA_ARTIFACT_VERSION,
+            "source": epub_path.name,
+            "source_sha256": _source_sha256(epub_path),
+        },
+        **summary,
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, EDA_ARTIFACT_NAME)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    print(f"✅ EDA artifact for {book_id} built in {time.perf_counter() - start:.1f}s")
+    return path
+
+
+@dataclass
+class EdaArtifact:
+    """A loaded artifact, serialized once per variant.
+
+    The bodies are the summary alone, as computed by _summarize();
+    the artifact's own fields are served as headers (see ``headers``).
+    """
+
+    stat_key: Tuple[int, int]
+    source_stat_key: Optional[Tuple[int, int]]  # of the EPUB when it was checked
+    full: bytes
+    without_wordcloud: bytes
+    tag: str  # content hash, the base of the ETags
+    version: int
+    source_sha256: str
+
+    def body(self, include_wordcloud: bool) -> bytes:
+        return self.full if include_wordcloud else self.without_wordcloud
+
+    def etag(self, include_wordcloud: bool) -> str:
+        return f'"{self.tag}{"" if include_wordcloud else "-nowc"}"'
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-EDA-Artifact-Version": str(self.version),
+            "X-EDA-Source-SHA256": self.source_sha256,
+        }
+
+
+_artifacts: Dict[str, EdaArtifact] = {}
+_build_lock = threading.Lock()
+
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _load_artifact(book_id: str, path: str, stat_key: Tuple[int, int]) -> Optional[EdaArtifact]:
+    """The artifact at ``path``, or None if it is unreadable or outdated.
+
+    When the book's EPUB is present, an artifact computed from different
+    bytes is outdated too. Without the EPUB the artifact is taken as is.
+    """
+    try:
+        with open(path, "rb") as f:
+            raw = f.read()
+        data = json.loads(raw)
+    except (OSError, ValueError):
+        return None
+    meta = data.pop("artifact", {})
+    if meta.get("version") != EDA_ARTIFACT_VERSION:
+        return None
+    epub_path = _book_to_epub_path(book_id)
+    source_sha256 = _source_sha256(epub_path)
+    if source_sha256 is not None and meta.get("source_sha256") != source_sha256:
+        print(f"⚠️ EDA artifact for {book_id} was built from another {epub_path.name}")
+        return None
+    full = json.dumps(data, ensure_ascii=False).encode("utf-8")
+    without = {k: v for k, v in data.items() if k != WORDCLOUD_FIELD}
+    return EdaArtifact(
+        stat_key=stat_key,
+        source_stat_key=_stat_key(str(epub_path)),
+        full=full,
+        without_wordcloud=json.dumps(without, ensure_ascii=False).encode("utf-8"),
+        tag=hashlib.sha256(raw).hexdigest()[:32],
+        version=meta["version"],
+        source_sha256=meta.get("source_sha256") or "",
+    )
+
+
+def get_eda_artifact(book_id: str, vs_dir: str, build: bool = True) -> Optional[EdaArtifact]:
+    """The artifact in ``vs_dir``, reloaded when the file or the EPUB changes.
+
+    With ``build``, a missing or outdated artifact is computed and written
+    first (one build at a time per process).
+    """
+    path = os.path.join(vs_dir, EDA_ARTIFACT_NAME)
+    key = _stat_key(path)
+    cached = _artifacts.get(book_id)
+    if (
+        cached is not None
+        and key == cached.stat_key
+        and _stat_key(str(_book_to_epub_path(book_id))) == cached.source_stat_key
+    ):
+        return cached
+    artifact = _load_artifact(book_id, path, key) if key else None
+    if artifact is None and build:
+        with _build_lock:
+            key = _stat_key(path)
+            artifact = _load_artifact(book_id, path, key) if key else None
+            if artifact is None:
+                print(f"⚠️ No current EDA artifact for {book_id}; building it")
+                build_eda_artifact(book_id, vs_dir)
+                key = _stat_key(path)
+                artifact = _load_artifact(book_id, path, key)
+    if artifact is not None:
+        _artifacts[book_id] = artifact
+    return artifact
+
+
+def prepare_eda_artifacts(vs_dirs: Dict[str, str]) -> None:
+    """Build the missing or outdated artifacts of the books whose EPUB is here.
+
+    Run at server startup so the first /api/eda/summary request does not
+    pay for parsing the EPUB. Failures are logged; the endpoint retries.
+    """
+    for book_id, vs_dir in vs_dirs.items():
+        if not _book_to_epub_path(book_id).exists():
+            continue
+        try:
+            get_eda_artifact(book_id, vs_dir)
+        except Exception as e:
+            print(f"❌ EDA artifact for {book_id} not built: {e}")
+
+
+if __name__ == "__main__":
+    # python -m src.eda_api [book_id ...]: (re)build artifacts without re-ingesting
+    from src.rag import _vs_path
+
+    for book_id in sys.argv[1:] or ["debt_crisis", "capitalism"]:
+        path = build_eda_artifact(book_id, _vs_path(book_id))
+        print(f"✅ EDA artifact for {book_id} written to {path}")
+
 
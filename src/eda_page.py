@@ -2,6 +2,7 @@ import base64
 import requests
 import streamlit as st
 from typing import Optional
+from src.api_client import ApiError, get_api_client
 from src.eda_debt_crisis import eda_big_debt_crisis
 from src.eda_saving_capitalism import eda_saving_capitalism
 
@@ -20,15 +21,7 @@ def show_eda_page(use_api: bool = False, api_url: Optional[str] = None):
         st.header(f"EDA for {'Big Debt Crisis' if book_id=='debt_crisis' else 'Saving Capitalism from the Capitalists'}")
         with st.spinner("Computing EDA on server..."):
             try:
-                resp = requests.get(
-                    f"{api_url}/api/eda/summary",
-                    params={"book_id": book_id, "include_wordcloud": True},
-                    timeout=120,
-                )
-                if resp.status_code != 200:
-                    st.error(f"API error {resp.status_code}: {resp.text}")
-                    return
-                data = resp.json()
+                data = get_api_client(api_url).eda_summary(book_id, include_wordcloud=True)
 
                 # Summary metrics
                 cols = st.columns(3)
@@ -95,6 +88,8 @@ def show_eda_page(use_api: bool = False, api_url: Optional[str] = None):
                     ).properties(height=250)
                     st.altair_chart(chart, use_container_width=True)
 
+            except ApiError as e:
+                st.error(f"API error {e.status_code}: {e.detail}")
             except requests.exceptions.Timeout:
                 st.error("EDA request timed out. Please try again.")
             except Exception as e:
@@ -0,0 +1,241 @@
+"""Streaming corpus statistics for the EDA summaries.
+
+``CorpusStats`` is fed one chapter at a time and never holds the corpus, a
+list of its words or a list of its bigram strings:
+
+- one regex pass per chapter yields both the words and the sentence breaks
+  (whitespace after ``.``, ``!`` or ``?``), so nothing is tokenized twice;
+- words are interned to integer IDs in order of first occurrence;
+- unigram counts are ``np.bincount`` over the IDs, added to one array;
+- bigrams of consecutive non-stopwords are packed into one int64 code
+  (``left << 32 | right``) and counted with ``np.unique``. The per-chapter
+  counts are merged into the running totals when the buffer outgrows them.
+
+Memory therefore grows with the vocabulary (and the number of distinct
+bigrams), not with the corpus. The results match counting the whole text
+with ``collections.Counter``, including the order of ties (first occurrence
+first). Sentences and bigrams also run across chapter boundaries, as if the
+chapters were joined with a space.
+"""
+
+import re
+from collections import defaultdict
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Words, or the whitespace that ends a sentence; the text is lowercased first
+_TOKEN_RE = re.compile(r"[a-z']+|(?<=[.!?])\s+")
+_SENTENCE_END = (".", "!", "?")
+# Sentence length histogram, in words
+SENTENCE_BIN_EDGES = list(range(0, 601, 10))
+# Pending bigram counts are merged once they hold this many entries (or more
+# than the running totals)
+_MERGE_MIN = 1 << 16
+
+
+def _merge_counts(codes: List[np.ndarray], counts: List[np.ndarray], firsts: List[np.ndarray]):
+    """Sum counts per code and keep each code's earliest position."""
+    all_codes = np.concatenate(codes)
+    unique, inverse = np.unique(all_codes, return_inverse=True)
+    total = np.bincount(inverse, weights=np.concatenate(counts), minlength=len(unique)).astype(np.int64)
+    first = np.full(len(unique), np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first, inverse, np.concatenate(firsts))
+    return unique, total, first
+
+
+def collocation_scores(c12: np.ndarray, c1: np.ndarray, c2: np.ndarray, n: int) -> np.ndarray:
+    """Dunning log-likelihood ratio per bigram, as ``wordcloud.tokenization.score``.
+
+    ``c12`` counts the bigram, ``c1`` and ``c2`` its words, ``n`` all words.
+    """
+    def log_l(k, total, x):
+        return np.log(np.maximum(x, 1e-10)) * k + np.log(np.maximum(1 - x, 1e-10)) * (total - k)
+
+    c12, c1, c2 = (np.asarray(a, dtype=np.float64) for a in (c12, c1, c2))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p, p1, p2 = c2 / n, c12 / c1, (c2 - c12) / (n - c1)
+        score = log_l(c12, c1, p) + log_l(c2 - c12, n - c1, p) - log_l(c12, c1, p1) - log_l(c2 - c12, n - c1, p2)
+    # A word that makes up the whole corpus scores 0
+    return np.where((n <= c1) | (n <= c2), 0.0, -2 * score)
+
+
+def _top(counts: np.ndarray, order_key: np.ndarray, n: int) -> np.ndarray:
+    """Indices of the ``n`` largest counts, ties by ascending ``order_key``."""
+    if n >= len(counts):
+        candidates = np.arange(len(counts))
+    else:
+        # Everything tied with the n-th largest count is a candidate
+        threshold = np.partition(counts, len(counts) - n)[len(counts) - n]
+        candidates = np.flatnonzero(counts >= threshold)
+    ranked = candidates[np.lexsort((order_key[candidates], -counts[candidates]))]
+    return ranked[:n]
+
+
+class CorpusStats:
+    def __init__(self, stopwords: Iterable[str]):
+        self.stopwords = frozenset(stopwords)
+        # token -> ID; a missing token gets the next ID
+        self._ids: Dict[str, int] = defaultdict()
+        self._ids.default_factory = self._ids.__len__
+        self._tokens: List[str] = []
+        # Per ID: counted as a word / kept for the no-stopword stats
+        self._is_word = np.zeros(0, dtype=bool)
+        self._keep = np.zeros(0, dtype=bool)
+        self._word_counts = np.zeros(0, dtype=np.int64)
+        self._sentence_hist = np.zeros(len(SENTENCE_BIN_EDGES) - 1, dtype=np.int64)
+        # Running bigram totals and the chapters not merged into them yet
+        self._bigram_codes = np.zeros(0, dtype=np.int64)
+        self._bigram_counts = np.zeros(0, dtype=np.int64)
+        self._bigram_first = np.zeros(0, dtype=np.int64)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending_size = 0
+        self._bigrams_seen = 0
+        # State carried into the next chapter
+        self._prev_kept: Optional[int] = None
+        self._open_sentence = 0
+        self._ended_on_break = False
+        self.chapters = 0
+
+    # -- feeding --------------------------------------------------------------
+
+    def _intern(self, tokens: List[str]) -> np.ndarray:
+        before = len(self._ids)
+        ids = np.fromiter(map(self._ids.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        if len(self._ids) > before:
+            new = list(islice(self._ids, before, None))
+            self._tokens.extend(new)
+            is_word = np.fromiter((not t[0].isspace() for t in new), dtype=bool, count=len(new))
+            keep = np.fromiter((t.isalpha() and t not in self.stopwords for t in new), dtype=bool, count=len(new))
+            self._is_word = np.concatenate([self._is_word, is_word])
+            self._keep = np.concatenate([self._keep, keep])
+            self._word_counts = np.concatenate([self._word_counts, np.zeros(len(new), dtype=np.int64)])
+        return ids
+
+    def add(self, text: str) -> int:
+        """Count one chapter (whitespace-normalized, stripped); returns its word count."""
+        if not text:
+            return 0
+        self.chapters += 1
+        ids = self._intern(_TOKEN_RE.findall(text.lower()))
+        is_word = self._is_word[ids]
+        words = ids[is_word]
+        self._word_counts += np.bincount(words, minlength=len(self._word_counts))
+
+        self._add_sentences(is_word, text.endswith(_SENTENCE_END))
+        self._add_bigrams(words[self._keep[words]])
+        return len(words)
+
+    def _add_sentences(self, is_word: np.ndarray, ends_sentence: bool) -> None:
+        breaks = np.flatnonzero(~is_word)
+        # Words per segment between breaks; the first continues the open sentence
+        bounds = np.concatenate([[-1], breaks, [len(is_word)]])
+        lengths = np.diff(bounds) - 1
+        lengths[0] += self._open_sentence
+        if ends_sentence:
+            # The space joining it to the next chapter ends the sentence
+            done, self._open_sentence = lengths, 0
+        else:
+            done, self._open_sentence = lengths[:-1], int(lengths[-1])
+        self._ended_on_break = ends_sentence
+        if len(done):
+            self._sentence_hist += np.histogram(done, bins=SENTENCE_BIN_EDGES)[0]
+
+    def _add_bigrams(self, kept: np.ndarray) -> None:
+        if self._prev_kept is not None:
+            kept_seq = np.concatenate([[self._prev_kept], kept])
+        else:
+            kept_seq = kept
+        if len(kept):
+            self._prev_kept = int(kept[-1])
+        if len(kept_seq) < 2:
+            return
+        codes = (kept_seq[:-1] << 32) | kept_seq[1:]
+        unique, first, counts = np.unique(codes, return_index=True, return_counts=True)
+        self._pending.append((unique, counts, first + self._bigrams_seen))
+        self._pending_size += len(unique)
+        self._bigrams_seen += len(codes)
+        if self._pending_size >= max(_MERGE_MIN, len(self._bigram_codes)):
+            self._merge_bigrams()
+
+    def _merge_bigrams(self) -> None:
+        if not self._pending:
+            return
+        codes, counts, firsts = zip(*self._pending)
+        self._bigram_codes, self._bigram_counts, self._bigram_first = _merge_counts(
+            [self._bigram_codes, *codes], [self._bigram_counts, *counts], [self._bigram_first, *firsts]
+        )
+        self._pending, self._pending_size = [], 0
+
+    # -- results --------------------------------------------------------------
+
+    def _word_items(self, mask: np.ndarray, n: int) -> List[Tuple[str, int]]:
+        ids = np.flatnonzero(mask & (self._word_counts > 0))
+        top = ids[_top(self._word_counts[ids], ids, n)]
+        return [(self._tokens[i], int(self._word_counts[i])) for i in top]
+
+    def word_frequencies(self, stopwords: Iterable[str] = ()) -> Dict[str, int]:
+        """Counts of the non-stopwords, minus any extra ``stopwords``."""
+        extra = set(stopwords)
+        ids = np.flatnonzero(self._keep & (self._word_counts > 0))
+        return {
+            self._tokens[i]: int(self._word_counts[i]) for i in ids if self._tokens[i] not in extra
+        }
+
+    def wordcloud_frequencies(
+        self, stopwords: Iterable[str] = (), collocation_threshold: float = 30
+    ) -> Dict[str, int]:
+        """Word and collocation counts for a word cloud, minus any extra ``stopwords``.
+
+        As in ``WordCloud.generate()``, a bigram whose collocation score is
+        above ``collocation_threshold`` becomes an entry of its own and its
+        count is taken off both of its words. The bigrams are the ones
+        counted here: consecutive words once the stopwords are removed.
+        """
+        self._merge_bigrams()
+        allowed = self._keep.copy()
+        allowed[[self._ids[w] for w in set(stopwords) if w in self._ids]] = False
+        words = np.where(allowed, self._word_counts, 0)
+
+        left = self._bigram_codes >> 32
+        right = self._bigram_codes & 0xFFFFFFFF
+        candidates = np.flatnonzero(allowed[left] & allowed[right])
+        scores = collocation_scores(
+            self._bigram_counts[candidates], words[left[candidates]], words[right[candidates]], int(words.sum())
+        )
+        collocations = candidates[scores > collocation_threshold]
+
+        counts = words.copy()
+        np.subtract.at(counts, left[collocations], self._bigram_counts[collocations])
+        np.subtract.at(counts, right[collocations], self._bigram_counts[collocations])
+        frequencies = {self._tokens[i]: int(counts[i]) for i in np.flatnonzero(counts > 0)}
+        for i in collocations.tolist():
+            frequencies[f"{self._tokens[left[i]]} {self._tokens[right[i]]}"] = int(self._bigram_counts[i])
+        return frequencies
+
+    def summary(self, top_words: int = 20, top_bigrams: int = 15) -> Dict[str, Any]:
+        self._merge_bigrams()
+        hist = self._sentence_hist.copy()
+        if self.chapters and not self._ended_on_break:
+            # The last sentence is only ended by the end of the text
+            hist += np.histogram([self._open_sentence], bins=SENTENCE_BIN_EDGES)[0]
+
+        seen = self._word_counts > 0
+        top = _top(self._bigram_counts, self._bigram_first, top_bigrams)
+        bigrams = [
+            (f"{self._tokens[c >> 32]} {self._tokens[c & 0xFFFFFFFF]}", int(self._bigram_counts[i]))
+            for i, c in zip(top, self._bigram_codes[top].tolist())
+        ]
+        return {
+            "total_words": int(self._word_counts.sum()),
+            "unique_words": int(np.count_nonzero(seen & self._is_word)),
+            "unique_words_no_stopwords": int(np.count_nonzero(seen & self._keep)),
+            "top_words": self._word_items(self._is_word, top_words),
+            "top_words_no_stopwords": self._word_items(self._keep, top_words),
+            "top_bigrams": bigrams,
+            "sentence_length_hist": {
+                "bin_edges": SENTENCE_BIN_EDGES,
+                "counts": hist.tolist(),
+            },
+        }
@@ -0,0 +1,136 @@
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from src.tracing import Span, batch_span, current_span
+
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "16"))
+EMBED_BATCH_WINDOW_MS = float(os.getenv("EMBED_BATCH_WINDOW_MS", "5"))
+
+# -----------------------------------------------------------------------------
+# Query embedding micro-batcher
+# -----------------------------------------------------------------------------
+
+
+class EmbeddingBatcher:
+    """Group concurrent query embeddings into single batched API calls.
+
+    ``embed_query`` parks the caller on a future. The pending batch is flushed
+    when it reaches ``max_batch_size`` or ``window_ms`` after its first item,
+    whichever comes first; ``embed_fn`` then runs once in a worker thread for
+    the whole batch and the vectors are fanned back out. Identical texts in a
+    batch are embedded once. The call is traced as one ``embed_batch`` span
+    linked to the span of every request in the batch.
+
+    The default window is 5 ms. A window of 0 still batches requests that
+    arrive in the same event loop iteration, for deployments where even that
+    delay matters.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        max_batch_size: int = EMBED_BATCH_MAX_SIZE,
+        window_ms: float = EMBED_BATCH_WINDOW_MS,
+    ):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.window_ms = window_ms
+        self._pending: List[Tuple[str, asyncio.Future, float, Optional[Span]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # Running batches; the loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.requests_flushed = 0
+        self.batches = 0
+        self.texts_embedded = 0
+        self.largest_batch = 0
+        self.flushes_full = 0
+        self.flushes_window = 0
+        self.errors = 0
+        self.queue_wait_ms_total = 0.0
+        self.embed_ms_total = 0.0
+
+    async def embed_query(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter(), current_span()))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self.flushes_full += 1
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush_on_timer)
+        return await future
+
+    def _flush_on_timer(self) -> None:
+        self._timer = None
+        if self._pending:
+            self.flushes_window += 1
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_batch_done)
+
+    def _on_batch_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        # _run_batch hands its errors to the waiters; anything else is a bug
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+            print(f"❌ Embedding batch failed: {task.exception()!r}")
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future, float, Optional[Span]]]) -> None:
+        started = time.perf_counter()
+        texts = list(dict.fromkeys(text for text, _, _, _ in batch))
+        self.batches += 1
+        self.requests_flushed += len(batch)
+        self.texts_embedded += len(texts)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        self.queue_wait_ms_total += sum((started - t) * 1000 for _, _, t, _ in batch)
+
+        try:
+            with batch_span("embed_batch", (s for _, _, _, s in batch),
+                            batch_size=len(batch), texts=len(texts)):
+                vectors = await asyncio.to_thread(self.embed_fn, texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"Expected {len(texts)} embeddings, got {len(vectors)}")
+        except Exception as e:
+            self.errors += 1
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.embed_ms_total += (time.perf_counter() - started) * 1000
+
+        by_text = dict(zip(texts, vectors))
+        for text, future, _, _ in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window_ms,
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts_embedded": self.texts_embedded,
+            "avg_batch_size": self.requests_flushed / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "flushes_full": self.flushes_full,
+            "flushes_window": self.flushes_window,
+            "errors": self.errors,
+            "avg_queue_wait_ms": (
+                self.queue_wait_ms_total / self.requests_flushed if self.requests_flushed else 0.0
+            ),
+            "avg_embed_call_ms": self.embed_ms_total / self.batches if self.batches else 0.0,
+        }
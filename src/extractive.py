@@ -0,0 +1,119 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+from langchain.schema import Document
+
+from src.utils import split_sentences
+
+# In "auto" mode, answers below this confidence fall through to generation
+EXTRACTIVE_MIN_CONFIDENCE = float(os.getenv("EXTRACTIVE_MIN_CONFIDENCE", "0.55"))
+LEXICAL_WEIGHT = 0.6
+EMBEDDING_WEIGHT = 0.3
+RANK_WEIGHT = 0.1
+# embedding-001 cosine similarities between related texts rarely fall below
+# this, so it is mapped to 0 when rescaling to [0, 1]
+COSINE_FLOOR = 0.5
+# Very short sentences are usually headings or fragments; join the next one
+MIN_SPAN_WORDS = 8
+# Longer "sentences" are usually tables of contents or lists; their lexical
+# score is scaled down proportionally
+MAX_SPAN_WORDS = 50
+
+QUESTION_STOPWORDS = {
+    "the", "and", "a", "an", "to", "of", "in", "for", "on", "at", "by", "with",
+    "is", "it", "this", "that", "as", "are", "be", "from", "or", "was", "were",
+    "what", "which", "who", "whom", "when", "where", "why", "how", "does", "do",
+    "did", "can", "could", "would", "should", "according", "book", "author",
+}
+
+
+@dataclass
+class ExtractiveAnswer:
+    text: str
+    confidence: float
+    source_rank: int  # 1-based, matches the rank in the sources list
+    lexical_score: float
+    embedding_score: float
+
+
+def _terms(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def extract_answer(
+    question: str,
+    passages: Sequence[Document],
+    query_embedding: Optional[Sequence[float]] = None,
+    passage_embeddings: Optional[np.ndarray] = None,
+) -> Optional[ExtractiveAnswer]:
+    """Pick the passage sentence that best answers ``question``.
+
+    Every sentence of every passage is scored at once:
+
+    - lexical: IDF-weighted share of the question's content words that the
+      sentence contains (IDF over the candidate sentences), scaled down for
+      overly long sentences
+    - embedding: cosine between the query and the sentence's passage embedding,
+      when both are given
+    - rank: a small prior favouring higher-ranked passages
+
+    Returns None when there is nothing to score.
+    """
+    q_terms = sorted({t for t in _terms(question) if t not in QUESTION_STOPWORDS})
+    sentences: List[str] = []
+    owners: List[int] = []
+    for i, doc in enumerate(passages):
+        for sentence in split_sentences(doc.page_content):
+            sentences.append(sentence)
+            owners.append(i)
+    if not sentences or not q_terms:
+        return None
+    owner_idx = np.asarray(owners)
+
+    # Sentence x question-term incidence matrix
+    term_index = {t: j for j, t in enumerate(q_terms)}
+    hits = np.zeros((len(sentences), len(q_terms)), dtype=np.float32)
+    lengths = np.empty(len(sentences), dtype=np.float32)
+    for i, sentence in enumerate(sentences):
+        terms = _terms(sentence)
+        lengths[i] = len(terms)
+        for t in set(terms):
+            j = term_index.get(t)
+            if j is not None:
+                hits[i, j] = 1.0
+    idf = np.log((len(sentences) + 1) / (hits.sum(axis=0) + 1)) + 1.0
+    length_factor = np.minimum(1.0, MAX_SPAN_WORDS / np.maximum(lengths, 1.0))
+    lexical = (hits @ idf / idf.sum()) * length_factor
+
+    embedding = np.zeros(len(passages), dtype=np.float32)
+    if query_embedding is not None and passage_embeddings is not None and len(passage_embeddings):
+        q = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(passage_embeddings, axis=1) * np.linalg.norm(q)
+        cosine = np.divide(
+            passage_embeddings @ q, norms, out=np.zeros(len(passages), dtype=np.float32), where=norms > 0
+        )
+        embedding = np.clip((cosine - COSINE_FLOOR) / (1 - COSINE_FLOOR), 0.0, 1.0)
+        weights = (LEXICAL_WEIGHT, EMBEDDING_WEIGHT, RANK_WEIGHT)
+    else:
+        # Without embeddings the lexical score carries the embedding weight
+        weights = (LEXICAL_WEIGHT + EMBEDDING_WEIGHT, 0.0, RANK_WEIGHT)
+
+    rank_prior = 1.0 / (1.0 + owner_idx)
+    scores = weights[0] * lexical + weights[1] * embedding[owner_idx] + weights[2] * rank_prior
+
+    best = int(np.argmax(scores))
+    text = sentences[best]
+    nxt = best + 1
+    if len(text.split()) < MIN_SPAN_WORDS and nxt < len(sentences) and owners[nxt] == owners[best]:
+        text = f"{text} {sentences[nxt]}"
+
+    return ExtractiveAnswer(
+        text=text,
+        confidence=float(scores[best]),
+        source_rank=owners[best] + 1,
+        lexical_score=float(lexical[best]),
+        embedding_score=float(embedding[owners[best]]),
+    )
@@ -0,0 +1,200 @@
+"""Local stand-ins for the Gemini generation and embedding services.
+
+Selected with ``LLM_BACKEND=fake`` (see ``src/backends.py``). They never touch
+the network, produce deterministic outputs for a given input, and simulate the
+remote service with configurable latency distributions and error rates, so the
+serving overhead (retrieval, serialization, thread pools) can be load-tested
+in isolation and without spending API quota.
+
+Configuration (environment variables):
+
+- ``FAKE_EMBED_LATENCY_MS``: latency of one embedding call (any batch size)
+- ``FAKE_GEN_LATENCY_MS``: latency until the first generated chunk
+- ``FAKE_TOKEN_LATENCY_MS``: latency between streamed chunks
+- ``FAKE_ERROR_RATE``: probability in [0, 1] that a call fails
+- ``FAKE_SEED``: seed for the latency/error random draws
+
+Latency specs are ``fixed:<ms>``, ``uniform:<lo>,<hi>``,
+``normal:<mean>,<std>`` or ``lognormal:<median>,<sigma>``; a bare number is
+treated as ``fixed``.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Iterator, List, Optional
+
+import numpy as np
+from google.api_core.exceptions import ServiceUnavailable
+from langchain.embeddings.base import Embeddings
+
+EMBED_DIM = 768  # Same as models/embedding-001, so existing indexes load
+
+# -----------------------------------------------------------------------------
+# Latency and error simulation
+# -----------------------------------------------------------------------------
+
+
+class LatencyModel:
+    """Draws simulated latencies (in seconds) from a configured distribution."""
+
+    def __init__(self, spec: str, rng: random.Random):
+        self.spec = spec
+        self._rng = rng
+        kind, _, args = spec.partition(":") if ":" in spec else ("fixed", "", spec)
+        self.kind = kind.strip().lower()
+        self.args = [float(a) for a in args.split(",") if a.strip()]
+        if self.kind not in {"fixed", "uniform", "normal", "lognormal"}:
+            raise ValueError(f"Unknown latency distribution: {spec!r}")
+
+    def sample(self) -> float:
+        if self.kind == "fixed":
+            ms = self.args[0]
+        elif self.kind == "uniform":
+            ms = self._rng.uniform(self.args[0], self.args[1])
+        elif self.kind == "normal":
+            ms = self._rng.gauss(self.args[0], self.args[1])
+        else:
+            ms = self.args[0] * self._rng.lognormvariate(0.0, self.args[1])
+        return max(0.0, ms) / 1000
+
+
+class _Simulator:
+    """Shared latency/error draws; a lock keeps the seeded sequence reproducible."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rng = random.Random(int(os.getenv("FAKE_SEED", "0")))
+        self.embed_latency = LatencyModel(os.getenv("FAKE_EMBED_LATENCY_MS", "fixed:80"), self._rng)
+        self.gen_latency = LatencyModel(os.getenv("FAKE_GEN_LATENCY_MS", "lognormal:600,0.4"), self._rng)
+        self.token_latency = LatencyModel(os.getenv("FAKE_TOKEN_LATENCY_MS", "fixed:15"), self._rng)
+        self.error_rate = float(os.getenv("FAKE_ERROR_RATE", "0"))
+
+    def draw(self, latency: LatencyModel) -> float:
+        with self._lock:
+            delay = latency.sample()
+            failed = self._rng.random() < self.error_rate
+        if failed:
+            raise ServiceUnavailable("Injected failure from fake backend")
+        return delay
+
+
+_simulator: Optional[_Simulator] = None
+
+
+def _sim() -> _Simulator:
+    global _simulator
+    if _simulator is None:
+        _simulator = _Simulator()
+    return _simulator
+
+
+# -----------------------------------------------------------------------------
+# Embeddings
+# -----------------------------------------------------------------------------
+
+
+def _hash_embedding(text: str) -> List[float]:
+    """Deterministic bag-of-words vector via the hashing trick.
+
+    Texts sharing words get similar vectors, so retrieval over an index built
+    with the fake backend still returns plausible neighbours.
+    """
+    vec = np.zeros(EMBED_DIM, dtype=np.float32)
+    for word in re.findall(r"[a-z0-9]+", text.lower()):
+        digest = hashlib.blake2b(word.encode(), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % EMBED_DIM
+        vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    if norm > 0:
+        vec /= norm
+    return vec.tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    """Drop-in for ``GoogleGenerativeAIEmbeddings`` with simulated latency."""
+
+    def __init__(self, model: str = "fake-embedding", **kwargs: Any):
+        self.model = model
+        self.task_type = None
+
+    def embed_documents(self, texts: List[str], **kwargs: Any) -> List[List[float]]:
+        time.sleep(_sim().draw(_sim().embed_latency))
+        return [_hash_embedding(t) for t in texts]
+
+    def embed_query(self, text: str, **kwargs: Any) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+# -----------------------------------------------------------------------------
+# Generation
+# -----------------------------------------------------------------------------
+
+
+class FakeResponse:
+    """Minimal stand-in for a ``GenerateContentResponse`` (or one stream chunk)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.parts = [text] if text else []
+
+
+def _fake_answer(prompt: str) -> str:
+    """Deterministic answer derived from the prompt contents."""
+    digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+    try:
+        content = json.loads(prompt)
+    except ValueError:
+        content = {}
+    if content.get("task") == "verify":
+        return "Yes, the answer is supported by the passages."
+    passages = content.get("ground_truth_passages") or [""]
+    excerpt = " ".join(passages[0].split()[:40])
+    return f"[fake-{digest}] Based on the passages: {excerpt}"
+
+
+def _chunks(text: str, words_per_chunk: int = 4) -> List[str]:
+    words = text.split(" ")
+    return [
+        " ".join(words[i:i + words_per_chunk]) + (" " if i + words_per_chunk < len(words) else "")
+        for i in range(0, len(words), words_per_chunk)
+    ]
+
+
+class FakeGenerativeModel:
+    """Drop-in for ``genai.GenerativeModel`` with simulated latency."""
+
+    def __init__(self, model_name: str, generation_config: Optional[dict] = None):
+        self.model_name = model_name
+        self.generation_config = generation_config
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs: Any):
+        time.sleep(_sim().draw(_sim().gen_latency))
+        text = _fake_answer(prompt)
+        if not stream:
+            return FakeResponse(text)
+        return self._stream(text)
+
+    def _stream(self, text: str) -> Iterator[FakeResponse]:
+        for i, chunk in enumerate(_chunks(text)):
+            if i:
+                time.sleep(_sim().draw(_sim().token_latency))
+            yield FakeResponse(chunk)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs: Any):
+        await asyncio.sleep(_sim().draw(_sim().gen_latency))
+        text = _fake_answer(prompt)
+        if not stream:
+            return FakeResponse(text)
+        return self._astream(text)
+
+    async def _astream(self, text: str):
+        for i, chunk in enumerate(_chunks(text)):
+            if i:
+                await asyncio.sleep(_sim().draw(_sim().token_latency))
+            yield FakeResponse(chunk)
@@ -1,11 +1,15 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Query
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Query, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse, Response
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field, ValidationError
 import asyncio
-import json
+import hashlib
 import time
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+import orjson
+from collections import defaultdict
+from typing import List, Optional, Dict, Any, Tuple
 import uvicorn
 import os
 import sys
@@ -14,9 +18,29 @@ from functools import lru_cache
 # Add project root to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.rag import retrieve, generate_answer
-from src.eda_api import compute_eda_summary
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from src.rag import (
+    retrieve, retrieve_batch, retrieve_extending, similarity_scores, agenerate_answer, agenerate_answer_stream, averify_answer, embed_queries,
+    vector_store_version, passage_vectors, _vs_path, VECTOR_K, MAX_FINAL_PASSAGES,
+)
+from src.extractive import extract_answer, EXTRACTIVE_MIN_CONFIDENCE
+from src.gemini_client import GENERATION_MODEL, get_client
+from src.context_packer import pack_context, PackedContext, CONTEXT_TOKEN_BUDGET
+from src.coalesce import SingleFlight
+from src.embedding_batcher import EmbeddingBatcher
+from src.result_cache import build_result_cache
+from src.deadline import Deadline, DeadlineExceeded
+from src.admission import AdmissionController, Overloaded, make_executor, WORKER_THREADS
+from src import grounding
+from src import index_store
+from src import warmup
+from src.sessions import SessionStore, Turn, CONTINUATION, FOLLOW_UP, FRESH
+from src import metrics
+from src import tracing
+from src.tracing import span
+from src.compression import CompressionMiddleware
+from src.utils import normalize_question
+from src.backends import make_embeddings, LazyEmbeddings
+from src.serve import worker_memory, process_memory
 from langchain_community.vectorstores import FAISS
 from langchain.schema import Document
 
@@ -27,7 +51,8 @@ load_dotenv()
 app = FastAPI(
     title="Closed Book QA API",
     description="RAG-based Question Answering API for financial books",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -39,114 +64,763 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# gzip/br for responses over ~1 KB
+app.add_middleware(CompressionMiddleware)
+
+# Request timing for /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
 # Pydantic models
 class QuestionRequest(BaseModel):
     question: str
     book_id: str
+    # Time budget for the whole request; optional stages are skipped as it runs low.
+    # Omitted means DEFAULT_DEADLINE_MS
+    deadline_ms: Optional[int] = Field(None, ge=1)
+    verify: bool = False
+    # "extractive" answers from the passages without the LLM; "auto" does so
+    # only when the extracted span is confident enough
+    answer_mode: str = Field("generate", pattern="^(generate|extractive|auto)$")
+    # Per source: "ids" returns only chunk ID, rank and similarity score (text
+    # can be fetched later from /api/passages), "snippet" adds the first
+    # snippet_chars of the text plus chapter/page, "full" returns the whole
+    # passage and metadata
+    source_fields: str = Field("full", pattern="^(ids|snippet|full)$")
+    snippet_chars: int = Field(300, ge=20, le=10000)
 
 class QuestionResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
     processing_time: float
     status: str = "success"
+    context_tokens: int = 0
+    context_tokens_saved: int = 0
+    cached: bool = False
+    verified: Optional[bool] = None
+    skipped_stages: List[str] = []
+    answer_mode: str = "generate"
+    extractive_confidence: Optional[float] = None
+    # Per-stage milliseconds, only with ?debug=timings
+    timings: Optional[Dict[str, float]] = None
+    trace_id: Optional[str] = None
+
+class BatchQuestionRequest(BaseModel):
+    questions: List[QuestionRequest] = Field(..., min_length=1)
+    # Parallel generations for this batch; capped at BATCH_MAX_CONCURRENCY
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
+class IngestRequest(BaseModel):
+    book_id: str = Field(..., pattern="^(debt_crisis|capitalism)$")
 
 class HealthResponse(BaseModel):
     status: str
     vector_stores_loaded: List[str]
     embeddings_model_loaded: bool
+    # Memory of every worker serving this app (just this process without src.serve)
+    workers: List[Dict[str, Any]] = []
+
+BOOK_IDS = ["debt_crisis", "capitalism"]
+EMBED_MODEL = "models/embedding-001"
+
+# Applied to requests that do not send their own deadline_ms (0 = no deadline)
+DEFAULT_DEADLINE_MS = int(os.getenv("DEFAULT_DEADLINE_MS", "0"))
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "500"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+# Passages only change on re-ingest; clients revalidate with the ETag after this
+PASSAGE_CACHE_MAX_AGE_S = int(os.getenv("PASSAGE_CACHE_MAX_AGE_S", "3600"))
+PASSAGES_MAX_BULK = int(os.getenv("PASSAGES_MAX_BULK", "100"))
+# EDA summaries only change on re-ingest; same revalidation as passages
+EDA_CACHE_MAX_AGE_S = int(os.getenv("EDA_CACHE_MAX_AGE_S", "3600"))
+# Build missing or outdated EDA artifacts at startup instead of on first request
+EDA_BUILD_ON_STARTUP = os.getenv("EDA_BUILD_ON_STARTUP", "1") == "1"
+# How often a worker checks whether a book was re-ingested
+VECTOR_STORE_CHECK_INTERVAL_S = float(os.getenv("VECTOR_STORE_CHECK_INTERVAL_S", "2"))
 
 # Global cache for expensive resources
 vector_stores = {}
+vector_store_versions = {}
+# Per book: the running background reload, and when the on-disk version was last read
+_reload_tasks: Dict[str, asyncio.Task] = {}
+_version_checked_at: Dict[str, float] = {}
 embeddings_model = None
 
+# Answer/retrieval result cache; built at startup so each worker opens its own
+# SQLite connection
+result_cache = None
+
+# Concurrent identical questions share one pipeline execution
+ask_flight = SingleFlight()
+
+# Bounds concurrent pipeline runs and queues/rejects the excess
+admission = AdmissionController()
+
+# Query embeddings from concurrent requests are sent as one batched call
+embedding_batcher = EmbeddingBatcher(lambda texts: embed_queries(get_embeddings(), texts))
+
+# Thread pool behind asyncio.to_thread; installed at startup
+worker_executor = None
+
+# Set once the embeddings client and every index are loaded and warmed up
+ready = False
+resources_task = None
+eda_task = None
+warmup_report = warmup.WarmupReport()
+
+# Questions asked in this worker, saved on shutdown for the next warmup
+hot_queries = warmup.HotQueries()
+
+# Conversational sessions of /api/session connections to this worker
+sessions = SessionStore()
+
+# Background ingestion runner; built by the first ingest request
+ingest_jobs = None
+
+# The server's event loop, for callbacks from other threads; set at startup
+main_loop = None
+
 # Cache the embedding model
 @lru_cache(maxsize=1)
 def get_embeddings():
     """Get cached embeddings model."""
-    return GoogleGenerativeAIEmbeddings(model="models/embedding-001")
+    return make_embeddings(EMBED_MODEL)
+
+def _read_vector_store(book_id: str) -> Tuple[FAISS, str]:
+    """Load a book's persisted index from disk (blocking), with its version."""
+    # Resolved once, so the files and the version tag come from the same ingestion
+    path, version = index_store.resolve(book_id)
+    # Queries are embedded with get_embeddings(); the store's own client
+    # is only built if something calls it, so loading works pre-fork
+    vs = FAISS.load_local(path, LazyEmbeddings(EMBED_MODEL), allow_dangerous_deserialization=True)
+    passage_vectors(vs, [])  # builds the docstore-id -> position map
+    return vs, version
+
+def _install_vector_store(book_id: str, vs: FAISS, version: str) -> None:
+    vector_stores[book_id] = vs
+    vector_store_versions[book_id] = version
+
+async def refresh_vector_store(book_id: str) -> None:
+    """Reload a re-ingested index in a worker thread, then swap it in.
+
+    Concurrent calls for a book share one reload. Requests keep using the
+    old store until the swap, which happens on the event loop, so a request
+    never sees a store and a version that do not belong together.
+    """
+    task = _reload_tasks.get(book_id)
+    if task is None:
+        async def reload():
+            try:
+                if vector_store_versions.get(book_id) != await asyncio.to_thread(
+                    vector_store_version, book_id
+                ):
+                    _install_vector_store(book_id, *await asyncio.to_thread(_read_vector_store, book_id))
+                    print(f"✅ Reloaded vector store for {book_id}")
+            finally:
+                del _reload_tasks[book_id]
+
+        task = _reload_tasks[book_id] = asyncio.ensure_future(reload())
+    await asyncio.shield(task)
+
+def _check_vector_store(book_id: str) -> None:
+    """Start a background reload if the index changed on disk.
+
+    The version is read at most every VECTOR_STORE_CHECK_INTERVAL_S per book.
+    """
+    now = time.monotonic()
+    if now - _version_checked_at.get(book_id, 0.0) < VECTOR_STORE_CHECK_INTERVAL_S:
+        return
+    _version_checked_at[book_id] = now
+    if book_id in _reload_tasks:
+        return
+    try:
+        changed = vector_store_version(book_id) != vector_store_versions.get(book_id)
+    except OSError:
+        return  # mid-swap or removed; keep serving what is loaded
+    if changed:
+        task = asyncio.ensure_future(refresh_vector_store(book_id))
+        task.add_done_callback(_log_reload_failure(book_id))
+
+def _log_reload_failure(book_id: str):
+    def callback(task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ Failed to reload vector store for {book_id}: {task.exception()}")
+    return callback
 
 def get_vector_store(book_id: str) -> FAISS:
-    """Get cached vector store for a book."""
-    if book_id not in vector_stores:
-        embeddings = get_embeddings()
-        vs_path = os.path.join(
-            "vector_store",
-            "big_debt_crisis" if book_id == "debt_crisis" else "saving_capitalism",
-        )
-        vector_stores[book_id] = FAISS.load_local(
-            vs_path, embeddings, allow_dangerous_deserialization=True
-        )
+    """Get the loaded vector store for a book.
+
+    On the event loop this never touches the index files: a re-ingested
+    index is picked up by a background reload while the old one keeps
+    serving. Called from a thread (startup preload), it loads the store
+    if it is missing or outdated.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        version = vector_store_version(book_id)
+        if vector_store_versions.get(book_id) != version or book_id not in vector_stores:
+            _install_vector_store(book_id, *_read_vector_store(book_id))
+        return vector_stores[book_id]
+    _check_vector_store(book_id)
     return vector_stores[book_id]
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize expensive resources on startup."""
-    global embeddings_model, vector_stores
-    
+def _load_book(book_id: str) -> None:
+    try:
+        get_vector_store(book_id)
+        print(f"✅ Vector store loaded for {book_id}")
+    except Exception as e:
+        print(f"❌ Failed to load vector store for {book_id}: {e}")
+
+def preload_vector_stores() -> None:
+    """Load every book's index concurrently; books that fail are logged and skipped."""
+    # Loading is mostly file reads, which release the GIL
+    with ThreadPoolExecutor(max_workers=len(BOOK_IDS)) as pool:
+        list(pool.map(_load_book, BOOK_IDS))
+
+def prepare_eda_artifacts() -> None:
+    """Build the EDA artifacts that are missing or outdated (see src.eda_api)."""
+    from src.eda_api import prepare_eda_artifacts as prepare
+
+    if EDA_BUILD_ON_STARTUP:
+        prepare({b: _vs_path(b) for b in BOOK_IDS if b in vector_stores})
+
+async def load_resources() -> None:
+    """Build the embeddings client and load every index, then mark the app ready."""
+    global embeddings_model, ready, eda_task
+    start = time.time()
     try:
-        # Initialize embeddings model once
-        embeddings_model = get_embeddings()
+        embeddings_model, _ = await asyncio.gather(
+            asyncio.to_thread(get_embeddings),
+            asyncio.gather(*(asyncio.to_thread(_load_book, b) for b in BOOK_IDS)),
+        )
         print("✅ Embeddings model loaded successfully")
-        
-        # Pre-load vector stores
-        book_ids = ["debt_crisis", "capitalism"]
-        for book_id in book_ids:
-            try:
-                get_vector_store(book_id)
-                print(f"✅ Vector store loaded for {book_id}")
-            except Exception as e:
-                print(f"❌ Failed to load vector store for {book_id}: {e}")
-                
     except Exception as e:
         print(f"❌ Startup error: {e}")
+    loaded = all(b in vector_stores for b in BOOK_IDS) and embeddings_model is not None
+    print(f"{'✅' if loaded else '❌'} Resources loaded in {time.time() - start:.1f}s")
+
+    # Readiness waits for the warmup, which is best-effort: a warmup that
+    # fails or runs out of time is logged and the worker serves anyway
+    if loaded and warmup.WARMUP_ENABLED:
+        try:
+            await asyncio.wait_for(run_warmup(), warmup.WARMUP_TIMEOUT_S)
+            warmup_report.finish("done")
+        except asyncio.TimeoutError:
+            warmup_report.finish("timed_out")
+        except Exception as e:
+            warmup_report.finish("failed", f"{type(e).__name__}: {e}")
+        # Under src.serve, shared_mb should stay close to its value before the warmup
+        warmup_report.memory["after"] = process_memory(os.getpid())
+        print(f"{'✅' if warmup_report.state == 'done' else '❌'} Warmup {warmup_report.state}: "
+              f"{warmup_report.stats()}")
+    elif not warmup.WARMUP_ENABLED:
+        warmup_report.finish("disabled")
+    ready = loaded
+    # Not needed to answer questions, so it does not hold up readiness;
+    # under src.serve the master has built them already
+    eda_task = asyncio.create_task(asyncio.to_thread(prepare_eda_artifacts))
+
+@app.on_event("startup")
+async def startup_event():
+    """Start serving right away and load expensive resources in the background.
+
+    /api/live answers as soon as the server accepts connections; /api/ready
+    and the question endpoints wait for the indexes.
+    """
+    global result_cache, worker_executor, resources_task, main_loop
+
+    main_loop = asyncio.get_running_loop()
+
+    # Bound the threads behind asyncio.to_thread (retrieval, embeddings)
+    worker_executor = make_executor()
+    asyncio.get_running_loop().set_default_executor(worker_executor)
+
+    result_cache = build_result_cache()
+
+    # Indexes are already loaded when forked by src.serve, so this is quick there
+    resources_task = asyncio.create_task(load_resources())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Save this worker's most asked questions and stop its ingestion jobs."""
+    hot_queries.save()
+    if ingest_jobs is not None:
+        await asyncio.to_thread(ingest_jobs.shutdown)
+
+# -----------------------------------------------------------------------------
+# Metrics (read at scrape time; nothing extra on the request path)
+# -----------------------------------------------------------------------------
+
+def _cache_samples():
+    if result_cache is None:
+        return []
+    samples = []
+    for name, s in result_cache.stats()["endpoints"].items():
+        endpoint, namespace = name.split(".", 1)
+        labels = {"endpoint": endpoint, "namespace": namespace}
+        samples.append(({**labels, "result": "hit"}, s["hits"]))
+        samples.append(({**labels, "result": "miss"}, s["misses"]))
+    return samples
+
+def _executor_queue_depth():
+    if worker_executor is None:
+        return []
+    # ThreadPoolExecutor exposes no public backlog counter
+    return [({}, worker_executor._work_queue.qsize())]
+
+metrics.register_index_metrics(vector_stores)
+metrics.CallbackMetric(
+    "rag_cache_lookups_total", "Result cache lookups by endpoint, namespace and result.",
+    _cache_samples, type="counter",
+)
+metrics.CallbackMetric(
+    "rag_executor_queue_depth", "Blocking calls waiting for a worker thread.",
+    _executor_queue_depth,
+)
+metrics.CallbackMetric(
+    "rag_admission_queue_depth", "Requests waiting for an admission slot.",
+    lambda: [({}, admission.queue_depth)],
+)
+metrics.CallbackMetric(
+    "rag_admission_in_flight", "Requests holding an admission slot.",
+    lambda: [({}, admission.in_flight)],
+)
+metrics.CallbackMetric(
+    "rag_admission_rejected_total", "Requests rejected by admission control.",
+    lambda: [
+        ({"reason": "queue_full"}, admission.rejected_queue_full),
+        ({"reason": "timeout"}, admission.rejected_timeout),
+    ],
+    type="counter",
+)
+metrics.CallbackMetric(
+    "rag_coalesced_requests_total", "Requests served by an identical in-flight request.",
+    lambda: [({}, ask_flight.coalesced)], type="counter",
+)
+metrics.CallbackMetric(
+    "rag_sessions_active", "Conversational sessions held by this worker.",
+    lambda: [({}, len(sessions))],
+)
+metrics.CallbackMetric(
+    "rag_gemini_in_flight", "Gemini calls currently in flight.",
+    lambda: [({}, get_client().in_flight)] if get_client.cache_info().currsize else [],
+)
+
+def _validate_book(book_id: str) -> None:
+    """Raise an HTTPException if the book is unknown or its index is not loaded."""
+    if book_id not in BOOK_IDS:
+        raise HTTPException(status_code=400, detail="Invalid book_id")
+
+    if book_id not in vector_stores:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Vector store for {book_id} not loaded"
+        )
+
+def _format_sources(
+    passages: List[Document], scores: Optional[List[float]] = None
+) -> List[Dict[str, Any]]:
+    """Convert retrieved passages into the JSON source format."""
+    scores = scores or [None] * len(passages)
+    return [
+        {
+            "id": doc.id,
+            "content": doc.page_content,
+            "metadata": doc.metadata,
+            "rank": i + 1,
+            "score": score,
+        }
+        for i, (doc, score) in enumerate(zip(passages, scores))
+    ]
+
+# Metadata kept in "snippet" sources; the rest (image_refs, book_id, ...) is dropped
+SNIPPET_METADATA = ("chapter", "pdf_page")
+
+def _snippet(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip() + "…"
+
+def _select_sources(result: Dict[str, Any], request: QuestionRequest) -> List[Dict[str, Any]]:
+    """Trim the cached full sources to the fields the request asked for."""
+    sources = result["sources"]
+    if request.source_fields == "full":
+        return sources
+    chunk_ids = result.get("chunk_ids") or [None] * len(sources)
+    if request.source_fields == "ids":
+        return [
+            {"id": cid, "rank": src["rank"], "score": src.get("score")}
+            for cid, src in zip(chunk_ids, sources)
+        ]
+    return [
+        {
+            "id": cid,
+            "rank": src["rank"],
+            "score": src.get("score"),
+            "content": _snippet(src["content"], request.snippet_chars),
+            "metadata": {k: src["metadata"][k] for k in SNIPPET_METADATA if k in src["metadata"]},
+        }
+        for cid, src in zip(chunk_ids, sources)
+    ]
+
+def _sse_event(event: str, data: Any) -> str:
+    """Encode a single Server-Sent Event."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
+def _ndjson_line(data: Dict[str, Any]) -> bytes:
+    return orjson.dumps(data) + b"\n"
+
+def _retrieval_key(question: str, book_id: str) -> tuple:
+    """Identify requests that are guaranteed to retrieve the same passages."""
+    get_vector_store(book_id)  # picks up a re-ingested index before keying on it
+    return (
+        normalize_question(question),
+        book_id,
+        VECTOR_K,
+        MAX_FINAL_PASSAGES,
+        vector_store_versions[book_id],
+    )
+
+def _pipeline_key(
+    question: str, book_id: str, verify: bool = False, answer_mode: str = "generate"
+) -> tuple:
+    """Identify requests that are guaranteed to produce the same pipeline result.
+
+    Only for full-budget runs: a deadline can degrade the result, so degraded
+    results are neither cached nor shared (see _coalesced).
+    """
+    return _retrieval_key(question, book_id) + (
+        CONTEXT_TOKEN_BUDGET, GENERATION_MODEL, verify, answer_mode
+    )
+
+def _request_deadline(request: QuestionRequest) -> Deadline:
+    return Deadline.from_ms(request.deadline_ms or DEFAULT_DEADLINE_MS)
+
+async def _coalesced(key: tuple, fn, deadline: Deadline) -> Dict[str, Any]:
+    """Run ``fn`` through ask_flight, with each waiter held to its own deadline.
+
+    The deadline is not part of the pipeline key, so only requests without one
+    start a shared execution: a leader's budget would otherwise expire or
+    degrade (skip rerank, shrink k) the answer for every follower. A request
+    with a deadline joins such a full-quality execution if one is in flight,
+    and otherwise runs its own.
+    """
+    return await ask_flight.do(
+        key, fn, timeout=deadline.timeout(), lead=deadline.budget_s is None
+    )
+
+async def _retrieve(
+    question: str, book_id: str, endpoint: str, deadline: Deadline
+) -> Tuple[List[Document], Optional[List[float]], Optional[List[float]]]:
+    """Retrieve passages, reusing cached chunk IDs when available.
+
+    Misses use the in-memory index and a micro-batched query embedding.
+    Results degraded by the deadline are not cached. Returns the passages, the
+    query embedding (None on a cache hit, where none was computed) and each
+    passage's similarity score.
+    """
+    vs = get_vector_store(book_id)
+    key = _retrieval_key(question, book_id)
+    with span("cache_lookup", namespace="retrieval"):
+        cached = await result_cache.aget(endpoint, "retrieval", key)
+    if cached is not None:
+        docs = [vs.docstore.search(chunk_id) for chunk_id in cached["chunk_ids"]]
+        if all(isinstance(d, Document) for d in docs):
+            return docs, None, cached.get("scores")
+
+    start_time = time.time()
+    with span("query_embedding"):
+        query_embedding = await embedding_batcher.embed_query(question)
+    with span("retrieve", book_id=book_id):
+        passages = await asyncio.to_thread(
+            retrieve, question, book_id, vs, query_embedding, deadline
+        )
+    scores = similarity_scores(vs, passages, query_embedding)
+    if not deadline.degraded:
+        await result_cache.aset("retrieval", key, {
+            "chunk_ids": [doc.id for doc in passages],
+            "scores": scores,
+            "compute_ms": (time.time() - start_time) * 1000,
+        })
+    return passages, query_embedding, scores
+
+def _pipeline_result(
+    answer: str,
+    passages: List[Document],
+    packed: PackedContext,
+    start_time: float,
+    deadline: Deadline,
+    verified: Optional[bool] = None,
+    answer_mode: str = "generate",
+    extractive_confidence: Optional[float] = None,
+    scores: Optional[List[float]] = None,
+) -> Dict[str, Any]:
+    """Cacheable, JSON-serializable outcome of one pipeline run."""
+    return {
+        "answer": answer,
+        "sources": _format_sources(passages, scores),
+        "chunk_ids": [doc.id for doc in passages],
+        "context_tokens": packed.tokens_after,
+        "context_tokens_saved": packed.tokens_saved,
+        "verified": verified,
+        "skipped_stages": list(deadline.skipped),
+        "answer_mode": answer_mode,
+        "extractive_confidence": extractive_confidence,
+        "compute_ms": (time.time() - start_time) * 1000,
+    }
+
+async def _extractive_answer(
+    question: str, book_id: str, passages: List[Document],
+    query_embedding: Optional[List[float]],
+):
+    """Score passage sentences against the question; no LLM involved."""
+    if query_embedding is None:
+        query_embedding = await embedding_batcher.embed_query(question)
+    vectors = passage_vectors(get_vector_store(book_id), passages)
+    return extract_answer(question, passages, query_embedding, vectors)
+
+async def _retrieve_batch(
+    requests: Dict[int, QuestionRequest]
+) -> Dict[int, Tuple[List[Document], List[float], List[float]]]:
+    """Retrieve passages for many questions at full quality.
+
+    All questions are embedded in one call and each book's index is searched
+    once for all of its questions. Results are added to the retrieval cache.
+    """
+    texts = list(dict.fromkeys(r.question for r in requests.values()))
+    vectors = dict(zip(texts, await asyncio.to_thread(embed_queries, get_embeddings(), texts)))
+
+    by_book: Dict[str, List[int]] = defaultdict(list)
+    for i, r in requests.items():
+        by_book[r.book_id].append(i)
+
+    retrieved = {}
+    for book_id, indices in by_book.items():
+        start_time = time.time()
+        questions = [requests[i].question for i in indices]
+        query_embeddings = [vectors[q] for q in questions]
+        vs = get_vector_store(book_id)
+        passages = await asyncio.to_thread(retrieve_batch, questions, vs, query_embeddings)
+        compute_ms = (time.time() - start_time) * 1000 / len(indices)
+        for i, question, docs, embedding in zip(indices, questions, passages, query_embeddings):
+            scores = similarity_scores(vs, docs, embedding)
+            retrieved[i] = (docs, embedding, scores)
+            await result_cache.aset("retrieval", _retrieval_key(question, book_id), {
+                "chunk_ids": [doc.id for doc in docs],
+                "scores": scores,
+                "compute_ms": compute_ms,
+            })
+    return retrieved
+
+async def _answer_pipeline(
+    request: QuestionRequest,
+    key: tuple,
+    deadline: Deadline,
+    retrieved: Optional[Tuple[List[Document], Optional[List[float]], Optional[List[float]]]] = None,
+) -> Dict[str, Any]:
+    """Run retrieval, answering and optional verification for one question.
+
+    ``retrieved`` skips retrieval with passages fetched by the caller. Full-quality
+    results are cached; results degraded by the deadline are not.
+    """
+    start_time = time.time()
+    question, book_id = request.question, request.book_id
+    if retrieved is None:
+        retrieved = await _retrieve(question, book_id, "ask", deadline)
+    passages, query_embedding, scores = retrieved
+
+    # Extractive fast path: answer with the best passage sentence and skip the LLM
+    if request.answer_mode != "generate":
+        with span("extractive"):
+            extracted = await _extractive_answer(question, book_id, passages, query_embedding)
+        if extracted is not None and (
+            request.answer_mode == "extractive"
+            or extracted.confidence >= EXTRACTIVE_MIN_CONFIDENCE
+        ):
+            # The span is quoted verbatim from a passage, so it is grounded
+            result = _pipeline_result(
+                f"{extracted.text} [Source {extracted.source_rank}]",
+                passages, PackedContext(), start_time, deadline,
+                verified=True if request.verify else None,
+                answer_mode="extractive",
+                extractive_confidence=extracted.confidence,
+                scores=scores,
+            )
+            if not deadline.degraded:
+                await result_cache.aset("answer", key, result)
+            return result
+
+    # Pack passages into the prompt token budget
+    with span("context_pack"):
+        packed = pack_context(passages)
+
+    # Generate answer (native async Gemini call, no worker thread)
+    answer = await agenerate_answer(question, passages, packed, deadline)
+
+    verified = await averify_answer(answer, passages, deadline) if request.verify else None
+
+    result = _pipeline_result(
+        answer, passages, packed, start_time, deadline, verified, scores=scores
+    )
+    if not deadline.degraded:
+        await result_cache.aset("answer", key, result)
+    return result
+
+def _response(
+    result: Dict[str, Any],
+    request: QuestionRequest,
+    processing_time: float,
+    cached: bool,
+    trace: Optional[tracing.Trace] = None,
+) -> Dict[str, Any]:
+    """``QuestionResponse`` payload as a plain dict.
+
+    Endpoints hand it straight to orjson; building the Pydantic model and
+    validating it again on the way out cost more than encoding the answer.
+    """
+    return {
+        "answer": result["answer"],
+        "sources": _select_sources(result, request),
+        "processing_time": processing_time,
+        "status": "success",
+        "context_tokens": result["context_tokens"],
+        "context_tokens_saved": result["context_tokens_saved"],
+        "cached": cached,
+        "verified": result["verified"],
+        "skipped_stages": result["skipped_stages"],
+        "answer_mode": result["answer_mode"],
+        "extractive_confidence": result["extractive_confidence"],
+        "timings": trace.timings() if trace is not None else None,
+        "trace_id": trace.trace_id if trace is not None else None,
+    }
+
+# -----------------------------------------------------------------------------
+# Warmup (see src.warmup)
+# -----------------------------------------------------------------------------
+
+async def _warm_question(question: str, book_id: str) -> None:
+    """Run a canned question through the uncached request path."""
+    deadline = Deadline.from_ms(0)
+    query_embedding = await embedding_batcher.embed_query(question)
+    passages = await asyncio.to_thread(
+        retrieve, question, book_id, get_vector_store(book_id), query_embedding, deadline
+    )
+    packed = pack_context(passages)  # also loads the tokenizer
+    if warmup.WARMUP_GENERATE:
+        await agenerate_answer(question, passages, packed, deadline)
+
+def _hot_requests(books: List[str]) -> List[QuestionRequest]:
+    requests = []
+    for q in hot_queries.load():
+        try:
+            request = QuestionRequest(**{f: q[f] for f in warmup.HOT_QUERY_FIELDS if f in q})
+        except ValueError:
+            continue  # hand-edited entry with an invalid field
+        if request.book_id in books:
+            requests.append(request)
+    return requests
+
+async def run_warmup() -> None:
+    """Prime this worker's indexes, clients and caches before it reports ready."""
+    report = warmup_report
+    report.state = "running"
+    report.memory["before"] = process_memory(os.getpid())
+    books = [b for b in BOOK_IDS if b in vector_stores]
+
+    report.phase("touch_index")
+    touched = await asyncio.gather(
+        *(asyncio.to_thread(warmup.touch_index, vector_stores[b]) for b in books)
+    )
+    report.counts["index_mb_touched"] = round(sum(touched) / 2**20, 1)
+
+    report.phase("canned_questions")
+    canned = [(q, b) for b in books for q in warmup.WARMUP_QUESTIONS.get(b, [])]
+    await asyncio.gather(*(_warm_question(q, b) for q, b in canned))
+    report.counts["canned_questions"] = len(canned)
+
+    # Cached hot queries are copied from SQLite into the in-memory layer by
+    # the lookup itself; uncached ones are retrieved in one batch
+    report.phase("hot_queries")
+    requests = _hot_requests(books)
+    answer_misses, retrieval_misses = {}, {}
+    for i, r in enumerate(requests):
+        key = _pipeline_key(r.question, r.book_id, r.verify, r.answer_mode)
+        if await result_cache.aget("warmup", "answer", key) is not None:
+            continue
+        answer_misses[i] = key
+        if await result_cache.aget("warmup", "retrieval", _retrieval_key(r.question, r.book_id)) is None:
+            retrieval_misses[i] = r
+    if retrieval_misses:
+        await _retrieve_batch(retrieval_misses)
+    report.counts.update(
+        hot_queries=len(requests),
+        hot_answers_cached=len(requests) - len(answer_misses),
+        hot_retrieved=len(retrieval_misses),
+    )
+
+    if warmup.WARMUP_GENERATE and answer_misses:
+        report.phase("hot_generate")
+        semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+        async def generate(i: int, key: tuple) -> None:
+            async with semaphore:
+                await _answer_pipeline(requests[i], key, Deadline.from_ms(0))
+
+        await asyncio.gather(*(generate(i, key) for i, key in answer_misses.items()))
+        report.counts["hot_generated"] = len(answer_misses)
 
 @app.post("/api/ask", response_model=QuestionResponse)
-async def ask_question(request: QuestionRequest):
-    """Async endpoint for asking questions."""
+async def ask_question(
+    request: QuestionRequest,
+    debug: Optional[str] = Query(None, pattern="^timings$"),
+):
+    """Async endpoint for asking questions.
+
+    With ``?debug=timings`` the response carries per-stage milliseconds and
+    the trace ID of the request's spans in the trace log. A request that joins
+    an identical in-flight one only times its own wait.
+    """
     start_time = time.time()
     
     try:
-        # Validate book_id
-        if request.book_id not in ["debt_crisis", "capitalism"]:
-            raise HTTPException(status_code=400, detail="Invalid book_id")
+        _validate_book(request.book_id)
         
-        # Check if vector store is loaded
-        if request.book_id not in vector_stores:
-            raise HTTPException(
-                status_code=503, 
-                detail=f"Vector store for {request.book_id} not loaded"
+        with tracing.trace("POST /api/ask", book_id=request.book_id) as trace:
+            deadline = _request_deadline(request)
+            key = _pipeline_key(
+                request.question, request.book_id, request.verify, request.answer_mode
+            )
+            with span("cache_lookup", namespace="answer"):
+                result = await result_cache.aget("ask", "answer", key)
+            cached = result is not None
+            if result is None:
+                # Identical questions already in flight await the same execution
+                # (and share its admission slot); see _coalesced for deadlines
+                async def admitted_pipeline():
+                    with span("admission_wait"):
+                        ticket = await admission.acquire()
+                    try:
+                        return await _answer_pipeline(request, key, deadline)
+                    finally:
+                        ticket.release()
+
+                result = await _coalesced(key, admitted_pipeline, deadline)
+            
+            processing_time = time.time() - start_time
+            hot_queries.record(request.question, request.book_id, request.verify, request.answer_mode)
+            warmup_report.record_request(processing_time)
+            
+            return ORJSONResponse(
+                _response(result, request, processing_time, cached, trace if debug else None)
             )
         
-        # Retrieve passages (async)
-        passages = await asyncio.to_thread(
-            retrieve, request.question, request.book_id
-        )
-        
-        # Generate answer (async)
-        answer = await asyncio.to_thread(
-            generate_answer, request.question, passages
-        )
-        
-        # Format sources
-        sources = []
-        for i, doc in enumerate(passages):
-            sources.append({
-                "content": doc.page_content,
-                "metadata": doc.metadata,
-                "rank": i + 1
-            })
-        
-        processing_time = time.time() - start_time
-        
-        return QuestionResponse(
-            answer=answer,
-            sources=sources,
-            processing_time=processing_time,
-            status="success"
-        )
-        
-    except HTTPException:
+    except (HTTPException, Overloaded):
         raise
+    except (DeadlineExceeded, asyncio.TimeoutError):
+        raise HTTPException(
+            status_code=504,
+            detail=f"Deadline of {request.deadline_ms or DEFAULT_DEADLINE_MS} ms exceeded"
+        )
     except Exception as e:
         processing_time = time.time() - start_time
         return QuestionResponse(
@@ -156,15 +830,414 @@ async def ask_question(request: QuestionRequest):
             status="error"
         )
 
+@app.post("/api/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """Stream the answer as Server-Sent Events.
+
+    Events are sent in order: ``sources`` (retrieved passages), one ``token``
+    per generated text chunk, and finally ``timings`` with the stage breakdown.
+    Failures after the stream has started are reported as an ``error`` event.
+    """
+    start_time = time.time()
+    _validate_book(request.book_id)
+    key = _pipeline_key(request.question, request.book_id)
+    cached = await result_cache.aget("ask_stream", "answer", key)
+    # Take the admission slot before the response starts so overload is still
+    # reported as a status code; cache hits do not need one
+    ticket = await admission.acquire() if cached is None else None
+    # Streams always use the default verify/answer_mode, so they share keys with those asks
+    hot_queries.record(request.question, request.book_id)
+
+    async def event_stream():
+        deadline = _request_deadline(request)
+        try:
+            if cached is not None:
+                yield _sse_event("sources", {"sources": _select_sources(cached, request)})
+                yield _sse_event("token", {"text": cached["answer"]})
+                end_time = time.time()
+                yield _sse_event("timings", {
+                    "retrieval_time": 0.0,
+                    "time_to_first_token": end_time - start_time,
+                    "generation_time": 0.0,
+                    "processing_time": end_time - start_time,
+                    "context_tokens": cached["context_tokens"],
+                    "context_tokens_saved": cached["context_tokens_saved"],
+                    "cached": True,
+                    "skipped_stages": [],
+                })
+                return
+
+            passages, _, scores = await _retrieve(
+                request.question, request.book_id, "ask_stream", deadline
+            )
+            retrieval_done = time.time()
+            yield _sse_event("sources", {"sources": _select_sources(
+                {"sources": _format_sources(passages, scores), "chunk_ids": [d.id for d in passages]},
+                request,
+            )})
+
+            packed = pack_context(passages)
+            first_token_time = None
+            answer = ""
+            async for text in agenerate_answer_stream(
+                request.question, passages, packed, deadline
+            ):
+                if first_token_time is None:
+                    first_token_time = time.time()
+                answer += text
+                yield _sse_event("token", {"text": text})
+
+            end_time = time.time()
+            if not deadline.degraded:
+                await result_cache.aset(
+                    "answer", key,
+                    _pipeline_result(answer, passages, packed, start_time, deadline, scores=scores),
+                )
+            yield _sse_event("timings", {
+                "retrieval_time": retrieval_done - start_time,
+                "time_to_first_token": (first_token_time or end_time) - start_time,
+                "generation_time": end_time - retrieval_done,
+                "processing_time": end_time - start_time,
+                "context_tokens": packed.tokens_after,
+                "context_tokens_saved": packed.tokens_saved,
+                "cached": False,
+                "skipped_stages": deadline.skipped,
+            })
+        except Exception as e:
+            yield _sse_event("error", {
+                "detail": f"Error processing request: {str(e)}",
+                "processing_time": time.time() - start_time,
+            })
+        finally:
+            if ticket is not None:
+                ticket.release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also covers a client that disconnects before the stream starts
+        background=BackgroundTask(ticket.release) if ticket is not None else None,
+    )
+
+@app.post("/api/ask/batch")
+async def ask_batch(batch: BatchQuestionRequest):
+    """Answer many questions in one request, streamed back as NDJSON.
+
+    Each line is a ``QuestionResponse`` plus the ``index``, ``question`` and
+    ``book_id`` of the item it answers, written in completion order. Cached
+    answers are written first. The remaining questions share one embedding
+    call and one index search per book, then generate with at most
+    ``max_concurrency`` in flight. An item's ``deadline_ms`` starts when its
+    generation starts.
+    """
+    if len(batch.questions) > BATCH_MAX_QUESTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch exceeds {BATCH_MAX_QUESTIONS} questions"
+        )
+    for request in batch.questions:
+        _validate_book(request.book_id)
+    # A batch holds one admission slot for its whole run; its own semaphore
+    # bounds the generations inside it
+    ticket = await admission.acquire()
+    concurrency = min(batch.max_concurrency or BATCH_MAX_CONCURRENCY, BATCH_MAX_CONCURRENCY)
+
+    def item_line(index: int, response: Dict[str, Any]) -> bytes:
+        request = batch.questions[index]
+        return _ndjson_line({
+            "index": index,
+            "question": request.question,
+            "book_id": request.book_id,
+            **response,
+        })
+
+    def error_line(index: int, detail: str, start_time: float) -> bytes:
+        return item_line(index, QuestionResponse(
+            answer=f"Error processing request: {detail}",
+            sources=[],
+            processing_time=time.time() - start_time,
+            status="error"
+        ).model_dump())
+
+    async def result_stream():
+        start_time = time.time()
+        keys = {}
+        pending = {}
+        for i, request in enumerate(batch.questions):
+            keys[i] = _pipeline_key(
+                request.question, request.book_id, request.verify, request.answer_mode
+            )
+            cached = await result_cache.aget("ask_batch", "answer", keys[i])
+            if cached is not None:
+                yield item_line(i, _response(cached, request, time.time() - start_time, cached=True))
+            else:
+                pending[i] = request
+        if not pending:
+            return
+
+        try:
+            retrieved = await _retrieve_batch(pending)
+        except Exception as e:
+            for i in pending:
+                yield error_line(i, str(e), start_time)
+            return
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def answer(i: int) -> str:
+            request = pending[i]
+            async with semaphore:
+                item_start = time.time()
+                deadline = _request_deadline(request)
+                try:
+                    result = await _coalesced(
+                        keys[i],
+                        lambda: _answer_pipeline(request, keys[i], deadline, retrieved[i]),
+                        deadline,
+                    )
+                except (DeadlineExceeded, asyncio.TimeoutError):
+                    return error_line(
+                        i, f"Deadline of {request.deadline_ms or DEFAULT_DEADLINE_MS} ms exceeded",
+                        item_start,
+                    )
+                except Exception as e:
+                    return error_line(i, str(e), item_start)
+                return item_line(
+                    i, _response(result, request, time.time() - item_start, cached=False)
+                )
+
+        tasks = [asyncio.ensure_future(answer(i)) for i in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Client went away: stop generating answers nobody will read
+            for task in tasks:
+                task.cancel()
+
+    async def admitted_stream():
+        try:
+            async for line in result_stream():
+                yield line
+        finally:
+            ticket.release()
+
+    return StreamingResponse(
+        admitted_stream(),
+        media_type="application/x-ndjson",
+        background=BackgroundTask(ticket.release),
+    )
+
+# -----------------------------------------------------------------------------
+# Conversational sessions (see src.sessions)
+# -----------------------------------------------------------------------------
+
+# Per-turn message fields; the book is fixed for the whole session
+SESSION_MESSAGE_FIELDS = ("question", "deadline_ms", "source_fields", "snippet_chars")
+
+def _ws_event(event: str, data: Dict[str, Any]) -> str:
+    return orjson.dumps({"event": event, **data}).decode()
+
+async def _session_passages(session, request: QuestionRequest, kind: str, rewritten: str,
+                            deadline: Deadline) -> List[Document]:
+    """Passages for one turn, reusing the session's earlier retrievals."""
+    if kind == CONTINUATION:
+        passages = session.last_passages()
+        if passages:
+            return passages
+    if kind == FRESH:
+        passages, _, _ = await _retrieve(request.question, request.book_id, "session", deadline)
+        return passages
+    with span("query_embedding"):
+        query_embedding = await embedding_batcher.embed_query(rewritten)
+    with span("retrieve", book_id=request.book_id):
+        return await asyncio.to_thread(
+            retrieve_extending, rewritten, get_vector_store(request.book_id),
+            query_embedding, session.best_candidates(query_embedding), deadline,
+        )
+
+async def _session_turn(websocket: WebSocket, session, request: QuestionRequest) -> None:
+    """Answer one question of a session, streaming events to the socket."""
+    start_time = time.time()
+    status = 200
+    kind = session.classify(request.question)
+    rewritten = session.rewrite(request.question, kind)
+    sessions.touch(session, kind)
+    ticket = None
+    try:
+        _validate_book(request.book_id)
+        with tracing.trace("WS /api/session", book_id=request.book_id, turn_kind=kind) as trace:
+            deadline = _request_deadline(request)
+            vs = get_vector_store(request.book_id)
+            # Standalone questions share the answer cache with the stateless endpoints
+            key = _pipeline_key(request.question, request.book_id) if kind == FRESH else None
+            cached = await result_cache.aget("session", "answer", key) if key else None
+            if cached is not None:
+                passages = [vs.docstore.search(chunk_id) for chunk_id in cached["chunk_ids"]]
+                passages = [d for d in passages if isinstance(d, Document)]
+                hot_queries.record(request.question, request.book_id)
+            else:
+                with span("admission_wait"):
+                    ticket = await admission.acquire()
+                passages = await _session_passages(session, request, kind, rewritten, deadline)
+            retrieval_done = time.time()
+            await websocket.send_text(_ws_event("sources", {
+                "sources": _select_sources(
+                    {"sources": _format_sources(passages), "chunk_ids": [d.id for d in passages]},
+                    request,
+                ),
+                "turn_kind": kind,
+                "rewritten_question": rewritten,
+            }))
+
+            first_token_time = None
+            if cached is not None:
+                answer, packed = cached["answer"], None
+                await websocket.send_text(_ws_event("token", {"text": answer}))
+            else:
+                packed = pack_context(passages)
+                answer = ""
+                async for text in agenerate_answer_stream(rewritten, passages, packed, deadline):
+                    if first_token_time is None:
+                        first_token_time = time.time()
+                    answer += text
+                    await websocket.send_text(_ws_event("token", {"text": text}))
+                if key is not None and not deadline.degraded:
+                    await result_cache.aset(
+                        "answer", key,
+                        _pipeline_result(answer, passages, packed, start_time, deadline),
+                    )
+                    hot_queries.record(request.question, request.book_id)
+
+            session.add_turn(
+                Turn(request.question, rewritten, kind, [d.id for d in passages], answer),
+                passages, passage_vectors(vs, passages),
+            )
+            end_time = time.time()
+            await websocket.send_text(_ws_event("timings", {
+                "retrieval_time": retrieval_done - start_time,
+                "time_to_first_token": (first_token_time or end_time) - start_time,
+                "generation_time": end_time - retrieval_done,
+                "processing_time": end_time - start_time,
+                "context_tokens": packed.tokens_after if packed else cached["context_tokens"],
+                "cached": cached is not None,
+                "skipped_stages": deadline.skipped,
+                "turn": len(session.turns),
+                "trace_id": trace.trace_id,
+            }))
+    except WebSocketDisconnect:
+        status = 499
+        raise
+    except (HTTPException, Overloaded) as e:
+        status = e.status_code
+        await websocket.send_text(_ws_event("error", {
+            "detail": e.detail, "status_code": e.status_code,
+            "retry_after": getattr(e, "retry_after", None),
+        }))
+    except (DeadlineExceeded, asyncio.TimeoutError):
+        status = 504
+        await websocket.send_text(_ws_event("error", {
+            "detail": f"Deadline of {request.deadline_ms or DEFAULT_DEADLINE_MS} ms exceeded",
+            "status_code": 504,
+        }))
+    except Exception as e:
+        status = 500
+        await websocket.send_text(_ws_event("error", {
+            "detail": f"Error processing request: {str(e)}", "status_code": 500,
+        }))
+    finally:
+        if ticket is not None:
+            ticket.release()
+        # The metrics middleware only sees HTTP, so turns are recorded here
+        metrics.REQUEST_SECONDS.observe(time.time() - start_time, route="/api/session")
+        metrics.REQUESTS.inc(route="/api/session", status=str(status))
+
+@app.websocket("/api/session")
+async def session_socket(
+    websocket: WebSocket,
+    book_id: str,
+    session_id: Optional[str] = None,
+):
+    """Conversational question answering over one WebSocket.
+
+    The server first sends a ``session`` event with the session ID. Pass it
+    as ``session_id`` when reconnecting to keep the conversation. Each client
+    message is a JSON object with ``question`` (and optionally
+    ``deadline_ms``, ``source_fields``, ``snippet_chars``). It is answered
+    with the ``sources``, ``token`` and ``timings`` events of
+    /api/ask/stream, or an ``error`` event. Follow-up questions reuse the
+    session's earlier retrievals; see src.sessions.
+    """
+    if book_id not in BOOK_IDS:
+        await websocket.close(code=1008, reason="Invalid book_id")
+        return
+    await websocket.accept()
+    session = sessions.open(book_id, session_id)
+    try:
+        await websocket.send_text(_ws_event("session", session.summary()))
+        while True:
+            try:
+                message = orjson.loads(await websocket.receive_text())
+                request = QuestionRequest(
+                    book_id=book_id,
+                    **{k: message[k] for k in SESSION_MESSAGE_FIELDS if k in message},
+                )
+            except (orjson.JSONDecodeError, TypeError, ValidationError) as e:
+                await websocket.send_text(_ws_event("error", {
+                    "detail": f"Invalid message: {e}", "status_code": 422,
+                }))
+                continue
+            async with session.lock:
+                await _session_turn(websocket, session, request)
+    except WebSocketDisconnect:
+        pass
+
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
     return HealthResponse(
         status="healthy",
         vector_stores_loaded=list(vector_stores.keys()),
-        embeddings_model_loaded=embeddings_model is not None
+        embeddings_model_loaded=embeddings_model is not None,
+        workers=worker_memory()
     )
 
+@app.get("/api/live")
+async def liveness():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "alive"}
+
+@app.get("/api/ready")
+async def readiness():
+    """Readiness probe: 503 until every index is loaded and the warmup has run."""
+    body = {
+        "ready": ready,
+        "vector_stores_loaded": list(vector_stores.keys()),
+        "embeddings_model_loaded": embeddings_model is not None,
+        "warmup": warmup_report.state,
+    }
+    return ORJSONResponse(body, status_code=200 if ready else 503)
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus text-format metrics for this worker."""
+    return Response(metrics.render_all(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/api/stats")
+async def get_stats():
+    """Runtime counters for the serving pipeline."""
+    return {
+        "coalescing": ask_flight.stats(),
+        "embedding_batcher": embedding_batcher.stats(),
+        "result_cache": result_cache.stats(),
+        "grounding": grounding.stats(),
+        "admission": {**admission.stats(), "worker_threads": WORKER_THREADS},
+        "warmup": warmup_report.stats(),
+        "sessions": sessions.stats(),
+        "ingest_jobs": ingest_jobs.stats() if ingest_jobs is not None else None,
+    }
+
 @app.get("/api/books")
 async def get_available_books():
     """Get available books."""
@@ -184,21 +1257,168 @@ async def get_available_books():
     }
 
 
+# -----------------------------------------------------------------------------
+# Passages by chunk ID
+# -----------------------------------------------------------------------------
+
+def _find_passage(chunk_id: str) -> Optional[Tuple[str, Document]]:
+    """Look a chunk ID up in the loaded docstores.
+
+    IDs from the current ingestion start with their book ID, so normally only
+    that book's docstore is checked. Older indexes use random docstore IDs,
+    and for those every loaded book is tried.
+    """
+    hinted = [b for b in BOOK_IDS if chunk_id.startswith(b + "-")]
+    for book_id in hinted + [b for b in BOOK_IDS if b not in hinted]:
+        vs = vector_stores.get(book_id)
+        if vs is None:
+            continue
+        doc = vs.docstore.search(chunk_id)
+        if isinstance(doc, Document):
+            return book_id, doc
+    return None
+
+def _passage_payload(book_id: str, doc: Document) -> Dict[str, Any]:
+    return {"id": doc.id, "book_id": book_id, "content": doc.page_content, "metadata": doc.metadata}
+
+def _not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    return bool(if_none_match) and (
+        if_none_match.strip() == "*"
+        or etag in {t.strip().removeprefix("W/") for t in if_none_match.split(",")}
+    )
+
+def _cached_json(request: Request, body: Any, etag_source: bytes) -> Response:
+    """JSON response with a content ETag; 304 when the client already has it."""
+    etag = '"' + hashlib.sha256(etag_source).hexdigest()[:32] + '"'
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={PASSAGE_CACHE_MAX_AGE_S}"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse(body, headers=headers)
+
+@app.get("/api/passages/{chunk_id}")
+async def get_passage(chunk_id: str, request: Request):
+    """Text and metadata of one passage, by the chunk ID returned in sources."""
+    found = _find_passage(chunk_id)
+    if found is None:
+        if len(vector_stores) < len(BOOK_IDS):
+            raise HTTPException(status_code=503, detail="Vector stores not loaded yet")
+        raise HTTPException(status_code=404, detail=f"Passage {chunk_id} not found")
+    body = _passage_payload(*found)
+    return _cached_json(request, body, orjson.dumps(body))
+
+@app.get("/api/passages")
+async def get_passages(request: Request, ids: List[str] = Query(..., min_length=1)):
+    """Several passages at once (``?ids=a&ids=b``), in the order asked for.
+
+    Unknown IDs are listed under ``missing`` rather than failing the request.
+    """
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > PASSAGES_MAX_BULK:
+        raise HTTPException(
+            status_code=413, detail=f"At most {PASSAGES_MAX_BULK} passages per request"
+        )
+    passages, missing = [], []
+    for chunk_id in ids:
+        found = _find_passage(chunk_id)
+        if found is None:
+            missing.append(chunk_id)
+        else:
+            passages.append(_passage_payload(*found))
+    body = {"passages": passages, "missing": missing}
+    return _cached_json(request, body, orjson.dumps(body))
+
+# -----------------------------------------------------------------------------
+# Ingestion jobs (see src.ingest_jobs)
+# -----------------------------------------------------------------------------
+
+def _reload_book(book_id: str) -> None:
+    """Load a freshly ingested index off the request path.
+
+    Called from the ingestion runner's thread; the load and swap run as the
+    same background reload a request would start.
+    """
+    if main_loop is None or main_loop.is_closed():
+        get_vector_store(book_id)
+        return
+    asyncio.run_coroutine_threadsafe(refresh_vector_store(book_id), main_loop).result()
+
+def get_ingest_jobs():
+    global ingest_jobs
+    if ingest_jobs is None:
+        # Imported on first use: it pulls in the EPUB parser and text splitter
+        from src.ingest_jobs import IngestJobs
+        ingest_jobs = IngestJobs(on_success=_reload_book)
+    return ingest_jobs
+
+@app.post("/api/ingest/jobs", status_code=202)
+async def submit_ingest_job(request: IngestRequest):
+    """Queue a re-ingest of a book; poll the returned job for progress."""
+    from src.ingest_jobs import JobConflict
+
+    runner = get_ingest_jobs()
+    try:
+        return await asyncio.to_thread(runner.submit, request.book_id)
+    except JobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api/ingest/jobs")
+async def list_ingest_jobs():
+    """Every ingestion job on record, newest first."""
+    return {"jobs": await asyncio.to_thread(get_ingest_jobs().list)}
+
+@app.get("/api/ingest/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    """State, current phase and per-phase progress of one job."""
+    job = await asyncio.to_thread(get_ingest_jobs().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job not found: {job_id}")
+    return job
+
+@app.post("/api/ingest/jobs/{job_id}/cancel")
+async def cancel_ingest_job(job_id: str):
+    """Stop a queued or running job; the current index is left as it was."""
+    job = await asyncio.to_thread(get_ingest_jobs().cancel, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Ingestion job not found: {job_id}")
+    return job
+
 @app.get("/api/eda/summary")
 async def eda_summary(
+    request: Request,
     book_id: str = Query(..., pattern="^(debt_crisis|capitalism)$"),
     include_wordcloud: bool = Query(True),
 ):
-    """Return a computed EDA summary for the requested book.
+    """Return the EDA summary for the requested book.
 
-    This endpoint offloads EDA computation to the backend to avoid heavy
-    operations in the Streamlit frontend on Cloud Run.
+    Served from the artifact written at ingest (see src.eda_api), so the
+    Streamlit frontend on Cloud Run does no heavy work. The artifact is
+    built here only if it is missing or outdated.
     """
+    from src.eda_api import get_eda_artifact
+
     try:
-        summary = compute_eda_summary(book_id, include_wordcloud)
-        return summary
+        artifact = await asyncio.to_thread(get_eda_artifact, book_id, _vs_path(book_id))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"EDA computation failed: {str(e)}")
+    etag = artifact.etag(include_wordcloud)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={EDA_CACHE_MAX_AGE_S}",
+        **artifact.headers(),
+    }
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(artifact.body(include_wordcloud), media_type="application/json", headers=headers)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    """Fast rejection while saturated, with a hint for when to retry."""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "status": "error"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
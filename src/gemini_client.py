@@ -0,0 +1,121 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Any, Optional
+
+from src.backends import make_generative_model
+from src.deadline import DeadlineExceeded
+
+GENERATION_MODEL = "gemini-2.5-flash"
+MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+
+# -----------------------------------------------------------------------------
+# Model cache
+# -----------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=None)
+def _cached_model(model_name: str, generation_config: tuple):
+    return make_generative_model(model_name, dict(generation_config) or None)
+
+
+def get_model(model_name: str = GENERATION_MODEL, **generation_config):
+    """Return the process-wide model for this configuration.
+
+    ``GenerativeModel`` instances share the library's default gRPC clients, so
+    reusing one per configuration keeps connections warm instead of paying the
+    construction cost on every call.
+    """
+    return _cached_model(model_name, tuple(sorted(generation_config.items())))
+
+
+# -----------------------------------------------------------------------------
+# Async client
+# -----------------------------------------------------------------------------
+
+
+def _request_options(timeout: Optional[float]) -> Dict[str, Any]:
+    return {"timeout": timeout} if timeout is not None else {}
+
+
+class GeminiClient:
+    """Native async Gemini client with bounded concurrency.
+
+    Calls go through ``generate_content_async`` so no worker thread is held
+    while waiting on the network. A semaphore caps in-flight requests; it is
+    created lazily because it must belong to the running event loop.
+    """
+
+    def __init__(
+        self,
+        model_name: str = GENERATION_MODEL,
+        max_concurrency: int = MAX_CONCURRENCY,
+        **generation_config,
+    ):
+        self.model = get_model(model_name, **generation_config)
+        self.max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.calls = 0
+        self.in_flight = 0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def _slot(self):
+        async with self._get_semaphore():
+            self.calls += 1
+            self.in_flight += 1
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Generate the full response text for ``prompt``.
+
+        ``timeout`` bounds the whole call, including the wait for a slot.
+        """
+        try:
+            return await asyncio.wait_for(self._generate(prompt, timeout), timeout)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(f"Generation did not finish within {timeout:.2f}s")
+
+    async def _generate(self, prompt: str, timeout: Optional[float]) -> str:
+        async with self._slot():
+            resp = await self.model.generate_content_async(
+                prompt, request_options=_request_options(timeout)
+            )
+        return resp.text
+
+    async def generate_stream(
+        self, prompt: str, timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Yield response text chunks as they arrive."""
+        async with self._slot():
+            resp = await self.model.generate_content_async(
+                prompt, stream=True, request_options=_request_options(timeout)
+            )
+            async for chunk in resp:
+                # The final chunk may only carry a finish reason and no text parts
+                if chunk.parts:
+                    yield chunk.text
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_client(model_name: str = GENERATION_MODEL) -> GeminiClient:
+    """Return the shared async client for ``model_name``."""
+    return GeminiClient(model_name)
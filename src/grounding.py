@@ -0,0 +1,161 @@
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence, Set
+
+import numpy as np
+from langchain.schema import Document
+
+from src.utils import split_sentences
+
+# Answers whose weakest sentence scores at or above this are accepted locally,
+# below GROUNDING_REJECT they are rejected locally; anything in between goes to
+# the LLM verifier.
+GROUNDING_ACCEPT = float(os.getenv("GROUNDING_ACCEPT", "0.7"))
+GROUNDING_REJECT = float(os.getenv("GROUNDING_REJECT", "0.3"))
+UNIGRAM_WEIGHT = 0.4
+BIGRAM_WEIGHT = 0.3
+ENTITY_WEIGHT = 0.3
+# Sentences with fewer content words ("In short:", "Yes.") are not scored
+MIN_CONTENT_WORDS = 3
+
+GROUNDED = "grounded"
+UNGROUNDED = "ungrounded"
+BORDERLINE = "borderline"
+
+STOPWORDS = {
+    "the", "and", "a", "an", "to", "of", "in", "for", "on", "at", "by", "with",
+    "is", "it", "this", "that", "as", "are", "be", "from", "or", "was", "were",
+    "which", "who", "when", "where", "how", "its", "their", "they", "these",
+    "those", "has", "have", "had", "been", "not", "but", "can", "will", "would",
+    "also", "such", "than", "then", "there", "into", "so", "if", "more", "most",
+}
+
+
+@dataclass
+class GroundingResult:
+    verdict: str  # GROUNDED, UNGROUNDED or BORDERLINE
+    score: float  # score of the weakest scored sentence
+    sentence_scores: List[float] = field(default_factory=list)
+    unsupported: List[str] = field(default_factory=list)  # sentences below GROUNDING_REJECT
+
+    @property
+    def supported(self) -> bool:
+        return self.verdict == GROUNDED
+
+
+# Words and numbers ("3.5", "1,000", "dalio's"); hyphens and "%" split tokens
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,'][a-z0-9]+)*", re.IGNORECASE)
+
+
+def _normalize(token: str) -> str:
+    """Shared by every feature, so a figure or name quoted verbatim matches."""
+    return token.lower().replace(",", "")  # "1,000" -> "1000"
+
+
+def _tokens(text: str) -> List[str]:
+    return [_normalize(t) for t in _TOKEN_RE.findall(text)]
+
+
+def _entities(sentence: str) -> Set[str]:
+    """Numbers and capitalised words that do not start the sentence."""
+    return {
+        _normalize(w)
+        for i, w in enumerate(_TOKEN_RE.findall(sentence))
+        if any(c.isdigit() for c in w) or (i > 0 and w[:1].isupper())
+    }
+
+
+def _features(tokens: List[str]):
+    unigrams = {t for t in tokens if t not in STOPWORDS}
+    bigrams = {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+    return unigrams, bigrams
+
+
+def _coverage(rows: List[Set[str]], supported: Set[str]) -> np.ndarray:
+    """Share of each row's items found in ``supported`` (1.0 for empty rows).
+
+    Built as a sentence x vocabulary incidence matrix so every sentence is
+    scored in one pass.
+    """
+    vocab = sorted(set().union(*rows)) if rows else []
+    if not vocab:
+        return np.ones(len(rows), dtype=np.float32)
+    index = {v: j for j, v in enumerate(vocab)}
+    incidence = np.zeros((len(rows), len(vocab)), dtype=np.float32)
+    for i, row in enumerate(rows):
+        incidence[i, [index[v] for v in row]] = 1.0
+    present = np.fromiter((v in supported for v in vocab), dtype=np.float32, count=len(vocab))
+    totals = incidence.sum(axis=1)
+    return np.divide(incidence @ present, totals, out=np.ones(len(rows), dtype=np.float32), where=totals > 0)
+
+
+# -----------------------------------------------------------------------------
+# Checker
+# -----------------------------------------------------------------------------
+
+_verdicts: Counter = Counter()
+_verdicts_lock = threading.Lock()
+
+
+def check_grounding(answer: str, passages: Sequence[Document]) -> GroundingResult:
+    """Score how well each answer sentence is supported by the passages.
+
+    A sentence's score mixes the share of its content words, word bigrams and
+    entities (numbers, proper nouns) that also occur somewhere in the
+    passages. The answer is judged by its weakest sentence, since one
+    invented claim is enough to make it ungrounded.
+    """
+    passage_tokens = _tokens(" ".join(p.page_content for p in passages))
+    passage_unigrams, passage_bigrams = _features(passage_tokens)
+    passage_words = set(passage_tokens)
+
+    sentences, unigram_rows, bigram_rows, entity_rows = [], [], [], []
+    for sentence in split_sentences(answer):
+        unigrams, bigrams = _features(_tokens(sentence))
+        if len(unigrams) < MIN_CONTENT_WORDS:
+            continue
+        sentences.append(sentence)
+        unigram_rows.append(unigrams)
+        bigram_rows.append(bigrams)
+        entity_rows.append(_entities(sentence))
+
+    if not sentences:
+        result = GroundingResult(verdict=BORDERLINE, score=0.0)
+    else:
+        scores = (
+            UNIGRAM_WEIGHT * _coverage(unigram_rows, passage_unigrams)
+            + BIGRAM_WEIGHT * _coverage(bigram_rows, passage_bigrams)
+            + ENTITY_WEIGHT * _coverage(entity_rows, passage_words)
+        )
+        weakest = float(scores.min())
+        if weakest >= GROUNDING_ACCEPT:
+            verdict = GROUNDED
+        elif weakest < GROUNDING_REJECT:
+            verdict = UNGROUNDED
+        else:
+            verdict = BORDERLINE
+        result = GroundingResult(
+            verdict=verdict,
+            score=weakest,
+            sentence_scores=[float(s) for s in scores],
+            unsupported=[s for s, score in zip(sentences, scores) if score < GROUNDING_REJECT],
+        )
+
+    with _verdicts_lock:
+        _verdicts[result.verdict] += 1
+    return result
+
+
+def stats() -> Dict[str, float]:
+    with _verdicts_lock:
+        counts = dict(_verdicts)
+    total = sum(counts.values())
+    return {
+        GROUNDED: counts.get(GROUNDED, 0),
+        UNGROUNDED: counts.get(UNGROUNDED, 0),
+        "escalated": counts.get(BORDERLINE, 0),
+        "escalation_rate": counts.get(BORDERLINE, 0) / total if total else 0.0,
+    }
@@ -0,0 +1,125 @@
+"""On-disk layout of the per-book indexes, and the swap to a new one.
+
+    vector_store/<book>/
+        CURRENT               name of the live version
+        versions/<version>/   index.faiss, index.pkl, metadata.json, eda_summary.json
+
+Ingestion writes a complete version directory, then replaces CURRENT with
+``os.replace`` (atomic on POSIX). A reader resolves CURRENT once and reads
+every file from that one directory, so it never pairs the vectors of one
+ingestion with the docstore of another. The version before the live one is
+kept for readers that resolved it just before a swap; older ones are deleted.
+
+Indexes written before this layout keep their files directly in
+vector_store/<book>/ and have no CURRENT. They are read from there until the
+book is re-ingested.
+"""
+
+import os
+import re
+import secrets
+import shutil
+import time
+from typing import Optional, Tuple
+
+from src.utils import pid_alive
+
+VECTOR_STORE_ROOT = "vector_store"
+BOOK_DIRS = {"debt_crisis": "big_debt_crisis", "capitalism": "saving_capitalism"}
+POINTER = "CURRENT"
+VERSIONS = "versions"
+# Versions kept besides the live one
+KEEP_PREVIOUS_VERSIONS = 1
+
+# Staging names end in ".tmp-<pid>": "<version>.tmp-<pid>" under versions/,
+# "CURRENT.tmp-<pid>", and "<book>.tmp-<pid>" next to the book directory
+# (written by ingestions before this layout)
+_STAGING_RE = re.compile(r"\.tmp-(\d+)$")
+
+
+def book_dir(book_id: str) -> str:
+    return os.path.join(VECTOR_STORE_ROOT, BOOK_DIRS[book_id])
+
+
+def _current_version(book_id: str) -> Optional[str]:
+    try:
+        with open(os.path.join(book_dir(book_id), POINTER), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve(book_id: str) -> Tuple[str, str]:
+    """Directory of the live index and its version tag.
+
+    The version changes whenever the book is re-ingested. For the older
+    layout it is derived from the index files' mtimes and sizes.
+    """
+    version = _current_version(book_id)
+    if version is not None:
+        return os.path.join(book_dir(book_id), VERSIONS, version), version
+    path = book_dir(book_id)
+    parts = []
+    for name in ("index.faiss", "index.pkl"):
+        st = os.stat(os.path.join(path, name))
+        parts.append(f"{st.st_mtime_ns:x}-{st.st_size:x}")
+    return path, ".".join(parts)
+
+
+def staging_dir(book_id: str) -> str:
+    """Fresh directory to write a new version into, owned by this process."""
+    version = time.strftime("%Y%m%dT%H%M%S") + "-" + secrets.token_hex(3)
+    path = os.path.join(book_dir(book_id), VERSIONS, f"{version}.tmp-{os.getpid()}")
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return path
+
+
+def publish(book_id: str, staged: str) -> str:
+    """Make a complete staging directory the live version; returns its path."""
+    versions = os.path.dirname(staged)
+    version = _STAGING_RE.sub("", os.path.basename(staged))
+    final = os.path.join(versions, version)
+    os.replace(staged, final)
+    pointer = os.path.join(book_dir(book_id), POINTER)
+    tmp = f"{pointer}.tmp-{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, pointer)
+    _prune(book_id, version)
+    return final
+
+
+def _prune(book_id: str, live: str) -> None:
+    versions = os.path.join(book_dir(book_id), VERSIONS)
+    old = sorted(
+        (name for name in os.listdir(versions) if name != live and not _STAGING_RE.search(name)),
+        reverse=True,  # names start with their timestamp
+    )
+    for name in old[KEEP_PREVIOUS_VERSIONS:]:
+        shutil.rmtree(os.path.join(versions, name), ignore_errors=True)
+
+
+def clean_stale(book_id: str) -> None:
+    """Delete staging files and directories left by ingestions that died or were killed."""
+    places = (
+        (VECTOR_STORE_ROOT, BOOK_DIRS[book_id] + ".tmp-"),
+        (os.path.join(book_dir(book_id), VERSIONS), ""),
+        (book_dir(book_id), POINTER + ".tmp-"),
+    )
+    for parent, prefix in places:
+        try:
+            names = os.listdir(parent)
+        except FileNotFoundError:
+            continue
+        for name in names:
+            match = _STAGING_RE.search(name)
+            if not (match and name.startswith(prefix)) or pid_alive(int(match.group(1))):
+                continue
+            path = os.path.join(parent, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
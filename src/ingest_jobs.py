@@ -0,0 +1,393 @@
+"""Background ingestion jobs with persistent state and per-phase progress.
+
+``ingest_book`` takes minutes and is CPU-bound (EPUB parsing, tokenizing),
+so each job runs in its own process (``python -m src.ingest_jobs``). The caller's threads and event
+loop keep serving, and both books can ingest at the same time. At most
+INGEST_WORKERS jobs of one runner run at once; the rest wait in its queue.
+
+Job state lives in one JSON file per job under INGEST_JOBS_DIR and is
+replaced atomically on every update:
+
+- the runner writes it when a job is queued, and when a job ends without
+  reporting (the process crashed or was killed),
+- the job's process writes it as it starts, advances through the phases
+  (parse, chunk, embed, persist) and finishes.
+
+Cancelling drops a marker file next to the state file. A queued job is
+dropped before it starts; a running one stops at its next progress update,
+before the new index is made live (see src.index_store). Because all of this is on disk,
+any API worker can poll or cancel any job, and the state survives restarts.
+A job whose runner went away before the job finished is reported as failed.
+"""
+
+import json
+import os
+import re
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from src.data_ingestion import BOOK_EPUBS, PHASES, ingest_book
+from src.utils import pid_alive
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+INGEST_JOBS_DIR = os.getenv("INGEST_JOBS_DIR", os.path.join("vector_store", "ingest_jobs"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+# Finished jobs kept on disk; older ones are deleted when a job is submitted
+INGEST_MAX_JOBS_KEPT = int(os.getenv("INGEST_MAX_JOBS_KEPT", "50"))
+# How long a running job may take to notice a cancel before it is terminated
+INGEST_CANCEL_GRACE_S = float(os.getenv("INGEST_CANCEL_GRACE_S", "30"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Share of the overall progress each phase accounts for (embedding dominates)
+PHASE_WEIGHTS = {"parse": 0.1, "chunk": 0.1, "embed": 0.75, "persist": 0.05}
+# A running job rewrites its state file at most this often
+_PROGRESS_INTERVAL_S = 0.5
+
+
+class JobConflict(Exception):
+    """The book already has a queued or running job."""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# -----------------------------------------------------------------------------
+# State files
+# -----------------------------------------------------------------------------
+
+
+def _valid_id(job_id: str) -> bool:
+    # IDs end up in file names; refuse anything secrets.token_hex(6) cannot produce
+    return re.fullmatch(r"[0-9a-f]{12}", job_id) is not None
+
+
+def _job_path(jobs_dir: str, job_id: str) -> str:
+    return os.path.join(jobs_dir, f"{job_id}.json")
+
+
+def _cancel_path(jobs_dir: str, job_id: str) -> str:
+    return os.path.join(jobs_dir, f"{job_id}.cancel")
+
+
+def _write_job(jobs_dir: str, job: Dict[str, Any]) -> None:
+    path = _job_path(jobs_dir, job["id"])
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_job(jobs_dir: str, job_id: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(_job_path(jobs_dir, job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _new_job(book_id: str) -> Dict[str, Any]:
+    return {
+        "id": secrets.token_hex(6),
+        "book_id": book_id,
+        "state": QUEUED,
+        "phase": None,
+        "phases": {name: {"done": 0, "total": None} for name in PHASES},
+        "progress": 0.0,
+        "error": None,
+        "submitted_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "runner_pid": os.getpid(),
+        "pid": None,
+    }
+
+
+def _overall(phases: Dict[str, Dict[str, Any]]) -> float:
+    total = 0.0
+    for name, weight in PHASE_WEIGHTS.items():
+        p = phases[name]
+        if p["total"]:
+            total += weight * min(p["done"] / p["total"], 1.0)
+    return round(total, 4)
+
+# -----------------------------------------------------------------------------
+# Job process
+# -----------------------------------------------------------------------------
+
+
+def _run_job(jobs_dir: str, job_id: str) -> None:
+    """Body of a job's process: ingest the book, keeping the state file current."""
+    job = _read_job(jobs_dir, job_id)
+    epub_path = BOOK_EPUBS[job["book_id"]]
+    cancel_path = _cancel_path(jobs_dir, job["id"])
+    last_write = 0.0
+
+    def progress(phase: str, done: int, total: int) -> None:
+        nonlocal last_write
+        # Once files are being moved into place the job runs to the end
+        if os.path.exists(cancel_path) and not (phase == "persist" and done):
+            raise JobCancelled()
+        job["phase"] = phase
+        job["phases"][phase] = {"done": done, "total": total}
+        job["progress"] = _overall(job["phases"])
+        now = time.monotonic()
+        if now - last_write >= _PROGRESS_INTERVAL_S or done == total:
+            _write_job(jobs_dir, job)
+            last_write = now
+
+    job.update(state=RUNNING, pid=os.getpid(), started_at=time.time())
+    _write_job(jobs_dir, job)
+    try:
+        ingest_book(job["book_id"], epub_path, progress=progress)
+        job.update(state=SUCCEEDED, progress=1.0)
+    except JobCancelled:
+        job["state"] = CANCELLED
+    except Exception as e:
+        job.update(state=FAILED, error=f"{type(e).__name__}: {e}")
+    job["finished_at"] = time.time()
+    _write_job(jobs_dir, job)
+
+# -----------------------------------------------------------------------------
+# Runner
+# -----------------------------------------------------------------------------
+
+
+class IngestJobs:
+    """Queue and worker pool for ingestion jobs; one per process that submits them.
+
+    ``on_success(book_id)`` is called from the runner's thread, without its
+    lock held, after a job of this runner succeeds, e.g. to reload the index.
+    """
+
+    def __init__(
+        self,
+        jobs_dir: str = INGEST_JOBS_DIR,
+        workers: int = INGEST_WORKERS,
+        on_success: Optional[Callable[[str], None]] = None,
+    ):
+        self.jobs_dir = jobs_dir
+        self.workers = workers
+        self.on_success = on_success
+        self._queue: Deque[str] = deque()
+        self._running: Dict[str, subprocess.Popen] = {}
+        self._cancel_requested: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.submitted = 0
+        os.makedirs(jobs_dir, exist_ok=True)
+
+    # -- queries --------------------------------------------------------------
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not _valid_id(job_id):
+            return None
+        job = _read_job(self.jobs_dir, job_id)
+        if job is None:
+            return None
+        # Its runner is gone, so nothing will ever move it forward
+        if job["state"] in ACTIVE_STATES and not pid_alive(job["runner_pid"]):
+            job.update(state=FAILED, error="interrupted: the server stopped before the job finished",
+                       finished_at=job["finished_at"] or time.time())
+            _write_job(self.jobs_dir, job)
+        job["cancel_requested"] = os.path.exists(_cancel_path(self.jobs_dir, job_id))
+        return job
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Every job on disk, newest first."""
+        jobs = []
+        for name in os.listdir(self.jobs_dir):
+            if name.endswith(".json"):
+                job = self.get(name[:-len(".json")])
+                if job is not None:
+                    jobs.append(job)
+        jobs.sort(key=lambda j: j["submitted_at"], reverse=True)
+        return jobs
+
+    def active(self, book_id: str) -> Optional[Dict[str, Any]]:
+        return next(
+            (j for j in self.list() if j["book_id"] == book_id and j["state"] in ACTIVE_STATES),
+            None,
+        )
+
+    # -- commands -------------------------------------------------------------
+
+    def submit(self, book_id: str) -> Dict[str, Any]:
+        """Queue an ingestion of ``book_id``; raises JobConflict if one is already active."""
+        if book_id not in BOOK_EPUBS:
+            raise ValueError(f"Unknown book_id: {book_id}")
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ingestion runner is shut down")
+            existing = self.active(book_id)
+            if existing is not None:
+                raise JobConflict(f"{book_id} already has {existing['state']} job {existing['id']}")
+            job = _new_job(book_id)
+            _write_job(self.jobs_dir, job)
+            self._queue.append(job["id"])
+            self.submitted += 1
+            self._prune()
+        self._ensure_thread()
+        self._wake.set()
+        return self.get(job["id"])
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Ask a job to stop; finished jobs are returned unchanged."""
+        job = self.get(job_id)
+        if job is None or job["state"] not in ACTIVE_STATES:
+            return job
+        open(_cancel_path(self.jobs_dir, job_id), "w").close()
+        with self._lock:
+            if job_id in self._queue:
+                self._queue.remove(job_id)
+                job.update(state=CANCELLED, finished_at=time.time())
+                job.pop("cancel_requested", None)
+                _write_job(self.jobs_dir, job)
+            else:
+                self._cancel_requested.setdefault(job_id, time.monotonic())
+        self._wake.set()
+        return self.get(job_id)
+
+    def shutdown(self) -> None:
+        """Cancel this runner's jobs and stop its processes."""
+        with self._lock:
+            self._closed = True
+            queued, self._queue = list(self._queue), deque()
+            running = dict(self._running)
+        for job_id in queued:
+            job = _read_job(self.jobs_dir, job_id)
+            if job is not None:
+                job.update(state=CANCELLED, finished_at=time.time())
+                _write_job(self.jobs_dir, job)
+        for job_id, proc in running.items():
+            open(_cancel_path(self.jobs_dir, job_id), "w").close()
+        for proc in running.values():
+            try:
+                proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                proc.terminate()
+        self._wake.set()
+        # Any job still marked active is finalized by the next get()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": len(self._queue),
+                "running": sorted(self._running),
+                "submitted": self.submitted,
+            }
+
+    # -- scheduling -----------------------------------------------------------
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="ingest-jobs", daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(timeout=1.0)
+            self._wake.clear()
+            with self._lock:
+                succeeded = self._reap()
+                self._start_queued()
+                done = self._closed or (not self._queue and not self._running)
+                if done:
+                    self._thread = None
+            # A reload takes a while; list/submit/cancel must not wait for it
+            for book_id in succeeded:
+                self._notify_success(book_id)
+            if done:
+                return
+
+    def _notify_success(self, book_id: str) -> None:
+        if self.on_success is None:
+            return
+        try:
+            self.on_success(book_id)
+        except Exception as e:
+            print(f"❌ Reload after ingesting {book_id} failed: {e}")
+
+    def _start_queued(self) -> None:
+        while self._queue and len(self._running) < self.workers:
+            job_id = self._queue.popleft()
+            job = _read_job(self.jobs_dir, job_id)
+            if job is None or job["state"] != QUEUED:
+                continue
+            if os.path.exists(_cancel_path(self.jobs_dir, job_id)):
+                # Cancelled from another API worker while it was queued here
+                job.update(state=CANCELLED, finished_at=time.time())
+                _write_job(self.jobs_dir, job)
+                continue
+            # A fresh interpreter rather than a fork: the caller may be a
+            # threaded server, and nothing of its state is needed
+            proc = subprocess.Popen(
+                [sys.executable, "-m", "src.ingest_jobs", self.jobs_dir, job_id],
+                env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, (_ROOT, os.getenv("PYTHONPATH"))))},
+            )
+            self._running[job_id] = proc
+            print(f"✅ Ingestion job {job_id} started for {job['book_id']} (pid {proc.pid})")
+
+    def _reap(self) -> List[str]:
+        """Finalize ended jobs; returns the books whose job succeeded."""
+        now = time.monotonic()
+        succeeded = []
+        for job_id, proc in list(self._running.items()):
+            cancel_at = self._cancel_requested.get(job_id)
+            if cancel_at is None and os.path.exists(_cancel_path(self.jobs_dir, job_id)):
+                cancel_at = self._cancel_requested[job_id] = now
+            if proc.poll() is None:
+                if cancel_at is not None and now - cancel_at > INGEST_CANCEL_GRACE_S:
+                    proc.terminate()
+                continue
+            del self._running[job_id]
+            self._cancel_requested.pop(job_id, None)
+            job = _read_job(self.jobs_dir, job_id)
+            if job is None:
+                continue
+            if job["state"] in ACTIVE_STATES:
+                # The process ended without recording an outcome
+                cancelled = os.path.exists(_cancel_path(self.jobs_dir, job_id))
+                job.update(
+                    state=CANCELLED if cancelled else FAILED,
+                    error=None if cancelled else f"ingestion process exited with code {proc.returncode}",
+                    finished_at=time.time(),
+                )
+                _write_job(self.jobs_dir, job)
+            if job["state"] == SUCCEEDED:
+                print(f"✅ Ingestion job {job_id} finished for {job['book_id']}")
+                succeeded.append(job["book_id"])
+            else:
+                print(f"❌ Ingestion job {job_id} for {job['book_id']} {job['state']}: {job['error']}")
+        return succeeded
+
+    def _prune(self) -> None:
+        """Delete the oldest finished jobs beyond INGEST_MAX_JOBS_KEPT."""
+        finished = [j for j in self.list() if j["state"] not in ACTIVE_STATES]
+        for job in finished[INGEST_MAX_JOBS_KEPT:]:
+            for path in (_job_path(self.jobs_dir, job["id"]), _cancel_path(self.jobs_dir, job["id"])):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+if __name__ == "__main__":
+    # python -m src.ingest_jobs <jobs_dir> <job_id>: started by IngestJobs
+    _run_job(sys.argv[1], sys.argv[2])
@@ -0,0 +1,212 @@
+"""Minimal Prometheus-style metrics (text exposition format 0.0.4).
+
+Hot-path recording is a bisect plus a few additions under a per-metric lock.
+Values that already live elsewhere (cache counters, index sizes, queue
+depths) are registered as callbacks and only read when /metrics is scraped.
+Each process reports its own values; under src.serve every worker is a
+separate process.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Seconds; spans sub-millisecond index lookups up to slow LLM calls
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = Tuple[Tuple[str, str], ...]
+Sample = Tuple[Dict[str, str], float]
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = [f'{k}="{_escape(v)}"' for k, v in labels]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in values
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(k, list(s[0]), s[1], s[2]) for k, s in self._series.items()]
+        lines = self._header()
+        for key, counts, total, count in series:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = key + (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Gauge or counter whose samples are read from ``fn`` at scrape time."""
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], Iterable[Sample]],
+                 type: str = "gauge"):
+        super().__init__(name, documentation)
+        self.fn = fn
+        self.type = type
+
+    def render(self) -> List[str]:
+        try:
+            samples = list(self.fn())
+        except Exception:
+            samples = []  # a broken source must not fail the whole scrape
+        return self._header() + [
+            f"{self.name}{_format_labels(sorted(labels.items()))} {_format_value(value)}"
+            for labels, value in samples
+        ]
+
+
+def render_all() -> str:
+    lines: List[str] = []
+    for metric in list(_registry):
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+# -----------------------------------------------------------------------------
+# Pipeline metrics
+# -----------------------------------------------------------------------------
+
+STAGE_SECONDS = Histogram(
+    "rag_stage_seconds",
+    "Time spent in each RAG pipeline stage.",
+)
+REQUEST_SECONDS = Histogram(
+    "rag_request_seconds",
+    "End-to-end API request time, until the last response byte.",
+)
+REQUESTS = Counter(
+    "rag_requests_total",
+    "API requests by route and status code.",
+)
+
+
+def register_index_metrics(vector_stores: Dict[str, object]) -> None:
+    """Export the size of every store in ``vector_stores`` (book_id -> FAISS)."""
+    CallbackMetric(
+        "rag_index_vectors",
+        "Vectors in each loaded FAISS index.",
+        lambda: [({"book_id": b}, vs.index.ntotal) for b, vs in list(vector_stores.items())],
+    )
+    CallbackMetric(
+        "rag_docstore_documents",
+        "Passages in each loaded docstore.",
+        lambda: [({"book_id": b}, len(vs.index_to_docstore_id)) for b, vs in list(vector_stores.items())],
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording time and status code per route.
+
+    Routes are labelled by their template (``/api/ask``), never the raw path,
+    to keep label cardinality bounded. Streaming responses are timed until
+    their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, route=route)
+            REQUESTS.inc(route=route, status=str(status))
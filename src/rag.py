@@ -1,20 +1,29 @@
 import os
 import json
-from typing import List, Dict, Any
+import sys
+import weakref
+from typing import List, Dict, Any, Iterator, AsyncIterator, Optional
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+import numpy as np
 from langchain_community.vectorstores import FAISS
-from langchain_community.retrievers import BM25Retriever
 from langchain.embeddings.base import Embeddings
 from langchain.schema import Document
 
+from src.backends import make_embeddings
+from src import index_store
+from src.deadline import Deadline, SKIP_RERANK_BELOW_S, SHRINK_K_BELOW_S, VERIFY_COST_S
+from src.tracing import span
 from dotenv import load_dotenv
 
 load_dotenv()
 
 EMBED_MODEL = "models/embedding-001"
 RERANK_MODEL = "bge-reranker-base"  # Placeholder – would need actual implementation
+VECTOR_K = 10
 MAX_FINAL_PASSAGES = 5
+# Used instead of the above when the request deadline is running low
+REDUCED_VECTOR_K = 4
+REDUCED_FINAL_PASSAGES = 3
 
 # -----------------------------------------------------------------------------
 # Vector store utilities
@@ -22,19 +31,91 @@ MAX_FINAL_PASSAGES = 5
 
 
 def _vs_path(book_id: str) -> str:
-    return os.path.join(
-        "vector_store",
-        "big_debt_crisis" if book_id == "debt_crisis" else "saving_capitalism",
-    )
+    """Directory of the book's live index (see src.index_store)."""
+    return index_store.resolve(book_id)[0]
+
+
+def vector_store_version(book_id: str) -> str:
+    """Version tag of the persisted index; changes whenever a book is re-ingested."""
+    return index_store.resolve(book_id)[1]
 
 
 def load_vector_store(book_id: str) -> FAISS:
-    embeddings: Embeddings = GoogleGenerativeAIEmbeddings(model=EMBED_MODEL)
+    embeddings: Embeddings = make_embeddings(EMBED_MODEL)
     return FAISS.load_local(
         _vs_path(book_id), embeddings, allow_dangerous_deserialization=True
     )
 
 
+def embed_queries(embeddings: Embeddings, texts: List[str]) -> List[List[float]]:
+    """Embed several queries with a single batched request."""
+    with span("embed"):
+        # Only the Google backend imports this package (it is slow to import),
+        # so if it is not loaded the embeddings cannot be Google's
+        google = sys.modules.get("langchain_google_genai")
+        if google is not None and isinstance(embeddings, google.GoogleGenerativeAIEmbeddings):
+            # Match embed_query, which uses the retrieval-query task type
+            return embeddings.embed_documents(
+                texts, task_type=embeddings.task_type or "RETRIEVAL_QUERY"
+            )
+        return embeddings.embed_documents(texts)
+
+
+_positions_by_store: "weakref.WeakKeyDictionary[FAISS, Dict[str, int]]" = weakref.WeakKeyDictionary()
+
+
+def passage_vectors(vs: FAISS, docs: List[Document]) -> np.ndarray:
+    """Stored embedding for each passage, looked up by docstore ID.
+
+    Rows for passages that are not in the index are left as zeros.
+    """
+    positions = _positions_by_store.get(vs)
+    if positions is None:
+        positions = {doc_id: pos for pos, doc_id in vs.index_to_docstore_id.items()}
+        _positions_by_store[vs] = positions
+    vectors = np.zeros((len(docs), vs.index.d), dtype=np.float32)
+    for i, doc in enumerate(docs):
+        pos = positions.get(doc.id)
+        if pos is not None:
+            vectors[i] = vs.index.reconstruct(pos)
+    return vectors
+
+
+def similarity_scores(vs: FAISS, docs: List[Document], query_embedding: List[float]) -> List[float]:
+    """Cosine similarity of each passage's stored embedding to the query."""
+    vectors = passage_vectors(vs, docs)
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query)
+    scores = vectors @ query / np.where(norms == 0, 1.0, norms)
+    return [round(float(s), 4) for s in scores]
+
+
+def search_by_vectors(
+    vs: FAISS, query_embeddings: List[List[float]], k: int = VECTOR_K
+) -> List[List[Document]]:
+    """Top-``k`` passages for each query embedding, from a single index search."""
+    if not query_embeddings:
+        return []
+    matrix = np.asarray(query_embeddings, dtype=np.float32)
+    if getattr(vs, "_normalize_L2", False):
+        import faiss
+
+        faiss.normalize_L2(matrix)
+    with span("vector_search"):
+        _, positions = vs.index.search(matrix, k)
+    results = []
+    for row in positions:
+        docs = []
+        for pos in row:
+            if pos == -1:  # fewer than k vectors in the index
+                continue
+            doc = vs.docstore.search(vs.index_to_docstore_id[int(pos)])
+            if isinstance(doc, Document):
+                docs.append(doc)
+        results.append(docs)
+    return results
+
+
 # -----------------------------------------------------------------------------
 # Retrieval Pipeline
 # -----------------------------------------------------------------------------
@@ -42,69 +123,245 @@ def load_vector_store(book_id: str) -> FAISS:
 
 def _bm25_retriever(docs: List[Document]):
     """Instantiate a BM25 retriever from existing docs (placeholder)."""
+    from langchain_community.retrievers import BM25Retriever
+
     return BM25Retriever.from_documents(docs)
 
 
-def _rerank(question: str, docs: List[Document]) -> List[Document]:
+def _rerank(
+    question: str, docs: List[Document], deadline: Optional[Deadline] = None
+) -> List[Document]:
     """Placeholder reranker that returns docs unchanged.
     Integrate bge-reranker-base later.
     """
+    if deadline is not None and not deadline.has(SKIP_RERANK_BELOW_S):
+        deadline.skip("rerank")
+        return docs
     return docs
 
 
-def retrieve(question: str, book_id: str) -> List[Document]:
-    """Hybrid retrieval: BM25 + FAISS + rerank, returns top passages."""
-    vs = load_vector_store(book_id)
+def retrieve(
+    question: str,
+    book_id: str,
+    vs: Optional[FAISS] = None,
+    query_embedding: Optional[List[float]] = None,
+    deadline: Optional[Deadline] = None,
+) -> List[Document]:
+    """Hybrid retrieval: BM25 + FAISS + rerank, returns top passages.
+
+    Callers that keep the index in memory pass it as ``vs``; otherwise it is
+    loaded from disk. A precomputed ``query_embedding`` (e.g. from a batched
+    embedding call) skips embedding the question here. With a ``deadline``
+    that is running low, fewer candidates are fetched and returned.
+    """
+    if vs is None:
+        vs = load_vector_store(book_id)
+
+    k, final_passages = VECTOR_K, MAX_FINAL_PASSAGES
+    if deadline is not None and not deadline.has(SHRINK_K_BELOW_S):
+        deadline.skip("full_k")
+        k, final_passages = REDUCED_VECTOR_K, REDUCED_FINAL_PASSAGES
 
     # Vector similarity
-    vec_docs = vs.similarity_search(question, k=10)
+    if query_embedding is None:
+        with span("embed"):
+            query_embedding = vs.embeddings.embed_query(question)
+    with span("vector_search"):
+        vec_docs = vs.similarity_search_by_vector(query_embedding, k=k)
+
+    return _hybrid(question, vec_docs, final_passages, deadline)
 
+
+def retrieve_batch(
+    questions: List[str], vs: FAISS, query_embeddings: List[List[float]]
+) -> List[List[Document]]:
+    """``retrieve`` for several questions against one book.
+
+    All vector searches share one FAISS call; BM25 and rerank still run per
+    question over its own candidates.
+    """
+    candidates = search_by_vectors(vs, query_embeddings, VECTOR_K)
+    return [
+        _hybrid(question, vec_docs, MAX_FINAL_PASSAGES)
+        for question, vec_docs in zip(questions, candidates)
+    ]
+
+
+def retrieve_extending(
+    question: str,
+    vs: FAISS,
+    query_embedding: List[float],
+    candidates: List[Document],
+    deadline: Optional[Deadline] = None,
+) -> List[Document]:
+    """``retrieve`` whose candidate set also includes ``candidates``.
+
+    Used for conversational follow-ups: passages from earlier turns (best
+    first) stay in the running next to the new vector hits, and BM25 and
+    rerank choose among both.
+    """
+    k, final_passages = VECTOR_K, MAX_FINAL_PASSAGES
+    if deadline is not None and not deadline.has(SHRINK_K_BELOW_S):
+        deadline.skip("full_k")
+        k, final_passages = REDUCED_VECTOR_K, REDUCED_FINAL_PASSAGES
+
+    vec_docs = search_by_vectors(vs, [query_embedding], k)[0]
+    seen = {doc.id for doc in vec_docs}
+    vec_docs += [doc for doc in candidates if doc.id not in seen]
+    return _hybrid(question, vec_docs, final_passages, deadline)
+
+
+def _hybrid(
+    question: str,
+    vec_docs: List[Document],
+    final_passages: int,
+    deadline: Optional[Deadline] = None,
+) -> List[Document]:
+    """BM25 over the vector candidates, merge, rerank and cut."""
     # Build lightweight BM25 over raw texts retrieved
-    bm25 = _bm25_retriever(vec_docs)
-    bm25_docs = bm25.get_relevant_documents(question)
+    with span("bm25"):
+        bm25 = _bm25_retriever(vec_docs)
+        bm25_docs = bm25.get_relevant_documents(question)
 
     # Merge and dedupe by page_content
-    merged: Dict[str, Document] = {d.page_content: d for d in vec_docs + bm25_docs}
+    with span("merge"):
+        merged: Dict[str, Document] = {d.page_content: d for d in vec_docs + bm25_docs}
 
-    reranked = _rerank(question, list(merged.values()))
+    with span("rerank"):
+        reranked = _rerank(question, list(merged.values()), deadline)
 
-    return reranked[:MAX_FINAL_PASSAGES]
+    return reranked[:final_passages]
 
 
 # -----------------------------------------------------------------------------
 # Generation & Verification (Gemini)
 # -----------------------------------------------------------------------------
 
-import google.generativeai as genai
-
-genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+from src.gemini_client import get_client, get_model
+from src.context_packer import PackedContext, pack_context
+from src.grounding import BORDERLINE, check_grounding
 
 
-def _prompt_json(question: str, passages: List[Document]) -> str:
-    content = {
-        "task": "qa",
-        "ground_truth_passages": [p.page_content for p in passages],
-        "question": question,
-    }
-    return json.dumps(content, ensure_ascii=False)
-
-
-def generate_answer(question: str, passages: List[Document]) -> str:
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    prompt = _prompt_json(question, passages)
-    resp = model.generate_content(prompt)
-    return resp.text
+def _prompt_json(
+    question: str, passages: List[Document], packed: Optional[PackedContext] = None
+) -> str:
+    with span("prompt_build"):
+        packed = packed or pack_context(passages)
+        content = {
+            "task": "qa",
+            "ground_truth_passages": packed.passages,
+            "question": question,
+        }
+        return json.dumps(content, ensure_ascii=False)
 
 
-def verify_answer(answer: str, passages: List[Document]) -> bool:
-    model = genai.GenerativeModel("gemini-2.5-flash")
-    prompt = json.dumps(
+def _verify_prompt_json(answer: str, passages: List[Document]) -> str:
+    return json.dumps(
         {
             "task": "verify",
             "answer": answer,
             "ground_truth_passages": [p.page_content for p in passages],
         }
     )
-    resp = model.generate_content(prompt)
+
+
+def _request_options(deadline: Optional[Deadline]) -> Dict[str, Any]:
+    timeout = deadline.timeout() if deadline is not None else None
+    return {"timeout": timeout} if timeout is not None else {}
+
+
+def generate_answer(
+    question: str,
+    passages: List[Document],
+    packed: Optional[PackedContext] = None,
+    deadline: Optional[Deadline] = None,
+) -> str:
+    prompt = _prompt_json(question, passages, packed)
+    with span("generate"):
+        resp = get_model().generate_content(prompt, request_options=_request_options(deadline))
+    return resp.text
+
+
+def generate_answer_stream(
+    question: str, passages: List[Document], packed: Optional[PackedContext] = None
+) -> Iterator[str]:
+    """Yield the answer text incrementally as Gemini produces it."""
+    prompt = _prompt_json(question, passages, packed)
+    with span("generate_stream"):
+        for chunk in get_model().generate_content(prompt, stream=True):
+            # The final chunk may only carry a finish reason and no text parts
+            if chunk.parts:
+                yield chunk.text
+
+
+def verify_answer(
+    answer: str, passages: List[Document], deadline: Optional[Deadline] = None
+) -> Optional[bool]:
+    """Check whether the answer is supported; None if skipped for time.
+
+    The local grounding check settles clear cases; only borderline answers
+    cost a Gemini round-trip.
+    """
+    with span("grounding"):
+        local = check_grounding(answer, passages)
+    if local.verdict != BORDERLINE:
+        return local.supported
+    if deadline is not None and not deadline.has(VERIFY_COST_S):
+        deadline.skip("verify")
+        return None
+    with span("verify"):
+        resp = get_model().generate_content(
+            _verify_prompt_json(answer, passages), request_options=_request_options(deadline)
+        )
     return "yes" in resp.text.lower()
 
+
+# -----------------------------------------------------------------------------
+# Async variants (used by the FastAPI app)
+# -----------------------------------------------------------------------------
+
+
+async def agenerate_answer(
+    question: str,
+    passages: List[Document],
+    packed: Optional[PackedContext] = None,
+    deadline: Optional[Deadline] = None,
+) -> str:
+    prompt = _prompt_json(question, passages, packed)
+    with span("generate"):
+        return await get_client().generate(
+            prompt, timeout=deadline.timeout() if deadline is not None else None
+        )
+
+
+async def agenerate_answer_stream(
+    question: str,
+    passages: List[Document],
+    packed: Optional[PackedContext] = None,
+    deadline: Optional[Deadline] = None,
+) -> AsyncIterator[str]:
+    prompt = _prompt_json(question, passages, packed)
+    with span("generate_stream"):
+        async for text in get_client().generate_stream(
+            prompt, timeout=deadline.timeout() if deadline is not None else None
+        ):
+            yield text
+
+
+async def averify_answer(
+    answer: str, passages: List[Document], deadline: Optional[Deadline] = None
+) -> Optional[bool]:
+    """Async ``verify_answer``; None if skipped for time."""
+    with span("grounding"):
+        local = check_grounding(answer, passages)
+    if local.verdict != BORDERLINE:
+        return local.supported
+    if deadline is not None and not deadline.has(VERIFY_COST_S):
+        deadline.skip("verify")
+        return None
+    with span("verify"):
+        text = await get_client().generate(
+            _verify_prompt_json(answer, passages),
+            timeout=deadline.timeout() if deadline is not None else None,
+        )
+    return "yes" in text.lower()
@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, List, Optional
+
+RESULT_CACHE_LRU_SIZE = int(os.getenv("RESULT_CACHE_LRU_SIZE", "1024"))
+RESULT_CACHE_LRU_TTL_S = float(os.getenv("RESULT_CACHE_LRU_TTL_S", "900"))
+# Set to an empty string to disable the on-disk layer
+RESULT_CACHE_SQLITE_PATH = os.getenv(
+    "RESULT_CACHE_SQLITE_PATH", os.path.join("vector_store", "result_cache.sqlite3")
+)
+RESULT_CACHE_SQLITE_TTL_S = float(os.getenv("RESULT_CACHE_SQLITE_TTL_S", str(7 * 24 * 3600)))
+
+# -----------------------------------------------------------------------------
+# Cache layers
+# -----------------------------------------------------------------------------
+
+
+class LRUCacheLayer:
+    """In-process LRU with a per-entry TTL."""
+
+    name = "lru"
+    blocking = False
+
+    def __init__(self, maxsize: int = RESULT_CACHE_LRU_SIZE, ttl: float = RESULT_CACHE_LRU_TTL_S):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCacheLayer:
+    """On-disk layer that survives restarts; values are stored as JSON.
+
+    Its calls block on disk I/O, so async code reaches it through
+    ``ResultCache.aget``/``aset``, which run it in a worker thread.
+    """
+
+    name = "sqlite"
+    blocking = True
+
+    def __init__(self, path: str = RESULT_CACHE_SQLITE_PATH, ttl: float = RESULT_CACHE_SQLITE_TTL_S):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("DELETE FROM results WHERE expires_at < ?", (time.time(),))
+        # Rows at open plus the keys this process added since; counting the
+        # table on every stats scrape would scan it each time
+        self._count = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            updated = self._conn.execute(
+                "UPDATE results SET value = ?, expires_at = ? WHERE key = ?",
+                (payload, expires_at, key),
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, expires_at),
+                )
+                self._count += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+
+# -----------------------------------------------------------------------------
+# Layered cache
+# -----------------------------------------------------------------------------
+
+
+def make_key(namespace: str, parts: tuple) -> str:
+    """Stable cache key for a namespace and JSON-serializable key parts."""
+    raw = json.dumps([namespace, *parts], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Read-through cache over ordered layers (fastest first).
+
+    Keys are expected to include the vector store version, so re-ingesting a
+    book makes its old entries unreachable; they then age out via TTL. A hit in
+    a slower layer is copied into the faster ones. Hits, misses and the
+    latency saved (the stored ``compute_ms`` of each hit) are counted per
+    endpoint and namespace.
+
+    ``get``/``set`` run every layer in the calling thread. Async handlers use
+    ``aget``/``aset``, which only touch the in-memory layers on the event loop
+    and run the blocking ones (SQLite) in a worker thread.
+    """
+
+    def __init__(self, layers: List[Any]):
+        self.layers = layers
+        self._stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "saved_ms": 0.0}
+        )
+
+    def _lookup(self, key: str, layers: List[Any]) -> Optional[tuple]:
+        """``(index, value)`` of the first layer holding ``key``."""
+        for i, layer in enumerate(layers):
+            value = layer.get(key)
+            if value is not None:
+                return i, value
+        return None
+
+    def _record(self, endpoint: str, namespace: str, value: Optional[Dict[str, Any]]) -> None:
+        stats = self._stats[f"{endpoint}.{namespace}"]
+        if value is None:
+            stats["misses"] += 1
+        else:
+            stats["hits"] += 1
+            stats["saved_ms"] += value.get("compute_ms", 0.0)
+
+    def get(self, endpoint: str, namespace: str, parts: tuple) -> Optional[Dict[str, Any]]:
+        key = make_key(namespace, parts)
+        found = self._lookup(key, self.layers)
+        value = None
+        if found is not None:
+            i, value = found
+            for faster in self.layers[:i]:
+                faster.set(key, value)
+        self._record(endpoint, namespace, value)
+        return value
+
+    def set(self, namespace: str, parts: tuple, value: Dict[str, Any]) -> None:
+        key = make_key(namespace, parts)
+        for layer in self.layers:
+            layer.set(key, value)
+
+    def _split(self) -> tuple:
+        """The leading non-blocking layers, and the rest."""
+        n = next((i for i, layer in enumerate(self.layers) if layer.blocking), len(self.layers))
+        return self.layers[:n], self.layers[n:]
+
+    async def aget(self, endpoint: str, namespace: str, parts: tuple) -> Optional[Dict[str, Any]]:
+        key = make_key(namespace, parts)
+        fast, slow = self._split()
+        found = self._lookup(key, fast)
+        if found is None and slow:
+            found = await asyncio.to_thread(self._lookup, key, slow)
+            if found is not None:
+                found = (found[0] + len(fast), found[1])
+        value = None
+        if found is not None:
+            i, value = found
+            for faster in self.layers[:i]:
+                if faster.blocking:
+                    await asyncio.to_thread(faster.set, key, value)
+                else:
+                    faster.set(key, value)
+        self._record(endpoint, namespace, value)
+        return value
+
+    async def aset(self, namespace: str, parts: tuple, value: Dict[str, Any]) -> None:
+        key = make_key(namespace, parts)
+        fast, slow = self._split()
+        for layer in fast:
+            layer.set(key, value)
+        if slow:
+            await asyncio.to_thread(lambda: [layer.set(key, value) for layer in slow])
+
+    def stats(self) -> Dict[str, Any]:
+        per_endpoint = {}
+        for name, s in self._stats.items():
+            lookups = s["hits"] + s["misses"]
+            per_endpoint[name] = {
+                **s,
+                "hit_rate": s["hits"] / lookups if lookups else 0.0,
+            }
+        return {
+            "layers": {layer.name: len(layer) for layer in self.layers},
+            "endpoints": per_endpoint,
+        }
+
+
+def build_result_cache() -> ResultCache:
+    """Cache configured from the RESULT_CACHE_* environment variables."""
+    layers: List[Any] = [LRUCacheLayer()]
+    if RESULT_CACHE_SQLITE_PATH:
+        layers.append(SQLiteCacheLayer())
+    return ResultCache(layers)
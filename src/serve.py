@@ -0,0 +1,179 @@
+"""Pre-fork API server with copy-on-write shared indexes.
+
+The master process loads every vector store once, then forks SERVE_WORKERS
+uvicorn workers that all accept on one listening socket:
+
+    python -m src.serve --host 0.0.0.0 --port 8000 --workers 4
+
+Workers inherit the indexes instead of loading their own copies. The FAISS
+vectors live in native memory that is never written after load, so those
+pages stay shared. For the Python objects (docstore, metadata), ``gc.freeze()``
+moves them out of the collector's reach, so collections in the workers do not
+write to their pages. Gemini clients, the result cache's SQLite connection and
+the worker thread pool are created in each worker after the fork. Workers
+that die are restarted.
+"""
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, Dict, List
+
+SERVE_WORKERS = int(os.getenv("SERVE_WORKERS", "0"))  # 0 = one per available CPU
+
+# Lets workers find their siblings for the health report
+_MASTER_PID_ENV = "SERVE_MASTER_PID"
+
+# -----------------------------------------------------------------------------
+# Process memory (Linux /proc)
+# -----------------------------------------------------------------------------
+
+
+def process_memory(pid: int) -> Dict[str, Any]:
+    """RSS, PSS, shared and private memory of ``pid`` in MB.
+
+    PSS splits shared pages between the processes mapping them, so summing it
+    over all workers gives their real combined footprint. Private pages are
+    the ones a worker has copied (or allocated) for itself.
+    """
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(":")
+                if name in ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty"):
+                    fields[name] = int(rest.split()[0]) / 1024
+    except OSError:
+        return {"pid": pid}
+    return {
+        "pid": pid,
+        "rss_mb": round(fields.get("Rss", 0.0), 1),
+        "pss_mb": round(fields.get("Pss", 0.0), 1),
+        "shared_mb": round(fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0), 1),
+        "private_mb": round(fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0), 1),
+    }
+
+
+def worker_memory() -> List[Dict[str, Any]]:
+    """Memory of every worker under this master, or of this process alone."""
+    master = os.getenv(_MASTER_PID_ENV)
+    pids = [os.getpid()]
+    if master:
+        try:
+            with open(f"/proc/{master}/task/{master}/children") as f:
+                pids = sorted(int(pid) for pid in f.read().split())
+        except OSError:
+            pass
+    return [
+        {**process_memory(pid), "current": pid == os.getpid()}
+        for pid in pids
+    ]
+
+
+# -----------------------------------------------------------------------------
+# Master
+# -----------------------------------------------------------------------------
+
+
+def _default_workers() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+    from src.fastapi_app import app
+
+    config = uvicorn.Config(app, log_level=log_level, timeout_keep_alive=30)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(sock: socket.socket, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            _run_worker(sock, log_level)
+        except BaseException as e:
+            print(f"❌ Worker {os.getpid()} crashed: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            os._exit(code)
+    return pid
+
+
+def serve(host: str, port: int, workers: int, log_level: str = "info") -> None:
+    os.environ[_MASTER_PID_ENV] = str(os.getpid())
+
+    from src import fastapi_app
+
+    start = time.time()
+    fastapi_app.preload_vector_stores()
+    # Once here rather than once per worker
+    fastapi_app.prepare_eda_artifacts()
+    # Nothing below is garbage; freezing keeps the collector from touching
+    # (and so copying) the loaded objects' pages in the workers
+    gc.collect()
+    gc.freeze()
+    print(f"✅ Indexes loaded in master in {time.time() - start:.1f}s")
+
+    sock = _bind(host, port)
+    children = {_spawn(sock, log_level) for _ in range(workers)}
+    print(f"✅ Serving on http://{host}:{port} with {workers} workers")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"❌ Worker {pid} exited ({status}); restarting", file=sys.stderr)
+            time.sleep(1)  # avoid a tight crash loop
+            children.add(_spawn(sock, log_level))
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=SERVE_WORKERS or _default_workers())
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.log_level)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""Server-side state for conversational sessions (``/api/session`` WebSocket).
+
+A session remembers its recent turns and the passages retrieved so far, with
+their index vectors. Each new question is classified against that state:
+
+- ``continuation``: a follow-up that adds no new content words ("Why?",
+  "Tell me more about that"). It reuses the previous turn's passages, so it
+  skips embedding and retrieval entirely.
+- ``follow_up``: refers back to the conversation ("What caused it?") but
+  asks for something new. The question is rewritten with the previous one
+  for retrieval and generation. Retrieval searches the index and keeps the
+  session's best-matching earlier passages among the candidates.
+- ``fresh``: a standalone question, answered like a stateless request
+  (result cache included).
+
+Rewriting is lexical and adds no LLM call. Sessions live in the worker that
+accepted the connection and expire after SESSION_IDLE_TTL_S.
+"""
+
+import asyncio
+import os
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+SESSION_IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL_S", "1800"))
+# Turns kept for rewriting follow-ups
+SESSION_MAX_TURNS = int(os.getenv("SESSION_MAX_TURNS", "6"))
+# Passages (and their vectors) kept per session
+SESSION_MAX_CANDIDATES = int(os.getenv("SESSION_MAX_CANDIDATES", "40"))
+# Earlier passages offered to retrieval alongside the new vector hits
+SESSION_CANDIDATES_PER_TURN = int(os.getenv("SESSION_CANDIDATES_PER_TURN", "5"))
+
+CONTINUATION = "continuation"
+FOLLOW_UP = "follow_up"
+FRESH = "fresh"
+
+# Words that point back at something said earlier
+REFERENCE_WORDS = {
+    "it", "its", "this", "that", "these", "those", "they", "them", "their",
+    "he", "she", "him", "her", "his", "there", "then", "such", "same", "above",
+    "former", "latter", "previous", "earlier",
+}
+# Openings that only make sense after an earlier question
+FOLLOW_UP_OPENINGS = ("and ", "but ", "so ", "also ", "what about", "how about", "why not")
+# Content-free requests to keep going on the same material
+CONTINUATION_WORDS = {
+    "tell", "me", "more", "explain", "elaborate", "further", "detail", "details",
+    "example", "examples", "expand", "mean", "meant", "continue", "go", "on",
+    "please", "about", "give", "clarify", "say", "said", "you", "us", "again",
+    "else", "anything", "some", "other", "way", "another",
+}
+QUESTION_WORDS = {
+    "the", "and", "a", "an", "to", "of", "in", "for", "on", "at", "by", "with",
+    "is", "as", "are", "be", "from", "or", "was", "were", "what", "which", "who",
+    "whom", "when", "where", "why", "how", "does", "do", "did", "can", "could",
+    "would", "should", "will", "i", "not", "so", "but", "also",
+}
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+@dataclass
+class Turn:
+    question: str
+    rewritten: str
+    kind: str
+    chunk_ids: List[str]
+    answer: str = ""
+
+
+class Session:
+    """One conversation's turns and retrieved passages."""
+
+    def __init__(self, book_id: str):
+        self.id = secrets.token_urlsafe(12)
+        self.book_id = book_id
+        self.turns: Deque[Turn] = deque(maxlen=SESSION_MAX_TURNS)
+        # chunk ID -> (passage, index vector); most recently retrieved last
+        self.candidates: "OrderedDict[str, tuple]" = OrderedDict()
+        self.created = self.last_active = time.monotonic()
+        # One turn at a time, even if the session is resumed on a second connection
+        self.lock = asyncio.Lock()
+
+    # -- classification -------------------------------------------------------
+
+    def classify(self, question: str) -> str:
+        if not self.turns:
+            return FRESH
+        words = _words(question)
+        content = [w for w in words if w not in QUESTION_WORDS and w not in REFERENCE_WORDS]
+        if all(w in CONTINUATION_WORDS for w in content):
+            return CONTINUATION
+        if (
+            any(w in REFERENCE_WORDS for w in words)
+            or question.strip().lower().startswith(FOLLOW_UP_OPENINGS)
+            or len(content) <= 1
+        ):
+            return FOLLOW_UP
+        return FRESH
+
+    def rewrite(self, question: str, kind: str) -> str:
+        """Question with enough context to retrieve and answer it on its own."""
+        if kind == FRESH or not self.turns:
+            return question
+        # The last standalone question names the topic a chain of follow-ups is about
+        anchor = next((t.question for t in reversed(self.turns) if t.kind == FRESH), None)
+        previous = self.turns[-1].question
+        context = [q for q in dict.fromkeys((anchor, previous)) if q]
+        return f"{question} (follow-up to: {' / '.join(context)})"
+
+    # -- candidates -----------------------------------------------------------
+
+    def last_passages(self) -> List[Document]:
+        if not self.turns:
+            return []
+        return [self.candidates[c][0] for c in self.turns[-1].chunk_ids if c in self.candidates]
+
+    def best_candidates(self, query_embedding: List[float], n: int = SESSION_CANDIDATES_PER_TURN) -> List[Document]:
+        """Earlier passages closest to the query (L2, like the index)."""
+        if not self.candidates:
+            return []
+        docs, vectors = zip(*self.candidates.values())
+        distances = np.linalg.norm(np.stack(vectors) - np.asarray(query_embedding, dtype=np.float32), axis=1)
+        return [docs[i] for i in np.argsort(distances)[:n]]
+
+    def add_turn(self, turn: Turn, passages: List[Document], vectors: np.ndarray) -> None:
+        for doc, vector in zip(passages, vectors):
+            self.candidates.pop(doc.id, None)
+            self.candidates[doc.id] = (doc, vector)
+        while len(self.candidates) > SESSION_MAX_CANDIDATES:
+            self.candidates.popitem(last=False)
+        self.turns.append(turn)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.id,
+            "book_id": self.book_id,
+            "turns": len(self.turns),
+            "candidates": len(self.candidates),
+        }
+
+
+class SessionStore:
+    """Sessions by ID, evicted when idle too long or over capacity (oldest first)."""
+
+    def __init__(self, max_sessions: int = SESSION_MAX, idle_ttl: float = SESSION_IDLE_TTL_S):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.resumed = 0
+        self.expired = 0
+        self.turns_by_kind = {CONTINUATION: 0, FOLLOW_UP: 0, FRESH: 0}
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_active <= self.idle_ttl and len(self._sessions) < self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def open(self, book_id: str, session_id: Optional[str] = None) -> Session:
+        """Resume ``session_id`` if it is still alive for this book, else start a new one."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is not None and session.book_id == book_id:
+                self.resumed += 1
+            else:
+                session = Session(book_id)
+                self._sessions[session.id] = session
+                self.created += 1
+            session.last_active = now
+            self._sessions.move_to_end(session.id)
+            return session
+
+    def touch(self, session: Session, kind: str) -> None:
+        with self._lock:
+            session.last_active = time.monotonic()
+            if session.id in self._sessions:
+                self._sessions.move_to_end(session.id)
+            self.turns_by_kind[kind] += 1
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self._sessions),
+            "created": self.created,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "turns": dict(self.turns_by_kind),
+        }
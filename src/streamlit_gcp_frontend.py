@@ -1,14 +1,15 @@
 import streamlit as st
 import requests
-import json
-import time
 from typing import Dict, Any, List
 import os
+from src.api_client import ApiError, get_api_client
 from src.eda_page import show_eda_page
 
 # Configuration
 API_URL = os.getenv("API_URL", "http://localhost:8000")  # Local API in same container
 
+api = get_api_client(API_URL)
+
 # Page configuration
 st.set_page_config(
     page_title="Closed Book QA - GCP",
@@ -46,6 +47,20 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def render_sources(sources: List[Dict[str, Any]]):
+    """Render source cards for an answer."""
+    for source in sources:
+        st.markdown(f"""
+        <div class="source-card">
+            <strong>Source {source['rank']}</strong><br>
+            <em>Chapter: {source['metadata'].get('chapter', 'N/A')}</em><br>
+            <em>PDF Page: {source['metadata'].get('pdf_page', 'N/A')}</em><br>
+            <em>Book ID: {source['metadata'].get('book_id', 'N/A')}</em><br>
+            <p>Content: {source['content']}</p>
+        </div>
+        """, unsafe_allow_html=True)
+
+
 # Initialize session state
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -63,20 +78,17 @@ with st.sidebar:
     
     # API Status Check
     st.subheader("🔗 API Status")
-    if st.button("Check API Health"):
-        try:
-            response = requests.get(f"{API_URL}/api/health", timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                st.session_state.api_status = "healthy"
-                st.success("✅ API is healthy")
-                st.json(data)
-            else:
-                st.session_state.api_status = "unhealthy"
-                st.error("❌ API is unhealthy")
-        except Exception as e:
-            st.session_state.api_status = "error"
-            st.error(f"❌ Cannot connect to API: {str(e)}")
+    # Cached for a few seconds, so reruns do not wait on the API
+    health = api.health(max_age=0 if st.button("Check API Health") else None)
+    st.session_state.api_status = "healthy" if health.ok else ("unhealthy" if health.status_code else "error")
+    if health.ok:
+        st.success(f"✅ API is healthy (checked {health.age:.0f}s ago)")
+        with st.expander("Details"):
+            st.json(health.data)
+    elif health.status_code:
+        st.error(f"❌ API is unhealthy ({health.status_code})")
+    else:
+        st.error(f"❌ Cannot connect to API: {health.error}")
     
     # Book Selection
     st.subheader("📖 Book Selection")
@@ -125,16 +137,7 @@ else:
                 # Display sources if available
                 if "sources" in message and message["sources"]:
                     with st.expander("📚 Sources"):
-                        for source in message["sources"]:
-                            st.markdown(f"""
-                            <div class="source-card">
-                                <strong>Source {source['rank']}</strong><br>
-                                <em>Chapter: {source['metadata'].get('chapter', 'N/A')}</em><br>
-                                <em>PDF Page: {source['metadata'].get('pdf_page', 'N/A')}</em><br>
-                                <em>Book ID: {source['metadata'].get('book_id', 'N/A')}</em><br>
-                                <p>Content: {source['content']}</p>
-                            </div>
-                            """, unsafe_allow_html=True)
+                        render_sources(message["sources"])
                 
                 # Display processing time if available
                 if "processing_time" in message:
@@ -151,69 +154,43 @@ else:
 
         # Generate and display assistant response
         with st.chat_message("assistant"):
-            progress_bar = st.progress(0)
             status_text = st.empty()
-            
+            answer_placeholder = st.empty()
+            sources_container = st.container()
+
+            answer = ""
+            sources: List[Dict[str, Any]] = []
             try:
-                # Step 1: Prepare request
-                status_text.text("🔄 Preparing request...")
-                progress_bar.progress(25)
-                
-                request_data = {
-                    "question": prompt,
-                    "book_id": st.session_state.book_id
-                }
-                
-                # Step 2: Send request to API
-                status_text.text("🚀 Sending request to Backend Server...")
-                progress_bar.progress(50)
-                
-                response = requests.post(
-                    f"{API_URL}/api/ask",
-                    json=request_data,
-                    timeout=60  # 60 second timeout
-                )
-                
-                progress_bar.progress(75)
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Display answer
-                    if data["status"] == "success":
-                        st.markdown(data["answer"])
-                        
-                        # Display sources
-                        if data["sources"]:
-                            with st.expander("📚 Sources"):
-                                for source in data["sources"]:
-                                    st.markdown(f"""
-                                    <div class="source-card">
-                                        <strong>Source {source['rank']}</strong><br>
-                                        <em>Chapter: {source['metadata'].get('chapter', 'N/A')}</em><br>
-                                        <em>PDF Page: {source['metadata'].get('pdf_page', 'N/A')}</em><br>
-                                        <em>Book ID: {source['metadata'].get('book_id', 'N/A')}</em><br>
-                                        <p>Content: {source['content']}</p>
-                                    </div>
-                                    """, unsafe_allow_html=True)
-                        
-                        # Display processing time
-                        st.caption(f"⏱️ Processing time: {data['processing_time']:.2f}s")
-                        
+                status_text.text("🔎 Retrieving passages...")
+                # Leave headroom under the 60s client timeout for the response to arrive
+                events = api.ask_stream(prompt, st.session_state.book_id, timeout=60, deadline_ms=55000)
+                for event, data in events:
+                    if event == "sources":
+                        sources = data["sources"]
+                        status_text.text("✍️ Generating answer...")
+                        if sources:
+                            with sources_container.expander("📚 Sources"):
+                                render_sources(sources)
+                    elif event == "token":
+                        answer += data["text"]
+                        answer_placeholder.markdown(answer + "▌")
+                    elif event == "timings":
+                        answer_placeholder.markdown(answer)
+                        st.caption(
+                            f"⏱️ Processing time: {data['processing_time']:.2f}s "
+                            f"(first token after {data['time_to_first_token']:.2f}s)"
+                        )
                         # Add assistant message to history
                         st.session_state.messages.append({
                             "role": "assistant",
-                            "content": data["answer"],
-                            "sources": data["sources"],
+                            "content": answer,
+                            "sources": sources,
                             "processing_time": data["processing_time"],
                             "book_id": st.session_state.book_id,
                         })
-                    else:
-                        st.error(f"❌ API returned error: {data['answer']}")
-                        
-                else:
-                    st.error(f"❌ API Error ({response.status_code}): {response.text}")
-                    
+
+            except ApiError as e:
+                st.error(f"❌ API Error ({e.status_code}): {e.detail}")
             except requests.exceptions.Timeout:
                 st.error("⏰ Request timed out. Please try again.")
             except requests.exceptions.ConnectionError:
@@ -221,10 +198,6 @@ else:
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
             finally:
-                progress_bar.progress(100)
-                status_text.text("✅ Complete!")
-                time.sleep(0.5)
-                progress_bar.empty()
                 status_text.empty()
 
 # Footer
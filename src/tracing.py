@@ -0,0 +1,243 @@
+"""Lightweight request tracing.
+
+``span(name)`` times a block, records it in the ``rag_stage_seconds``
+histogram, attaches it to the request's trace (if one is active) and appends
+it to a local JSONL trace log (opt-in, size-capped) in the OpenTelemetry
+OTLP/JSON span layout.
+Parent/child links follow a context variable, so spans opened inside
+``asyncio.to_thread`` or tasks created under a request still belong to it.
+Work shared by several requests runs under ``batch_span``, a root span of its
+own that links to the span of each request it serves.
+"""
+
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.metrics import STAGE_SECONDS
+
+# Off unless set (e.g. logs/traces.jsonl): on Cloud Run the filesystem is in memory
+TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "")
+# The log is rotated to "<path>.1" at this size, so it takes at most twice this
+TRACE_LOG_MAX_MB = float(os.getenv("TRACE_LOG_MAX_MB", "50"))
+SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "closed-book-qa")
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    end_ns: int = 0
+    duration_s: float = 0.0
+    error: Optional[str] = None
+    # (trace_id, span_id) of spans in other traces this one relates to
+    links: List[Tuple[str, str]] = field(default_factory=list)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "kind": "SPAN_KIND_INTERNAL",
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "links": [{"traceId": t, "spanId": sid} for t, sid in self.links],
+            "status": (
+                {"code": "STATUS_CODE_ERROR", "message": self.error}
+                if self.error else {"code": "STATUS_CODE_OK"}
+            ),
+            "resource": {"attributes": [
+                _otlp_attribute("service.name", SERVICE_NAME),
+                _otlp_attribute("process.pid", os.getpid()),
+            ]},
+        }
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+        self._started = time.perf_counter()
+
+    @property
+    def trace_id(self) -> Optional[str]:
+        return self.root.trace_id if self.root else None
+
+    def timings(self) -> Dict[str, float]:
+        """Milliseconds per span name (summed over repeats), plus ``total``."""
+        timings: Dict[str, float] = {}
+        for s in self.spans:
+            if s is not self.root:
+                timings[s.name] = timings.get(s.name, 0.0) + s.duration_s * 1000
+        timings["total"] = (time.perf_counter() - self._started) * 1000
+        return {name: round(ms, 3) for name, ms in timings.items()}
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+# -----------------------------------------------------------------------------
+# Trace log
+# -----------------------------------------------------------------------------
+
+
+class _Exporter:
+    """Appends finished spans to TRACE_LOG_PATH from a background thread.
+
+    Once the file reaches ``max_bytes`` it is renamed to ``<path>.1``
+    (replacing the previous one) and a new file is started.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._queue: "queue.SimpleQueue[Span]" = queue.SimpleQueue()
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def export(self, s: Span) -> None:
+        if self._pid != os.getpid():  # first span in this process (or after a fork)
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.SimpleQueue()
+                    threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+                    self._pid = os.getpid()
+        self._queue.put(s)
+
+    def _run(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        spans = self._queue
+        f = open(self.path, "a", encoding="utf-8")
+        size = f.tell()
+        while True:
+            size += f.write(json.dumps(spans.get().to_otlp(), ensure_ascii=False) + "\n")
+            while not spans.empty() and size < self.max_bytes:
+                size += f.write(json.dumps(spans.get().to_otlp(), ensure_ascii=False) + "\n")
+            f.flush()
+            # Opened in append mode, so this counts other workers' writes too
+            size = f.tell()
+            if size >= self.max_bytes:
+                f = self._rotate(f)
+                size = f.tell()
+
+    def _rotate(self, f):
+        inode = os.fstat(f.fileno()).st_ino
+        f.close()
+        try:
+            # Unless another worker has rotated it already
+            if os.stat(self.path).st_ino == inode:
+                os.replace(self.path, self.path + ".1")
+        except FileNotFoundError:
+            pass
+        return open(self.path, "a", encoding="utf-8")
+
+
+_exporter = _Exporter(TRACE_LOG_PATH, int(TRACE_LOG_MAX_MB * 2**20)) if TRACE_LOG_PATH else None
+
+# -----------------------------------------------------------------------------
+# Spans
+# -----------------------------------------------------------------------------
+
+
+@contextmanager
+def span(name: str, record_metric: bool = True, **attributes: Any):
+    """Time the enclosed block as a child of the current span."""
+    parent = _current_span.get()
+    s = Span(
+        name=name,
+        trace_id=parent.trace_id if parent else secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent.span_id if parent else None,
+        start_ns=time.time_ns(),
+        attributes=attributes,
+    )
+    token = _current_span.set(s)
+    started = time.perf_counter()
+    try:
+        yield s
+    except Exception as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        s.duration_s = time.perf_counter() - started
+        s.end_ns = s.start_ns + int(s.duration_s * 1e9)
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # A generator closed from another context (e.g. by the GC)
+            pass
+        if record_metric:
+            STAGE_SECONDS.observe(s.duration_s, stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.spans.append(s)
+        if _exporter is not None:
+            _exporter.export(s)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def batch_span(name: str, links: Iterable[Optional[Span]], **attributes: Any):
+    """Time shared work as the root of its own trace, linked to each requester's span.
+
+    Spans opened inside are its children. It is not added to any request's
+    ``Trace``, so no single requester is charged for the whole batch.
+    """
+    span_token = _current_span.set(None)
+    trace_token = _current_trace.set(None)
+    try:
+        with span(name, **attributes) as s:
+            s.links = [(l.trace_id, l.span_id) for l in links if l is not None]
+            yield s
+    finally:
+        _current_trace.reset(trace_token)
+        _current_span.reset(span_token)
+
+
+@contextmanager
+def trace(name: str, **attributes: Any):
+    """Collect every span opened inside the block into a ``Trace``.
+
+    The block itself becomes the root span; it is not recorded as a stage.
+    """
+    t = Trace()
+    token = _current_trace.set(t)
+    try:
+        with span(name, record_metric=False, **attributes) as root:
+            t.root = root
+            yield t
+    finally:
+        _current_trace.reset(token)
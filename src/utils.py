@@ -1,3 +1,4 @@
+import os
 import re
 from typing import Optional, Tuple, List
 
@@ -33,3 +34,38 @@ def find_image_refs(html: str) -> List[str]:
     # This regex is basic and might need to be made more robust
     return re.findall(r'src="[^"]+\/([^"]+\.(?:png|jpg|jpeg|gif))"', html, re.I)
 
+
+# -----------------------------------------------------------------------------
+# Sentence splitting
+# -----------------------------------------------------------------------------
+
+def split_sentences(text: str) -> List[str]:
+    """Split text on ., ! or ? followed by whitespace (no NLTK dependency)."""
+    parts = re.split(r"(?<=[\.!\?])\s+", text)
+    return [p.strip() for p in parts if p.strip()]
+
+# -----------------------------------------------------------------------------
+# Question normalization
+# -----------------------------------------------------------------------------
+
+def normalize_question(question: str) -> str:
+    """Canonical form of a question for deduplication and cache keys.
+
+    Lower-cases, collapses whitespace and drops trailing punctuation so that
+    trivially different spellings of the same question map to one key.
+    """
+    return re.sub(r"\s+", " ", question).strip().rstrip("?!. ").lower()
+
+# -----------------------------------------------------------------------------
+# Processes
+# -----------------------------------------------------------------------------
+
+def pid_alive(pid: int) -> bool:
+    """Whether a process with this PID exists (it may belong to another user)."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -0,0 +1,179 @@
+"""Startup warmup: prime indexes, clients and caches before reporting ready.
+
+Loading an index is not the same as being fast. The first searches fault in
+index pages and start BLAS threads, the embedding and Gemini clients open
+their connections on first use, the tokenizer loads on first count, and the
+result cache starts empty. The API runs a warmup in each worker after loading
+and only then reports ready. The warmup has three parts:
+
+- touch every index page,
+- run a few canned questions per book through retrieval (and, with
+  WARMUP_GENERATE, generation),
+- pull the most frequently asked questions from a saved hot-query list into
+  the in-memory cache, retrieving the ones that are not cached yet.
+
+The hot-query list is recorded by the API itself and saved on shutdown.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+# Also generate answers (canned questions and uncached hot queries); costs LLM calls
+WARMUP_GENERATE = os.getenv("WARMUP_GENERATE", "0") == "1"
+# Readiness is reported after this long even if the warmup has not finished
+WARMUP_TIMEOUT_S = float(os.getenv("WARMUP_TIMEOUT_S", "60"))
+# Empty string disables recording and replaying hot queries
+WARMUP_HOT_QUERIES_PATH = os.getenv(
+    "WARMUP_HOT_QUERIES_PATH", os.path.join("vector_store", "hot_queries.json")
+)
+WARMUP_MAX_HOT_QUERIES = int(os.getenv("WARMUP_MAX_HOT_QUERIES", "200"))
+
+# Representative questions per book; they exercise embedding, FAISS, BM25,
+# rerank and context packing the same way a real request does
+WARMUP_QUESTIONS = {
+    "debt_crisis": [
+        "What is a beautiful deleveraging?",
+        "How do central banks respond when interest rates hit zero?",
+        "What are the phases of a short-term debt cycle?",
+    ],
+    "capitalism": [
+        "Why do incumbents oppose free financial markets?",
+        "What is relationship-based finance?",
+        "How can openness protect markets from capture?",
+    ],
+}
+
+# -----------------------------------------------------------------------------
+# Index pages
+# -----------------------------------------------------------------------------
+
+
+def touch_index(vs) -> int:
+    """Read every vector of a FAISS store; returns bytes read.
+
+    The docstore is deliberately left alone. Reading a Document from Python
+    updates its reference count, which writes to its page, so under the
+    pre-fork server (src.serve) every worker would end up with a private
+    copy of the whole docstore. The FAISS vectors are native memory and are
+    only read here; the canned questions fault in the passages they return.
+    """
+    index = vs.index
+    try:
+        return index.reconstruct_n(0, index.ntotal).nbytes
+    except RuntimeError:
+        return 0  # index type without reconstruction; the searches still touch it
+
+# -----------------------------------------------------------------------------
+# Hot queries
+# -----------------------------------------------------------------------------
+
+# Request fields that, with the index version, make up the answer cache key
+HOT_QUERY_FIELDS = ("question", "book_id", "verify", "answer_mode")
+_FIELD_DEFAULTS = {"verify": False, "answer_mode": "generate"}
+
+
+class HotQueries:
+    """Counts asked questions and keeps the most frequent ones on disk."""
+
+    def __init__(self, path: str = WARMUP_HOT_QUERIES_PATH, limit: int = WARMUP_MAX_HOT_QUERIES):
+        self.path = path
+        self.limit = limit
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, question: str, book_id: str, verify: bool = False,
+               answer_mode: str = "generate") -> None:
+        if self.path:
+            with self._lock:
+                self._counts[(question, book_id, verify, answer_mode)] += 1
+
+    def load(self) -> List[Dict[str, Any]]:
+        """Saved queries, most frequent first; empty if there is no list."""
+        if not self.path:
+            return []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                queries = json.load(f)
+        except (OSError, ValueError):
+            return []
+        queries = [q for q in queries if q.get("question") and q.get("book_id")]
+        queries.sort(key=lambda q: q.get("count", 0), reverse=True)
+        return queries[:self.limit]
+
+    def save(self) -> None:
+        """Merge this process's counts into the saved list.
+
+        Workers that save at the same moment may drop each other's counts;
+        that only changes which questions the next warmup picks.
+        """
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        if not self.path or not counts:
+            return
+        for q in self.load():
+            key = tuple(q.get(f, _FIELD_DEFAULTS.get(f)) for f in HOT_QUERY_FIELDS)
+            counts[key] += q.get("count", 1)
+        queries = [
+            {**dict(zip(HOT_QUERY_FIELDS, key)), "count": count}
+            for key, count in counts.most_common(self.limit)
+        ]
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(queries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+# -----------------------------------------------------------------------------
+# Report
+# -----------------------------------------------------------------------------
+
+
+class WarmupReport:
+    """Per-phase warmup time and the latency of the first request after it."""
+
+    def __init__(self):
+        self.state = "pending"  # pending -> running -> done | timed_out | failed | disabled
+        self.phases_ms: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.error: Optional[str] = None
+        self.first_request_ms: Optional[float] = None
+        # This process's memory split (see src.serve.process_memory) before and after
+        self.memory: Dict[str, Dict[str, Any]] = {}
+        self._phase_start = 0.0
+
+    def phase(self, name: str) -> None:
+        """Start timing ``name``; the previous phase ends here."""
+        now = time.perf_counter()
+        if self.phases_ms:
+            last = next(reversed(self.phases_ms))
+            self.phases_ms[last] = round((now - self._phase_start) * 1000, 1)
+        self.phases_ms[name] = 0.0
+        self._phase_start = now
+
+    def finish(self, state: str, error: Optional[str] = None) -> None:
+        if self.phases_ms:
+            self.phase("_end")
+            del self.phases_ms["_end"]
+        self.state = state
+        self.error = error
+
+    def record_request(self, seconds: float) -> None:
+        if self.first_request_ms is None:
+            self.first_request_ms = round(seconds * 1000, 1)
+            print(f"✅ First request served in {self.first_request_ms:.0f} ms (warmup {self.state})")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "phases_ms": self.phases_ms,
+            "total_ms": round(sum(self.phases_ms.values()), 1),
+            **self.counts,
+            "error": self.error,
+            "first_request_ms": self.first_request_ms,
+            "memory": self.memory,
+        }
@@ -0,0 +1,44 @@
+"""Shared fixtures. The API runs against the fake backends (src/fake_backends.py),
+so no Gemini key or network access is needed."""
+
+import os
+import sys
+import time
+import uuid
+
+# Read at import time by src.*, so they are set before anything is imported
+os.environ.update(
+    LLM_BACKEND="fake",
+    RESULT_CACHE_SQLITE_PATH="",
+    WARMUP_ENABLED="0",
+    EDA_BUILD_ON_STARTUP="0",
+    WARMUP_HOT_QUERIES_PATH="",
+    TRACE_LOG_PATH="",
+    CONTEXT_TOKENIZER="chars",
+    FAKE_EMBED_LATENCY_MS="fixed:5",
+    FAKE_GEN_LATENCY_MS="fixed:20",
+    FAKE_TOKEN_LATENCY_MS="fixed:0",
+)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    from src.fastapi_app import app
+
+    with TestClient(app) as c:
+        deadline = time.monotonic() + 60
+        while not c.get("/api/ready").json()["ready"]:
+            assert time.monotonic() < deadline, "indexes did not load"
+            time.sleep(0.05)
+        yield c
+
+
+@pytest.fixture
+def question():
+    """A question no other test asked, so it misses the result cache."""
+    return f"What is a beautiful deleveraging? ({uuid.uuid4().hex[:8]})"
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from src.admission import AdmissionController, Overloaded
+
+
+def test_full_queue_is_rejected_with_429():
+    admission = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1.0)
+
+    async def main():
+        ticket = await admission.acquire()
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire()
+        ticket.release()
+        return rejected.value
+
+    error = asyncio.run(main())
+    assert error.status_code == 429
+    assert error.retry_after >= 1
+    assert admission.rejected_queue_full == 1
+    assert admission.rejected_timeout == 0
+
+
+def test_queue_timeout_is_rejected_with_503():
+    admission = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout=0.05)
+
+    async def main():
+        ticket = await admission.acquire()
+        with pytest.raises(Overloaded) as rejected:
+            await admission.acquire()
+        depth = admission.queue_depth
+        ticket.release()
+        return rejected.value, depth
+
+    error, depth = asyncio.run(main())
+    assert error.status_code == 503
+    assert error.retry_after >= 1
+    assert depth == 0
+    assert admission.rejected_timeout == 1
+    assert admission.rejected_queue_full == 0
+
+
+def test_queued_request_gets_the_released_slot():
+    admission = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=1.0)
+
+    async def main():
+        first = await admission.acquire()
+        waiting = asyncio.ensure_future(admission.acquire())
+        await asyncio.sleep(0.01)
+        assert admission.queue_depth == 1
+        first.release()
+        second = await waiting
+        second.release()
+
+    asyncio.run(main())
+    assert admission.admitted == 2
+    assert admission.in_flight == 0
+
+
+def test_ticket_release_is_idempotent():
+    admission = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout=1.0)
+
+    async def main():
+        ticket = await admission.acquire()
+        ticket.release()
+        ticket.release()
+        assert admission.in_flight == 0
+        # A second release must not have freed a second slot
+        again = await admission.acquire()
+        with pytest.raises(Overloaded):
+            await admission.acquire()
+        again.release()
+
+    asyncio.run(main())
+    assert admission.in_flight == 0
@@ -0,0 +1,132 @@
+"""/api/ask under concurrency: coalescing, deadlines and admission control."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src import fastapi_app
+from src.admission import AdmissionController
+
+
+def _concurrently(client, bodies, stagger=0.05):
+    """POST each body to /api/ask from its own thread, ``stagger`` seconds apart."""
+    responses = [None] * len(bodies)
+
+    def post(i, body):
+        time.sleep(i * stagger)
+        responses[i] = client.post("/api/ask", json=body)
+
+    threads = [threading.Thread(target=post, args=(i, b)) for i, b in enumerate(bodies)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return responses
+
+
+@pytest.fixture
+def slow_pipeline(monkeypatch):
+    """Make every pipeline run take at least ``delay`` seconds (or fail with ``error``)."""
+    real = fastapi_app._answer_pipeline
+
+    def install(delay, error=None):
+        async def pipeline(*args, **kwargs):
+            await asyncio.sleep(delay)
+            if error is not None:
+                raise error
+            return await real(*args, **kwargs)
+
+        monkeypatch.setattr(fastapi_app, "_answer_pipeline", pipeline)
+
+    return install
+
+
+def test_identical_requests_share_one_execution(client, question, slow_pipeline):
+    slow_pipeline(0.3)
+    before = fastapi_app.ask_flight.executions
+    body = {"question": question, "book_id": "debt_crisis"}
+    first, second = _concurrently(client, [body, body])
+    assert first.status_code == second.status_code == 200
+    assert first.json()["answer"] == second.json()["answer"]
+    assert fastapi_app.ask_flight.executions - before == 1
+
+
+def test_coalesced_error_reaches_every_waiter(client, question, slow_pipeline):
+    slow_pipeline(0.3, RuntimeError("backend down"))
+    before = fastapi_app.ask_flight.executions
+    body = {"question": question, "book_id": "debt_crisis"}
+    responses = _concurrently(client, [body, body])
+    for r in responses:
+        assert r.json()["status"] == "error"
+        assert "backend down" in r.json()["answer"]
+    assert fastapi_app.ask_flight.executions - before == 1
+    assert fastapi_app.ask_flight.stats()["in_flight"] == 0
+
+
+@pytest.mark.parametrize("deadline_first", [True, False])
+def test_waiters_keep_their_own_deadline(client, question, slow_pipeline, deadline_first):
+    slow_pipeline(0.8)
+    bounded = {"question": question, "book_id": "debt_crisis", "deadline_ms": 300}
+    unbounded = {"question": question, "book_id": "debt_crisis"}
+    bodies = [bounded, unbounded] if deadline_first else [unbounded, bounded]
+    responses = dict(zip(("bounded", "unbounded") if deadline_first else ("unbounded", "bounded"),
+                         _concurrently(client, bodies)))
+
+    assert responses["bounded"].status_code == 504
+    assert responses["bounded"].json()["detail"] == "Deadline of 300 ms exceeded"
+    assert responses["unbounded"].status_code == 200
+    assert responses["unbounded"].json()["skipped_stages"] == []
+
+
+def test_degraded_result_is_not_cached_or_shared(client, question):
+    body = {"question": question, "book_id": "debt_crisis"}
+    # Between the shrink-k and skip-rerank tiers (see src.deadline)
+    degraded = client.post("/api/ask", json={**body, "deadline_ms": 4200}).json()
+    assert degraded["skipped_stages"] == ["rerank"]
+
+    full = client.post("/api/ask", json=body).json()
+    assert full["skipped_stages"] == []
+    assert full["cached"] is False
+
+    shrunk = client.post("/api/ask", json={**body, "question": question + " now", "deadline_ms": 3500}).json()
+    assert shrunk["skipped_stages"] == ["full_k", "rerank"]
+
+
+@pytest.mark.parametrize("deadline_ms", [0, -1, -5000])
+def test_non_positive_deadline_is_rejected(client, question, deadline_ms):
+    body = {"question": question, "book_id": "debt_crisis", "deadline_ms": deadline_ms}
+    response = client.post("/api/ask", json=body)
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][-1] == "deadline_ms"
+    batch = client.post("/api/ask/batch", json={"questions": [body]})
+    assert batch.status_code == 422
+    assert batch.json()["detail"][0]["loc"] == ["body", "questions", 0, "deadline_ms"]
+
+
+def test_full_queue_gets_429_with_retry_after(client, question, slow_pipeline, monkeypatch):
+    slow_pipeline(0.4)
+    monkeypatch.setattr(fastapi_app, "admission", AdmissionController(1, 0, 1.0))
+    first, second = _concurrently(client, [
+        {"question": question, "book_id": "debt_crisis"},
+        {"question": question + " again", "book_id": "debt_crisis"},
+    ])
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers["Retry-After"]) >= 1
+
+
+def test_queue_timeout_gets_503_with_retry_after(client, question, slow_pipeline, monkeypatch):
+    slow_pipeline(0.4)
+    admission = AdmissionController(1, 4, 0.1)
+    monkeypatch.setattr(fastapi_app, "admission", admission)
+    first, second = _concurrently(client, [
+        {"question": question, "book_id": "debt_crisis"},
+        {"question": question + " again", "book_id": "debt_crisis"},
+    ])
+    assert first.status_code == 200
+    assert second.status_code == 503
+    assert int(second.headers["Retry-After"]) >= 1
+    assert admission.queue_depth == 0
+    assert admission.in_flight == 0
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from src.coalesce import SingleFlight
+
+
+def _slow(result, delay=0.05, calls=None):
+    async def fn():
+        if calls is not None:
+            calls.append(result)
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return fn
+
+
+def test_concurrent_calls_share_one_execution():
+    flight, calls = SingleFlight(), []
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", _slow(i, calls=calls)) for i in range(5)))
+
+    assert asyncio.run(main()) == [0] * 5
+    assert calls == [0]
+    assert flight.stats() == {"calls": 5, "executions": 1, "coalesced": 4, "errors": 0, "in_flight": 0}
+
+
+def test_error_reaches_every_waiter_and_is_not_remembered():
+    flight = SingleFlight()
+
+    async def main():
+        results = await asyncio.gather(
+            *(flight.do("k", _slow(ValueError("boom"))) for _ in range(3)),
+            return_exceptions=True,
+        )
+        again = await flight.do("k", _slow("ok"))
+        return results, again
+
+    results, again = asyncio.run(main())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert again == "ok"
+    assert flight.errors == 1
+    assert flight.executions == 2
+
+
+def test_waiter_timeout_does_not_cancel_the_shared_execution():
+    flight = SingleFlight()
+
+    async def main():
+        shared = asyncio.ensure_future(flight.do("k", _slow("done", delay=0.2)))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("k", _slow("unused"), timeout=0.05)
+        return await shared
+
+    assert asyncio.run(main()) == "done"
+    assert flight.coalesced == 1
+
+
+def test_non_leader_joins_but_never_leads():
+    flight, calls = SingleFlight(), []
+
+    async def main():
+        # Nothing in flight: runs on its own, and a later caller does not join it
+        alone = asyncio.ensure_future(flight.do("k", _slow("alone", calls=calls), lead=False))
+        await asyncio.sleep(0)
+        assert flight.stats()["in_flight"] == 0
+        leader = asyncio.ensure_future(flight.do("k", _slow("leader", calls=calls)))
+        await asyncio.sleep(0)
+        # Something in flight: joins it
+        follower = await flight.do("k", _slow("unused", calls=calls), lead=False)
+        return await alone, await leader, follower
+
+    assert asyncio.run(main()) == ("alone", "leader", "leader")
+    assert calls == ["alone", "leader"]
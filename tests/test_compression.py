@@ -0,0 +1,17 @@
+"""Accept-Encoding negotiation of src.compression (br needs the brotli package)."""
+
+import pytest
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("br, gzip", "br"),
+    ("gzip", "gzip"),
+    ("br;q=0, gzip", "gzip"),
+    ("identity", None),
+])
+def test_encoding_negotiation(client, accept, expected):
+    # Large enough (well over MINIMUM_SIZE) to be compressed
+    response = client.get("/openapi.json", headers={"Accept-Encoding": accept})
+    assert response.status_code == 200
+    assert response.headers.get("content-encoding") == expected
+    assert response.json()["info"]["title"] == "Closed Book QA API"
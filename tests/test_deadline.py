@@ -0,0 +1,37 @@
+import time
+
+import pytest
+
+from src.deadline import SHRINK_K_BELOW_S, SKIP_RERANK_BELOW_S, Deadline, DeadlineExceeded
+
+
+def test_no_budget_never_runs_low():
+    deadline = Deadline.from_ms(None)
+    assert deadline.has(1e9)
+    assert deadline.timeout() is None
+    assert not deadline.degraded
+
+
+def test_tiers_follow_the_remaining_budget():
+    between = Deadline((SKIP_RERANK_BELOW_S + SHRINK_K_BELOW_S) / 2)
+    assert not between.has(SKIP_RERANK_BELOW_S)
+    assert between.has(SHRINK_K_BELOW_S)
+
+    assert Deadline(SKIP_RERANK_BELOW_S + 1).has(SKIP_RERANK_BELOW_S)
+    assert not Deadline(SHRINK_K_BELOW_S - 1).has(SHRINK_K_BELOW_S)
+
+
+def test_skip_records_each_stage_once():
+    deadline = Deadline(1.0)
+    deadline.skip("rerank")
+    deadline.skip("rerank")
+    assert deadline.skipped == ["rerank"]
+    assert deadline.degraded
+
+
+def test_timeout_raises_once_expired():
+    deadline = Deadline(0.01)
+    assert 0 < deadline.timeout() <= 0.01
+    time.sleep(0.02)
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout()
@@ -0,0 +1,74 @@
+import json
+
+import pytest
+
+from src import eda_api
+
+
+@pytest.fixture
+def book(tmp_path, monkeypatch):
+    """A stand-in EPUB and a summary that only depends on its bytes."""
+    epub = tmp_path / "book.epub"
+    epub.write_bytes(b"first edition")
+    builds = []
+
+    def summarize(book_id, epub_path):
+        builds.append(epub_path.read_bytes())
+        return {"book_id": book_id, "summary": {"source": builds[-1].decode()}, eda_api.WORDCLOUD_FIELD: "png"}
+
+    monkeypatch.setattr(eda_api, "_book_to_epub_path", lambda book_id: epub)
+    monkeypatch.setattr(eda_api, "_summarize", summarize)
+    monkeypatch.setattr(eda_api, "_artifacts", {})
+    return epub, tmp_path / "index", builds
+
+
+def test_artifact_fields_are_headers_not_body(book):
+    epub, vs_dir, _ = book
+    artifact = eda_api.get_eda_artifact("capitalism", str(vs_dir))
+    body = json.loads(artifact.body(True))
+    assert "artifact" not in body
+    assert body[eda_api.WORDCLOUD_FIELD] == "png"
+    assert eda_api.WORDCLOUD_FIELD not in json.loads(artifact.body(False))
+    assert artifact.headers()["X-EDA-Artifact-Version"] == str(eda_api.EDA_ARTIFACT_VERSION)
+    assert len(artifact.headers()["X-EDA-Source-SHA256"]) == 64
+
+
+def test_rebuilds_are_byte_identical(book):
+    _, vs_dir, _ = book
+    path = eda_api.build_eda_artifact("capitalism", str(vs_dir))
+    first = open(path, "rb").read()
+    eda_api.build_eda_artifact("capitalism", str(vs_dir))
+    assert open(path, "rb").read() == first
+
+
+def test_rebuilt_when_the_epub_changes(book):
+    epub, vs_dir, builds = book
+    first = eda_api.get_eda_artifact("capitalism", str(vs_dir))
+    assert eda_api.get_eda_artifact("capitalism", str(vs_dir)) is first
+    assert len(builds) == 1
+
+    epub.write_bytes(b"second edition, revised")
+    second = eda_api.get_eda_artifact("capitalism", str(vs_dir))
+    assert len(builds) == 2
+    assert json.loads(second.body(True))["summary"]["source"] == "second edition, revised"
+    assert second.etag(True) != first.etag(True)
+
+
+def test_kept_without_the_epub(book):
+    epub, vs_dir, builds = book
+    eda_api.build_eda_artifact("capitalism", str(vs_dir))
+    epub.unlink()
+    assert eda_api.get_eda_artifact("capitalism", str(vs_dir), build=False) is not None
+    assert len(builds) == 1
+
+
+def test_wordcloud_keeps_collocations():
+    stats, corpus = eda_api.compute_stats(
+        [({"id": str(i)}, "The Federal Reserve raised rates while banks lent and markets fell.") for i in range(40)]
+        + [({"id": "x"}, "Federal budgets grew. A reserve currency held. Rates rose.")]
+    )
+    frequencies = eda_api._wordcloud_frequencies(corpus)
+    assert frequencies["federal reserve"] == 40
+    # Taken off its words, as WordCloud.generate() does
+    assert frequencies.get("federal", 0) < 40 and frequencies.get("reserve", 0) < 40
+    assert "while" not in frequencies  # a WordCloud stopword
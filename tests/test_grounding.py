@@ -0,0 +1,27 @@
+from langchain.schema import Document
+
+from src import grounding
+
+PASSAGE = (
+    "The Smoot-Hawley Tariff Act raised duties on more than 20,000 imported goods. "
+    "By 1932, world trade had fallen by 1,000 million dollars a month."
+)
+
+
+def test_verbatim_quote_is_fully_grounded():
+    result = grounding.check_grounding(PASSAGE, [Document(page_content=PASSAGE)])
+    assert result.sentence_scores == [1.0, 1.0]
+    assert result.verdict == grounding.GROUNDED
+
+
+def test_entities_and_passage_tokens_are_normalized_alike():
+    sentence = "Congress passed the Smoot-Hawley Tariff on 20,000 goods, or 3.5% of imports."
+    entities = grounding._entities(sentence)
+    assert {"smoot", "hawley", "20000", "3.5"} <= entities
+    assert entities <= set(grounding._tokens(sentence))
+
+
+def test_figures_match_with_or_without_separators():
+    answer = "Duties rose on more than 20000 imported goods under the Smoot-Hawley Tariff."
+    result = grounding.check_grounding(answer, [Document(page_content=PASSAGE)])
+    assert result.verdict == grounding.GROUNDED
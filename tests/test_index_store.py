@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from src import index_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(index_store, "VECTOR_STORE_ROOT", str(tmp_path))
+    return tmp_path
+
+
+def _stage(book_id, content):
+    staged = index_store.staging_dir(book_id)
+    for name in ("index.faiss", "index.pkl"):
+        with open(os.path.join(staged, name), "w") as f:
+            f.write(content)
+    return staged
+
+
+def test_legacy_layout_is_read_in_place(store):
+    book = store / "saving_capitalism"
+    book.mkdir()
+    for name in ("index.faiss", "index.pkl"):
+        (book / name).write_text("old")
+    path, version = index_store.resolve("capitalism")
+    assert path == str(book)
+    assert version
+
+
+def test_publish_switches_every_file_at_once(store):
+    first = index_store.publish("capitalism", _stage("capitalism", "v1"))
+    path, version = index_store.resolve("capitalism")
+    assert path == first
+    assert open(os.path.join(path, "index.pkl")).read() == "v1"
+
+    second = index_store.publish("capitalism", _stage("capitalism", "v2"))
+    path, new_version = index_store.resolve("capitalism")
+    assert path == second and new_version != version
+    assert {open(os.path.join(path, n)).read() for n in ("index.faiss", "index.pkl")} == {"v2"}
+    # The version a reader may still be loading is kept
+    assert os.path.isdir(first)
+
+
+def test_only_the_previous_version_is_kept(store):
+    published = [index_store.publish("capitalism", _stage("capitalism", str(i))) for i in range(4)]
+    versions = sorted(os.listdir(store / "saving_capitalism" / index_store.VERSIONS))
+    assert len(versions) == 1 + index_store.KEEP_PREVIOUS_VERSIONS
+    assert os.path.basename(published[-1]) in versions
+
+
+def test_stale_staging_dirs_are_cleaned(store):
+    dead_pid = 2 ** 22 + 12345  # above the default pid_max, so never a live process
+    book = store / "saving_capitalism"
+    (book / index_store.VERSIONS / f"20260101T000000-abc.tmp-{dead_pid}").mkdir(parents=True)
+    (book / f"{index_store.POINTER}.tmp-{dead_pid}").write_text("x")
+    (store / f"saving_capitalism.tmp-{dead_pid}").mkdir()
+    live = _stage("capitalism", "in progress")  # owned by this (live) process
+
+    index_store.clean_stale("capitalism")
+    assert sorted(os.listdir(book / index_store.VERSIONS)) == [os.path.basename(live)]
+    assert not (book / f"{index_store.POINTER}.tmp-{dead_pid}").exists()
+    assert not (store / f"saving_capitalism.tmp-{dead_pid}").exists()
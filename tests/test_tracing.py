@@ -0,0 +1,29 @@
+import json
+import time
+
+from src import tracing
+
+
+def test_trace_log_is_off_by_default():
+    # conftest sets it empty; the shipped default is empty as well
+    assert tracing._exporter is None
+
+
+def test_trace_log_rotates_at_its_size_cap(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "_exporter", tracing._Exporter(str(path), max_bytes=4096))
+    for i in range(200):
+        with tracing.span("stage", record_metric=False, i=i):
+            pass
+
+    rotated = tmp_path / "traces.jsonl.1"
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        lines = [l for p in (rotated, path) if p.exists() for l in p.read_text().splitlines()]
+        if lines and json.loads(lines[-1])["attributes"][0]["value"] == {"intValue": "199"}:
+            break
+        time.sleep(0.01)
+
+    assert rotated.exists()
+    # Each file stops at the first span past the cap
+    assert path.stat().st_size < 4096 + 1024 and rotated.stat().st_size < 4096 + 1024